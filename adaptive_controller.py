@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+from dataclasses import replace
+
+from recorder_engine import DEFAULT_PRESETS
+
+logger = logging.getLogger(__name__)
+
+PRESET_LADDER = ["veryslow", "slower", "slow", "medium", "fast", "faster", "veryfast", "superfast", "ultrafast"]
+
+
+class AdaptiveController:
+    def __init__(self, engine, min_speed=0.97, window=5, cooldown=10.0, min_fps=15, min_scale=0.5):
+        self.engine = engine
+        self.min_speed = min_speed
+        self.window = window
+        self.cooldown = cooldown
+        self.min_fps = min_fps
+        self.min_scale = min_scale
+        self.slow_samples = 0
+        self.last_drop_frames = None
+        self.rising_drops = 0
+        self.last_change = time.monotonic()
+        self.decisions = []
+        self._lock = threading.Lock()
+        engine.add_metrics_listener(self.on_metrics)
+
+    def reset(self):
+        self.slow_samples = 0
+        self.rising_drops = 0
+        self.last_drop_frames = None
+        self.last_change = time.monotonic()
+
+    def on_metrics(self, metrics):
+        if metrics.progress == "end" or metrics.frame == 0:
+            return
+
+        if metrics.speed and metrics.speed < self.min_speed:
+            self.slow_samples += 1
+        else:
+            self.slow_samples = 0
+
+        if self.last_drop_frames is not None and metrics.drop_frames > self.last_drop_frames:
+            self.rising_drops += 1
+        else:
+            self.rising_drops = 0
+        self.last_drop_frames = metrics.drop_frames
+
+        if self.slow_samples < self.window and self.rising_drops < self.window:
+            return
+        if time.monotonic() - self.last_change < self.cooldown:
+            return
+
+        # rolling over restarts ffmpeg, which must not happen on ffmpeg's own progress thread
+        threading.Thread(target=self.degrade, args=(metrics,), daemon=True).start()
+        self.reset()
+
+    def next_settings(self, settings):
+        preset = settings.preset or DEFAULT_PRESETS.get(settings.codec)
+        # intermediate capture encodes with the fixed INTERMEDIATE_CODECS options, a preset would change nothing
+        if settings.capture_mode != "intermediate" and preset in PRESET_LADDER and preset != PRESET_LADDER[-1]:
+            cheaper = PRESET_LADDER[PRESET_LADDER.index(preset) + 1]
+            return replace(settings, preset=cheaper), f"preset {preset} -> {cheaper}"
+
+        if settings.fps > self.min_fps:
+            fps = max(self.min_fps, settings.fps // 2)
+            return replace(settings, fps=fps), f"fps {settings.fps} -> {fps}"
+
+        if settings.scale > self.min_scale:
+            scale = max(self.min_scale, round(settings.scale * 0.75, 2))
+            return replace(settings, scale=scale), f"scale {settings.scale} -> {scale}"
+
+        return None, None
+
+    def degrade(self, metrics):
+        with self._lock:
+            settings = self.engine.settings
+            if not settings or not self.engine.is_alive():
+                return
+
+            new_settings, change = self.next_settings(settings)
+            if not new_settings:
+                logger.warning(f"ENCODER CANNOT KEEP UP AND NO CHEAPER SETTINGS ARE LEFT: {metrics.summary()}")
+                return
+
+            # every step changes the codec headers or the frame size, the engine saves what follows as its own file
+            logger.warning(f"ENCODER FALLING BEHIND ({metrics.summary()}), ROLLING OVER WITH {change}, "
+                           f"THE REST OF THE RECORDING GOES TO A SEPARATE FILE")
+            self.decisions.append({"time": time.time(), "change": change, "speed": metrics.speed,
+                                   "drop_frames": metrics.drop_frames})
+            try:
+                self.engine.next_part(new_settings)
+            except Exception as e:
+                logger.error(f"ERROR APPLYING ADAPTIVE SETTINGS: {e}")
+            self.reset()
@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import font
-from PIL import ImageGrab, ImageTk
 
 class AreaSelector:
     def __init__(self, root):
@@ -11,6 +10,9 @@ class AreaSelector:
         self.background_image = None
 
     def select_area(self, callback):
+        # Pillow is imported on first use to keep it out of the app's startup
+        from PIL import ImageGrab, ImageTk
+
         self.callback = callback
         self.root.withdraw()
         
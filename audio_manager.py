@@ -5,22 +5,42 @@ import platform
 import subprocess
 import os
 import sys
+import threading
 from tkinter import messagebox
 from venv import logger
 
+from device_cache import DeviceCache
+
 class AudioManager:
-    def __init__(self):
-        self.audio_devices = self.get_audio_devices()
+    def __init__(self, cache=None):
+        # a full "ffmpeg -list_devices" run is slow, start from the last known list and check it in the background
+        self.cache = cache or DeviceCache()
+        self.revalidated = None
+        cached = self.cache.audio_devices()
+        self.from_cache = bool(cached)
+        if cached:
+            self.audio_devices = cached
+        else:
+            self.audio_devices = self.get_audio_devices()
+            self.cache.update(audio_devices=self.audio_devices)
 
-    def get_audio_devices(self):
+    def revalidate_in_background(self):
+        threading.Thread(target=self._revalidate, daemon=True).start()
+
+    def _revalidate(self):
+        devices = self.get_audio_devices(notify=False)
+        self.cache.update(audio_devices=devices)
+        self.revalidated = devices
+
+    def get_audio_devices(self, notify=True):
         if platform.system() == 'Windows':
-            return self._get_windows_audio_devices()
+            return self._get_windows_audio_devices(notify)
         elif platform.system() == 'Linux':
             return self._get_linux_audio_devices()
         else:
             return []
 
-    def _get_windows_audio_devices(self):
+    def _get_windows_audio_devices(self, notify=True):
         ffmpeg_path = self._get_ffmpeg_path()
         if not ffmpeg_path:
             return []
@@ -39,7 +59,8 @@ class AudioManager:
 
             if not devices:
                 logger.error("No active audio devices were found. Please check your audio settings.")
-                messagebox.showerror("Error", "No active audio devices were found. Please check your audio settings.")
+                if notify:
+                    messagebox.showerror("Error", "No active audio devices were found. Please check your audio settings.")
 
             return devices
 
@@ -86,4 +107,5 @@ class AudioManager:
 
 
     def refresh_devices(self):
-        self.audio_devices = self.get_audio_devices()
\ No newline at end of file
+        self.audio_devices = self.get_audio_devices()
+        self.cache.update(audio_devices=self.audio_devices)
\ No newline at end of file
@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import re
+import subprocess
+
+from recorder_engine import FFmpegNotFoundError, RecorderError, audio_codec_args, default_ffmpeg_path
+
+logger = logging.getLogger(__name__)
+
+# EBU R128 style targets: integrated loudness (LUFS), true peak (dBTP), loudness range (LU)
+LOUDNORM_TARGET = (-16.0, -1.5, 11.0)
+LOUDNORM_SAMPLE_RATE = 48000
+STREAM_PATTERN = re.compile(r"^\s*Stream #0:\d+.*?: Audio:")
+TITLE_PATTERN = re.compile(r"^\s+title\s*:\s*(.*)$")
+
+
+def run_ffmpeg(args):
+    try:
+        return subprocess.run(args, stdin=subprocess.DEVNULL, capture_output=True, text=True,
+                              encoding='utf-8', errors='replace')
+    except FileNotFoundError as e:
+        raise FFmpegNotFoundError(f"FFmpeg not found: {e}") from e
+
+
+def audio_tracks(input_path, ffmpeg_path):
+    # ffmpeg prints the stream list (with each stream's metadata below it) before complaining about the missing output
+    result = run_ffmpeg([ffmpeg_path, "-hide_banner", "-i", input_path])
+    tracks = []
+    in_audio = False
+    for line in result.stderr.splitlines():
+        if line.lstrip().startswith("Stream #"):
+            in_audio = bool(STREAM_PATTERN.match(line))
+            if in_audio:
+                tracks.append(None)
+        elif in_audio and tracks[-1] is None:
+            match = TITLE_PATTERN.match(line)
+            if match:
+                tracks[-1] = match.group(1).strip()
+    return tracks
+
+
+def track_graphs(count, volumes=None, mix=False):
+    # one filter chain per output track, without its output label
+    volumes = volumes or {}
+    chains = [f"[0:a:{index}]volume={volumes.get(index, 1.0)}" for index in range(count)]
+    if not mix or count < 2:
+        return chains
+    labels = "".join(f"[m{index}]" for index in range(count))
+    inputs = ";".join(f"{chain}[m{index}]" for index, chain in enumerate(chains))
+    return [f"{inputs};{labels}amix=inputs={count}:duration=longest:normalize=0"]
+
+
+def loudnorm_filter(target, measured=None):
+    integrated, true_peak, loudness_range = target
+    options = f"I={integrated}:TP={true_peak}:LRA={loudness_range}"
+    if measured is None:
+        return f"loudnorm={options}:print_format=json"
+    return (f"loudnorm={options}:measured_I={measured['input_i']}:measured_TP={measured['input_tp']}"
+            f":measured_LRA={measured['input_lra']}:measured_thresh={measured['input_thresh']}"
+            f":offset={measured['target_offset']}:linear=true:print_format=summary")
+
+
+def measure_loudness(input_path, graph, ffmpeg_path, target=LOUDNORM_TARGET):
+    # first loudnorm pass: decode only the audio and read the measured values loudnorm prints at the end
+    result = run_ffmpeg([ffmpeg_path, "-hide_banner", "-nostats", "-i", input_path, "-vn",
+                         "-filter_complex", f"{graph},{loudnorm_filter(target)}[out]",
+                         "-map", "[out]", "-f", "null", "-"])
+    start = result.stderr.rfind("{")
+    end = result.stderr.rfind("}")
+    if result.returncode != 0 or start < 0 or end < start:
+        raise RecorderError(f"Loudness measurement failed: {result.stderr[-500:]}")
+    try:
+        return json.loads(result.stderr[start:end + 1])
+    except ValueError as e:
+        raise RecorderError(f"Unexpected loudnorm output: {e}") from e
+
+
+def remix(input_path, output_path, volumes=None, mix=False, normalize=False, audio_codec=None,
+          ffmpeg_path=None, target=LOUDNORM_TARGET):
+    # Rewrites only the audio of a recording: per-track volume, optional mix down to one track and
+    # optional two-pass loudnorm. The video stream is copied, never decoded or encoded again.
+    ffmpeg_path = ffmpeg_path or default_ffmpeg_path()
+    if os.path.abspath(input_path) == os.path.abspath(output_path):
+        raise RecorderError("The remix has to be written to a new file.")
+    titles = audio_tracks(input_path, ffmpeg_path)
+    if not titles:
+        raise RecorderError(f"{input_path} has no audio tracks.")
+    unknown = [index + 1 for index in (volumes or {}) if index >= len(titles)]
+    if unknown:
+        raise RecorderError(f"{input_path} has {len(titles)} audio track(s), there is no track {unknown[0]}.")
+
+    graphs = track_graphs(len(titles), volumes, mix)
+    filters = []
+    for index, graph in enumerate(graphs):
+        if normalize:
+            measured = measure_loudness(input_path, graph, ffmpeg_path, target)
+            logger.info(f"TRACK {index + 1} LOUDNESS: {measured['input_i']} LUFS, {measured['input_tp']} dBTP")
+            # loudnorm works at 192 kHz internally
+            graph = f"{graph},{loudnorm_filter(target, measured)},aresample={LOUDNORM_SAMPLE_RATE}"
+        filters.append(f"{graph}[a{index}]")
+
+    args = [ffmpeg_path, "-hide_banner", "-loglevel", "warning", "-i", input_path,
+            "-filter_complex", ";".join(filters), "-map", "0:v?", "-c:v", "copy"]
+    for index in range(len(graphs)):
+        args.extend(["-map", f"[a{index}]"])
+        title = "mix" if mix and len(titles) > 1 else titles[index]
+        if title:
+            args.extend([f"-metadata:s:a:{index}", f"title={title}"])
+    codec = audio_codec or ("aac" if output_path.lower().endswith(".mp4") else "flac")
+    args.extend(audio_codec_args(codec, output_path))
+    args.extend(["-y", output_path])
+
+    logger.info(f"REMIXING AUDIO: {' '.join(args)}")
+    result = run_ffmpeg(args)
+    if result.returncode != 0:
+        logger.error(f"ERROR REMIXING AUDIO: {result.stderr}")
+        raise RecorderError(result.stderr[-500:] or "ffmpeg failed")
+    return output_path
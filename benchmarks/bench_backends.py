@@ -0,0 +1,112 @@
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from benchmarks.common import parse_size, write_report
+from benchmarks.xvfb import Xvfb
+from recorder_engine import RecorderEngine, RecordingSettings, default_ffmpeg_path
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Compare ffmpeg's x11grab with the mss pipe backend on the same Xvfb display")
+    parser.add_argument("--backends", nargs="+", choices=["ffmpeg", "mss"], default=["ffmpeg", "mss"])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--size", type=parse_size, default=(1920, 1080))
+    parser.add_argument("--fps", nargs="+", type=int, default=[30, 60])
+    parser.add_argument("--codec", default="libx264")
+    parser.add_argument("--static", action="store_true", help="record an idle screen instead of the animated scene")
+    parser.add_argument("--display", help="use an existing X display instead of starting Xvfb")
+    parser.add_argument("--ffmpeg", default=default_ffmpeg_path())
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser
+
+
+def cpu_seconds(who):
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_backend(workdir, display, args, backend, fps):
+    width, height = args.size
+    settings = RecordingSettings(
+        output_path=os.path.join(workdir, f"backend_{backend}_{fps}.mkv"),
+        fps=fps,
+        codec=args.codec,
+        area=(0, 0, width, height),
+        display=display,
+        duration=args.seconds,
+        capture_backend=backend,
+        measure_drift=False,
+        ffmpeg_path=args.ffmpeg
+    )
+    engine = RecorderEngine()
+    # ffmpeg is a child that has been waited for once stop() returns, the mss grabber runs in this process
+    children_before, self_before = cpu_seconds(resource.RUSAGE_CHILDREN), cpu_seconds(resource.RUSAGE_SELF)
+    started = time.monotonic()
+    engine.start(settings)
+    while engine.is_alive():
+        time.sleep(0.2)
+    metrics = engine.status().metrics
+    source = engine.capture.source if engine.capture else None
+    stats = source.stats() if source else {}
+    output_path = engine.stop()
+    wall = time.monotonic() - started
+
+    frames = metrics.frame if metrics else 0
+    result = {
+        "backend": backend,
+        "fps": fps,
+        "frames": frames,
+        "achieved_fps": round(frames / args.seconds, 2),
+        "drop_frames": metrics.drop_frames if metrics else 0,
+        "dup_frames": metrics.dup_frames if metrics else 0,
+        "grab_skipped": stats.get("skipped", 0),
+        "grab_ms": round(stats.get("grab_ms", 0.0), 3),
+        "ffmpeg_cpu_seconds": round(cpu_seconds(resource.RUSAGE_CHILDREN) - children_before, 3),
+        "python_cpu_seconds": round(cpu_seconds(resource.RUSAGE_SELF) - self_before, 3),
+        "wall_seconds": round(wall, 3),
+        "size_bytes": os.path.getsize(output_path) if output_path and os.path.exists(output_path) else 0
+    }
+    result["cpu_percent"] = round((result["ffmpeg_cpu_seconds"] + result["python_cpu_seconds"]) / wall * 100, 1)
+    if output_path and os.path.exists(output_path):
+        os.remove(output_path)
+    return result
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = []
+    xvfb = None
+
+    try:
+        display = args.display
+        if not display:
+            xvfb = Xvfb(*args.size)
+            display = xvfb.start()
+            if not args.static:
+                xvfb.run_scene()
+
+        with tempfile.TemporaryDirectory(prefix="msr_backends_") as workdir:
+            for fps in args.fps:
+                for backend in args.backends:
+                    result = run_backend(workdir, display, args, backend, fps)
+                    print(f"{backend} @ {fps} fps: {result['achieved_fps']} fps achieved, "
+                          f"{result['cpu_percent']}% cpu", file=sys.stderr)
+                    results.append(result)
+    finally:
+        if xvfb:
+            xvfb.stop()
+
+    write_report(results, args.output, args.ffmpeg, {
+        "seconds": args.seconds,
+        "size": f"{args.size[0]}x{args.size[1]}",
+        "scene": "static" if args.static else "animated"
+    })
+    return 0 if all(result["frames"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import parse_size, write_report
+from ffmpeg_progress import parse_progress_text
+from recorder_engine import RecorderEngine, RecordingSettings, default_ffmpeg_path
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Simulate a long recording with a drifting audio clock "
+                                                 "(testsrc + sine, unpaced) and measure the A/V sync of the result")
+    parser.add_argument("--minutes", type=float, default=60, help="simulated recording length (default: 60)")
+    parser.add_argument("--ppm", nargs="+", type=float, default=[100.0, -100.0],
+                        help="audio clock error to simulate, in parts per million")
+    parser.add_argument("--size", type=parse_size, default=(320, 240))
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--ffmpeg", default=default_ffmpeg_path())
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser
+
+
+def stream_seconds(ffmpeg_path, path, stream, by_samples=False):
+    # video: timestamp of the last frame; audio: number of samples decoded, which is what a player plays
+    args = [ffmpeg_path, "-hide_banner", "-nostats", "-progress", "pipe:1", "-i", path, "-map", f"0:{stream}"]
+    if by_samples:
+        args.extend(["-filter:a", "asetpts=N/SR/TB"])
+    else:
+        args.extend(["-c", "copy"])
+    result = subprocess.run(args + ["-f", "null", "-"], capture_output=True, text=True)
+    return parse_progress_text(result.stdout).out_time
+
+
+def run_case(engine, workdir, args, ppm, av_sync):
+    output_path = os.path.join(workdir, f"drift_{ppm:+.0f}_{'sync' if av_sync else 'raw'}.mkv")
+    width, height = args.size
+    settings = RecordingSettings(
+        output_path=output_path,
+        fps=args.fps,
+        preset="ultrafast",
+        video_source="testsrc",
+        audio_source="sine",
+        synthetic_drift_ppm=ppm,
+        av_sync=av_sync,
+        area=(0, 0, width, height),
+        duration=args.minutes * 60,
+        ffmpeg_path=args.ffmpeg
+    )
+    samples = []
+    listener = lambda metrics: samples.append((metrics.out_time, metrics.drift_ms))
+    engine.add_metrics_listener(listener)
+    started = time.monotonic()
+    try:
+        engine.start(settings)
+        while engine.is_alive():
+            time.sleep(0.2)
+        output_path = engine.stop()
+    finally:
+        engine.metrics_listeners.remove(listener)
+
+    # the input drift the probe saw, once per simulated minute
+    measured = {}
+    for out_time, drift_ms in samples:
+        if drift_ms is not None:
+            measured[int(out_time // 60)] = round(drift_ms, 1)
+
+    result = {"ppm": ppm, "av_sync": av_sync, "wall_seconds": round(time.monotonic() - started, 1),
+              "input_drift_ms_per_minute": [measured[minute] for minute in sorted(measured)]}
+    if output_path:
+        video = stream_seconds(args.ffmpeg, output_path, "v")
+        audio = stream_seconds(args.ffmpeg, output_path, "a", by_samples=True)
+        result.update({"video_seconds": round(video, 3), "audio_seconds": round(audio, 3),
+                       "output_av_offset_ms": round((audio - video) * 1000, 1)})
+        os.remove(output_path)
+    else:
+        result["error"] = "ffmpeg produced no output"
+    return result
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    engine = RecorderEngine()
+    results = []
+    with tempfile.TemporaryDirectory(prefix="msr_drift_") as workdir:
+        for ppm in args.ppm:
+            for av_sync in (False, True):
+                result = run_case(engine, workdir, args, ppm, av_sync)
+                print(f"{ppm:+.0f} ppm, av_sync={av_sync}: output A/V offset "
+                      f"{result.get('output_av_offset_ms')} ms after {args.minutes:g} min", file=sys.stderr)
+                results.append(result)
+
+    write_report(results, args.output, args.ffmpeg, {
+        "minutes": args.minutes,
+        "size": f"{args.size[0]}x{args.size[1]}",
+        "fps": args.fps
+    })
+    return 0 if all("error" not in result for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
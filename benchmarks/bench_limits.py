@@ -0,0 +1,123 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from dataclasses import replace
+
+from benchmarks.common import parse_size, write_report
+from benchmarks.workload import CpuHog
+from benchmarks.xvfb import Xvfb
+from process_limits import parse_cpus
+from recorder_engine import RecorderEngine, RecordingSettings, default_ffmpeg_path
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Record an Xvfb display next to a CPU-bound workload, with ffmpeg "
+                                                 "at normal priority and with nice/ionice/affinity/thread limits")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--size", type=parse_size, default=(1920, 1080))
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--codec", default="libx264")
+    parser.add_argument("--hog", type=int, default=os.cpu_count() or 1, help="busy processes (default: one per core)")
+    parser.add_argument("--nice", type=int, default=10)
+    parser.add_argument("--ionice", default="idle")
+    parser.add_argument("--cpus", type=parse_cpus, help="cores for ffmpeg (default: the last half)")
+    parser.add_argument("--threads", type=int, help="encoder threads (default: one per core in --cpus)")
+    parser.add_argument("--cpu-quota", type=int, help="also cap ffmpeg in a cgroup, percent of one core")
+    parser.add_argument("--runs", type=int, default=2, help="runs per variant, alternating")
+    parser.add_argument("--display", help="use an existing X display instead of starting Xvfb")
+    parser.add_argument("--ffmpeg", default=default_ffmpeg_path())
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser
+
+
+def workload_alone(processes, seconds):
+    with CpuHog(processes) as hog:
+        time.sleep(seconds)
+    return hog.throughput()
+
+
+def run_variant(settings, hog_processes, name):
+    engine = RecorderEngine()
+    with CpuHog(hog_processes) as hog:
+        engine.start(settings)
+        while engine.is_alive():
+            time.sleep(0.2)
+        status = engine.status()
+        output_path = engine.stop()
+    metrics = status.metrics
+    frames = metrics.frame + metrics.drop_frames if metrics else 0
+
+    result = {
+        "variant": name,
+        "frames": metrics.frame if metrics else 0,
+        "drop_frames": metrics.drop_frames if metrics else 0,
+        "dup_frames": metrics.dup_frames if metrics else 0,
+        "drop_rate": round(metrics.drop_frames / frames, 4) if frames else 0.0,
+        "speed": metrics.speed if metrics else 0.0,
+        "hog_throughput": round(hog.throughput(), 1),
+        # what ffmpeg actually ran with, not what was asked for
+        "limits": status.limits.to_dict() if status.limits else None
+    }
+    if output_path and os.path.exists(output_path):
+        os.remove(output_path)
+    return result
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    cpus = args.cpus or tuple(range((os.cpu_count() or 2) // 2, os.cpu_count() or 2))
+    results = []
+    xvfb = None
+
+    try:
+        display = args.display
+        if not display:
+            xvfb = Xvfb(*args.size)
+            display = xvfb.start()
+            xvfb.run_scene()
+
+        baseline = workload_alone(args.hog, args.seconds)
+        print(f"workload alone: {baseline:.1f} batches/s", file=sys.stderr)
+
+        with tempfile.TemporaryDirectory(prefix="msr_limits_") as workdir:
+            width, height = args.size
+            settings = RecordingSettings(
+                output_path=os.path.join(workdir, "limits.mkv"),
+                fps=args.fps,
+                codec=args.codec,
+                area=(0, 0, width, height),
+                display=display,
+                duration=args.seconds,
+                measure_drift=False,
+                ffmpeg_path=args.ffmpeg
+            )
+            limited = replace(settings, nice=args.nice, ionice=args.ionice or None, cpu_affinity=cpus,
+                              threads=args.threads or len(cpus), cpu_quota=args.cpu_quota)
+            for run in range(args.runs):
+                for name, variant in (("unlimited", settings), ("limited", limited)):
+                    result = run_variant(variant, args.hog, name)
+                    result["run"] = run
+                    result["hog_slowdown_percent"] = round((1 - result["hog_throughput"] / baseline) * 100, 1) \
+                        if baseline else 0.0
+                    print(f"run {run}, {name}: workload {result['hog_throughput']} batches/s "
+                          f"({result['hog_slowdown_percent']}% slower), drop rate {result['drop_rate']:.2%}",
+                          file=sys.stderr)
+                    results.append(result)
+    finally:
+        if xvfb:
+            xvfb.stop()
+
+    write_report(results, args.output, args.ffmpeg, {
+        "seconds": args.seconds,
+        "size": f"{args.size[0]}x{args.size[1]}",
+        "fps": args.fps,
+        "hog_processes": args.hog,
+        "hog_alone_throughput": round(baseline, 1)
+    })
+    return 0 if all(result["frames"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from benchmarks.common import parse_size, write_report
+from preview import PREVIEW_SIZE, FrameConverter
+from recorder_engine import default_ffmpeg_path
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the preview frame conversion")
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[(1920, 1080), (3840, 2160)])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser
+
+
+def synthetic_frame(width, height):
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (height, width, 4), dtype=np.uint8).tobytes()
+
+
+def legacy_convert(raw, width, height):
+    # what the preview thread used to do for every frame
+    screenshot = np.array(np.frombuffer(raw, np.uint8).reshape(height, width, 4))
+    screenshot = cv2.cvtColor(screenshot, cv2.COLOR_RGBA2RGB)
+    screenshot = cv2.cvtColor(screenshot, cv2.COLOR_BGR2RGB)
+    screenshot = cv2.resize(screenshot, PREVIEW_SIZE, interpolation=cv2.INTER_AREA)
+    return Image.fromarray(screenshot)
+
+
+def pipeline_convert(converter, out):
+    def convert(raw, width, height):
+        converter.convert(raw, width, height, out)
+        return Image.frombuffer("RGB", PREVIEW_SIZE, out, "raw", "RGB", 0, 1)
+    return convert
+
+
+def measure(convert, raw, width, height, frames):
+    convert(raw, width, height)
+    timings = []
+    for _ in range(frames):
+        started = time.perf_counter()
+        convert(raw, width, height)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 3),
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95)] * 1000, 3)
+    }
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = []
+    for width, height in args.sizes:
+        raw = synthetic_frame(width, height)
+        converter = FrameConverter()
+        converter.prepare(width, height)
+        out = np.empty((PREVIEW_SIZE[1], PREVIEW_SIZE[0], 3), np.uint8)
+
+        legacy = measure(legacy_convert, raw, width, height, args.frames)
+        pipeline = measure(pipeline_convert(converter, out), raw, width, height, args.frames)
+        # an unchanged screen only costs the decimation and the comparison with the previous frame
+        static = measure(converter.update, raw, width, height, args.frames)
+        results.append({
+            "source": f"{width}x{height}",
+            "decimation_step": converter.step,
+            "legacy": legacy,
+            "pipeline": pipeline,
+            "unchanged_frame": static,
+            "speedup": round(legacy["mean_ms"] / pipeline["mean_ms"], 2) if pipeline["mean_ms"] else None
+        })
+        print(f"{width}x{height}: legacy {legacy['mean_ms']} ms, pipeline {pipeline['mean_ms']} ms", file=sys.stderr)
+
+    write_report(results, args.output, default_ffmpeg_path(), {"frames": args.frames, "preview_size": PREVIEW_SIZE})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import argparse
+import os
+import sys
+import tempfile
+from dataclasses import replace
+
+from benchmarks.common import parse_size, run_measured, write_report
+from benchmarks.workload import CpuHog
+from benchmarks.xvfb import Xvfb
+from ffmpeg_progress import parse_progress_text
+from recorder_engine import RecorderEngine, RecordingSettings, default_ffmpeg_path
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Record an Xvfb display while every core is busy, with ffmpeg's "
+                                                 "default input queues and with the sized ones")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--size", type=parse_size, default=(1920, 1080))
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--codec", default="libx264")
+    parser.add_argument("--hog", type=int, default=os.cpu_count() or 1, help="busy processes (default: one per core)")
+    parser.add_argument("--runs", type=int, default=2, help="runs per variant, alternating")
+    parser.add_argument("--display", help="use an existing X display instead of starting Xvfb")
+    parser.add_argument("--ffmpeg", default=default_ffmpeg_path())
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser
+
+
+def run_variant(engine, settings, hog_processes, auto_queues):
+    settings = replace(settings, auto_queues=auto_queues)
+    args = engine.build_ffmpeg_args(settings, settings.output_path)
+    with CpuHog(hog_processes) as hog:
+        measured = run_measured(args)
+    metrics = parse_progress_text(measured["stdout"])
+    frames = metrics.frame + metrics.drop_frames
+
+    result = {
+        "queues": "auto" if auto_queues else "ffmpeg defaults",
+        "returncode": measured["returncode"],
+        "frames": metrics.frame,
+        "drop_frames": metrics.drop_frames,
+        "dup_frames": metrics.dup_frames,
+        "drop_rate": round(metrics.drop_frames / frames, 4) if frames else 0.0,
+        "queue_full_warnings": measured["stderr"].lower().count("thread message queue blocking"),
+        "speed": metrics.speed,
+        "cpu_seconds": measured["cpu_seconds"],
+        "peak_rss_kb": measured["peak_rss_kb"],
+        "hog_throughput": round(hog.throughput(), 1)
+    }
+    if measured["returncode"] != 0:
+        result["error"] = measured["stderr"][-2000:]
+    if os.path.exists(settings.output_path):
+        os.remove(settings.output_path)
+    return result
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    engine = RecorderEngine()
+    results = []
+    xvfb = None
+
+    try:
+        display = args.display
+        if not display:
+            xvfb = Xvfb(*args.size)
+            display = xvfb.start()
+            xvfb.run_scene()
+
+        with tempfile.TemporaryDirectory(prefix="msr_queues_") as workdir:
+            width, height = args.size
+            settings = RecordingSettings(
+                output_path=os.path.join(workdir, "queues.mkv"),
+                fps=args.fps,
+                codec=args.codec,
+                audio_source="sine",
+                area=(0, 0, width, height),
+                display=display,
+                duration=args.seconds,
+                ffmpeg_path=args.ffmpeg
+            )
+            for run in range(args.runs):
+                for auto_queues in (False, True):
+                    result = run_variant(engine, settings, args.hog, auto_queues)
+                    result["run"] = run
+                    print(f"run {run}, {result['queues']}: drop={result['drop_frames']} dup={result['dup_frames']} "
+                          f"queue full {result['queue_full_warnings']}x", file=sys.stderr)
+                    results.append(result)
+    finally:
+        if xvfb:
+            xvfb.stop()
+
+    write_report(results, args.output, args.ffmpeg, {
+        "seconds": args.seconds,
+        "size": f"{args.size[0]}x{args.size[1]}",
+        "fps": args.fps,
+        "hog_processes": args.hog
+    })
+    return 0 if all(result["returncode"] == 0 for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+
+from benchmarks.common import parse_size, run_measured, write_report
+from benchmarks.xvfb import Xvfb
+from capability_probe import get_capabilities, working_codecs
+from ffmpeg_progress import parse_progress_text
+from recorder_engine import (BITRATE_OPTIONS, CODEC_OPTIONS, DEFAULT_PRESETS, FPS_OPTIONS, RecorderEngine,
+                             RecordingSettings, default_ffmpeg_path)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the recording pipeline against an Xvfb display")
+    parser.add_argument("--codecs", nargs="+", default=CODEC_OPTIONS)
+    parser.add_argument("--presets", nargs="+", default=None, help="default: the preset the app uses for each codec")
+    parser.add_argument("--fps", nargs="+", type=int, default=[int(fps) for fps in FPS_OPTIONS])
+    parser.add_argument("--bitrates", nargs="+", default=BITRATE_OPTIONS)
+    parser.add_argument("--formats", nargs="+", default=["mkv"])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--size", type=parse_size, default=(1920, 1080))
+    parser.add_argument("--audio", choices=["sine", "anullsrc", "none"], default="sine")
+    parser.add_argument("--static", action="store_true", help="record an idle screen instead of the animated scene")
+    parser.add_argument("--display", help="use an existing X display instead of starting Xvfb")
+    parser.add_argument("--ffmpeg", default=default_ffmpeg_path())
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="previous JSON report to compare against")
+    return parser
+
+
+def combinations(args):
+    for codec, fps, bitrate, container in itertools.product(args.codecs, args.fps, args.bitrates, args.formats):
+        for preset in args.presets or [DEFAULT_PRESETS.get(codec)]:
+            yield codec, preset, fps, bitrate, container
+
+
+def run_combo(engine, display, workdir, args, codec, preset, fps, bitrate, container):
+    output_path = os.path.join(workdir, f"bench_{codec}_{preset}_{fps}_{bitrate}.{container}")
+    width, height = args.size
+    settings = RecordingSettings(
+        output_path=output_path,
+        fps=fps,
+        bitrate=bitrate,
+        codec=codec,
+        preset=preset,
+        audio_source="device" if args.audio == "none" else args.audio,
+        area=(0, 0, width, height),
+        display=display,
+        duration=args.seconds,
+        ffmpeg_path=args.ffmpeg
+    )
+    measured = run_measured(engine.build_ffmpeg_args(settings, output_path))
+    metrics = parse_progress_text(measured["stdout"])
+
+    result = {
+        "codec": codec,
+        "preset": preset,
+        "fps": fps,
+        "bitrate": bitrate,
+        "format": container,
+        "returncode": measured["returncode"],
+        "frames": metrics.frame,
+        "encode_fps": metrics.fps,
+        "speed": metrics.speed,
+        "drop_frames": metrics.drop_frames,
+        "dup_frames": metrics.dup_frames,
+        "cpu_seconds": measured["cpu_seconds"],
+        "peak_rss_kb": measured["peak_rss_kb"],
+        "wall_seconds": measured["wall_seconds"],
+        "size_bytes": os.path.getsize(output_path) if os.path.exists(output_path) else 0
+    }
+    if measured["returncode"] != 0:
+        result["error"] = measured["stderr"][-2000:]
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    return result
+
+
+def combo_key(result):
+    return result["codec"], result["preset"], result["fps"], result["bitrate"], result.get("format")
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {combo_key(result): result for result in json.load(f)["results"]}
+
+    fields = ["encode_fps", "speed", "drop_frames", "dup_frames", "cpu_seconds", "peak_rss_kb"]
+    for result in results:
+        old = baseline.get(combo_key(result))
+        if not old:
+            continue
+        deltas = ", ".join(f"{name} {old.get(name, 0)} -> {result[name]}" for name in fields)
+        print(f"{'/'.join(str(part) for part in combo_key(result))}: {deltas}", file=sys.stderr)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    supported = working_codecs(get_capabilities(args.ffmpeg), args.codecs)
+    for codec in args.codecs:
+        if codec not in supported:
+            print(f"skipping {codec}: it failed the test encode with {args.ffmpeg}", file=sys.stderr)
+    args.codecs = supported
+    engine = RecorderEngine()
+    results = []
+    xvfb = None
+
+    try:
+        display = args.display
+        if not display:
+            xvfb = Xvfb(*args.size)
+            display = xvfb.start()
+            if not args.static:
+                xvfb.run_scene()
+
+        with tempfile.TemporaryDirectory(prefix="msr_bench_") as workdir:
+            for combo in combinations(args):
+                result = run_combo(engine, display, workdir, args, *combo)
+                print(f"{'/'.join(str(part) for part in combo)}: {result['encode_fps']} fps, "
+                      f"{result['speed']}x, drop={result['drop_frames']} dup={result['dup_frames']}", file=sys.stderr)
+                results.append(result)
+    finally:
+        if xvfb:
+            xvfb.stop()
+
+    write_report(results, args.output, args.ffmpeg, {
+        "seconds": args.seconds,
+        "size": f"{args.size[0]}x{args.size[1]}",
+        "audio": args.audio,
+        "scene": "static" if args.static else "animated"
+    })
+    if args.baseline:
+        compare(results, args.baseline)
+    return 0 if all(result["returncode"] == 0 for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import argparse
+import os
+import sys
+import tempfile
+from dataclasses import replace
+
+from benchmarks.common import parse_size, run_measured, write_report
+from benchmarks.xvfb import Xvfb
+from ffmpeg_progress import parse_progress_text
+from recorder_engine import SCALER_OPTIONS, RecorderEngine, RecordingSettings, default_ffmpeg_path, output_size
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Record a large Xvfb display at its native size and shrunk to "
+                                                 "--max-size with every scaler, and compare fps and CPU")
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--size", type=parse_size, default=(3840, 2160))
+    parser.add_argument("--max-size", type=parse_size, default=(1920, 1080))
+    parser.add_argument("--scalers", nargs="+", choices=SCALER_OPTIONS, default=SCALER_OPTIONS)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--codec", default="libx264")
+    parser.add_argument("--display", help="use an existing X display instead of starting Xvfb")
+    parser.add_argument("--ffmpeg", default=default_ffmpeg_path())
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser
+
+
+def run_variant(engine, settings, scaler):
+    if scaler:
+        settings = replace(settings, scaler=scaler)
+    else:
+        settings = replace(settings, max_size=None)
+    args = engine.build_ffmpeg_args(settings, settings.output_path)
+    measured = run_measured(args)
+    metrics = parse_progress_text(measured["stdout"])
+    width, height = output_size(settings.area[2], settings.area[3], settings.max_size, settings.scale)
+
+    result = {
+        "scaler": scaler or "native",
+        "output_size": f"{width}x{height}",
+        "returncode": measured["returncode"],
+        "frames": metrics.frame,
+        "achieved_fps": round(metrics.frame / settings.duration, 2),
+        "drop_frames": metrics.drop_frames,
+        "dup_frames": metrics.dup_frames,
+        "speed": metrics.speed,
+        "cpu_seconds": measured["cpu_seconds"],
+        "cpu_percent": round(measured["cpu_seconds"] / measured["wall_seconds"] * 100, 1)
+        if measured["wall_seconds"] else 0.0,
+        "peak_rss_kb": measured["peak_rss_kb"],
+        "size_bytes": os.path.getsize(settings.output_path) if os.path.exists(settings.output_path) else 0
+    }
+    if measured["returncode"] != 0:
+        result["error"] = measured["stderr"][-2000:]
+    if os.path.exists(settings.output_path):
+        os.remove(settings.output_path)
+    return result
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    engine = RecorderEngine()
+    results = []
+    xvfb = None
+
+    try:
+        display = args.display
+        if not display:
+            xvfb = Xvfb(*args.size)
+            display = xvfb.start()
+            xvfb.run_scene()
+
+        with tempfile.TemporaryDirectory(prefix="msr_scaler_") as workdir:
+            width, height = args.size
+            settings = RecordingSettings(
+                output_path=os.path.join(workdir, "scaler.mkv"),
+                fps=args.fps,
+                codec=args.codec,
+                area=(0, 0, width, height),
+                display=display,
+                duration=args.seconds,
+                max_size=args.max_size,
+                measure_drift=False,
+                ffmpeg_path=args.ffmpeg
+            )
+            # None records at the native size, the baseline every scaler is compared with
+            for scaler in [None] + args.scalers:
+                result = run_variant(engine, settings, scaler)
+                print(f"{result['scaler']} ({result['output_size']}): {result['achieved_fps']} fps, "
+                      f"speed {result['speed']}x, {result['cpu_percent']}% cpu", file=sys.stderr)
+                results.append(result)
+    finally:
+        if xvfb:
+            xvfb.stop()
+
+    write_report(results, args.output, args.ffmpeg, {
+        "seconds": args.seconds,
+        "size": f"{args.size[0]}x{args.size[1]}",
+        "max_size": f"{args.max_size[0]}x{args.max_size[1]}",
+        "fps": args.fps
+    })
+    return 0 if all(result["returncode"] == 0 for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from benchmarks.common import parse_size, write_report
+from benchmarks.xvfb import Xvfb
+from recorder_engine import RecorderEngine, RecordingSettings, default_ffmpeg_path
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Record an Xvfb scene that changes every --interval seconds, with "
+                                                 "and without skipping static frames, and check what was encoded")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between scene changes")
+    parser.add_argument("--backends", nargs="+", choices=["ffmpeg", "mss"], default=["ffmpeg", "mss"],
+                        help="ffmpeg drops static frames with mpdecimate, mss compares frame hashes")
+    parser.add_argument("--size", type=parse_size, default=(1920, 1080))
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--codec", default="libx264")
+    parser.add_argument("--ffmpeg", default=default_ffmpeg_path())
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser
+
+
+def cpu_seconds():
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def saving(before, after):
+    return round((1 - after / before) * 100, 1) if before else 0.0
+
+
+def run_case(workdir, display, args, backend, skip_static):
+    width, height = args.size
+    settings = RecordingSettings(
+        output_path=os.path.join(workdir, f"static_{backend}_{'skip' if skip_static else 'all'}.mkv"),
+        fps=args.fps,
+        codec=args.codec,
+        area=(0, 0, width, height),
+        display=display,
+        duration=args.seconds,
+        capture_backend=backend,
+        skip_static_frames=skip_static,
+        measure_drift=False,
+        ffmpeg_path=args.ffmpeg
+    )
+    engine = RecorderEngine()
+    cpu_before = cpu_seconds()
+    engine.start(settings)
+    while engine.is_alive():
+        time.sleep(0.2)
+    metrics = engine.status().metrics
+    output_path = engine.stop()
+
+    result = {
+        "backend": backend,
+        "skip_static_frames": skip_static,
+        "encoded_frames": metrics.frame if metrics else 0,
+        "static_frames": metrics.static_frames if metrics else 0,
+        "cpu_seconds": round(cpu_seconds() - cpu_before, 3),
+        "size_bytes": os.path.getsize(output_path) if output_path and os.path.exists(output_path) else 0
+    }
+    if output_path and os.path.exists(output_path):
+        os.remove(output_path)
+    return result
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # the scene changes every interval, ffmpeg still needs a frame every keepalive (fragment) second
+    changes = int(args.seconds / args.interval) + 1
+    keepalives = int(args.seconds)
+    xvfb = Xvfb(*args.size)
+    results = []
+    try:
+        display = xvfb.start()
+        xvfb.run_scene(args.interval)
+        with tempfile.TemporaryDirectory(prefix="msr_static_") as workdir:
+            for backend in args.backends:
+                every, skipped = (run_case(workdir, display, args, backend, skip_static) for skip_static in (False, True))
+                # every change must be encoded, and apart from keepalive frames nothing else
+                skipped["passed"] = changes <= skipped["encoded_frames"] <= changes + keepalives + 2
+                skipped["cpu_saving_percent"] = saving(every["cpu_seconds"], skipped["cpu_seconds"])
+                skipped["size_saving_percent"] = saving(every["size_bytes"], skipped["size_bytes"])
+                for result in (every, skipped):
+                    print(f"{backend}, skip_static_frames={result['skip_static_frames']}: "
+                          f"{result['encoded_frames']} frames encoded, {result['cpu_seconds']} s cpu, "
+                          f"{result['size_bytes']} bytes", file=sys.stderr)
+                results.extend([every, skipped])
+    finally:
+        xvfb.stop()
+
+    passed = all(result.get("passed", True) for result in results)
+    write_report(results, args.output, args.ffmpeg, {
+        "seconds": args.seconds,
+        "interval": args.interval,
+        "size": f"{args.size[0]}x{args.size[1]}",
+        "fps": args.fps,
+        "expected_encoded_frames": [changes, changes + keepalives + 2],
+        "passed": passed
+    })
+    if not passed:
+        print(f"FAILED: expected {changes} to {changes + keepalives + 2} encoded frames when skipping", file=sys.stderr)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
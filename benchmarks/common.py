@@ -0,0 +1,73 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+from recorder_engine import timestamp
+
+
+def run_measured(args, env=None):
+    started = time.monotonic()
+    process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, universal_newlines=True, env=env)
+    output = {"stdout": "", "stderr": ""}
+
+    def drain(name, pipe):
+        output[name] = pipe.read()
+        pipe.close()
+
+    readers = [threading.Thread(target=drain, args=(name, pipe), daemon=True)
+               for name, pipe in (("stdout", process.stdout), ("stderr", process.stderr))]
+    for reader in readers:
+        reader.start()
+
+    # wait4 instead of Popen.wait so the child's own rusage is available
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    for reader in readers:
+        reader.join()
+
+    return {
+        "returncode": process.returncode,
+        "wall_seconds": round(time.monotonic() - started, 3),
+        "cpu_seconds": round(rusage.ru_utime + rusage.ru_stime, 3),
+        "peak_rss_kb": rusage.ru_maxrss,
+        "stdout": output["stdout"],
+        "stderr": output["stderr"]
+    }
+
+
+def ffmpeg_version(ffmpeg_path):
+    try:
+        result = subprocess.run([ffmpeg_path, "-version"], capture_output=True, text=True)
+    except FileNotFoundError:
+        return None
+    return result.stdout.splitlines()[0] if result.stdout else None
+
+
+def write_report(results, output_path, ffmpeg_path, extra=None):
+    report = {
+        "created": timestamp(),
+        "platform": platform.platform(),
+        "python": sys.version.split()[0],
+        "ffmpeg": ffmpeg_version(ffmpeg_path),
+        "results": results
+    }
+    if extra:
+        report.update(extra)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return report
+
+
+def parse_size(value):
+    width, height = (int(part) for part in value.lower().split("x"))
+    return width, height
@@ -0,0 +1,58 @@
+import argparse
+import time
+import tkinter as tk
+
+COLORS = ["#e6194b", "#3cb44b", "#ffe119", "#4363d8", "#f58231", "#911eb4", "#46f0f0", "#f032e6"]
+
+
+# interval=0 moves the boxes on every tick, otherwise the screen only changes every `interval` seconds
+class Scene:
+    def __init__(self, root, width, height, interval):
+        self.root = root
+        self.width = width
+        self.height = height
+        self.interval = interval
+        self.tick = 0
+        self.started = time.monotonic()
+        self.last_change = None
+
+        root.geometry(f"{width}x{height}+0+0")
+        root.overrideredirect(True)
+        self.canvas = tk.Canvas(root, width=width, height=height, bg="black", highlightthickness=0)
+        self.canvas.pack()
+        self.boxes = [self.canvas.create_rectangle(0, 0, 0, 0, fill=color, outline="") for color in COLORS]
+        self.label = self.canvas.create_text(20, 20, anchor="nw", fill="white", font=("Arial", 32))
+
+    def draw(self):
+        size = self.height // 6
+        for index, box in enumerate(self.boxes):
+            x = (self.tick * (index + 3) * 4) % (self.width - size)
+            y = (index * self.height // len(self.boxes) + self.tick * (index + 1)) % (self.height - size)
+            self.canvas.coords(box, x, y, x + size, y + size)
+        self.canvas.itemconfig(self.label, text=f"{self.tick:08d}")
+        self.tick += 1
+
+    def run(self):
+        now = time.monotonic()
+        if self.interval <= 0:
+            self.draw()
+        elif self.last_change is None or now - self.last_change >= self.interval:
+            self.draw()
+            self.last_change = now
+        self.root.after(16, self.run)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--interval", type=float, default=0.0)
+    parser.add_argument("--size", default="1920x1080")
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.split("x"))
+    root = tk.Tk()
+    Scene(root, width, height, args.interval).run()
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import multiprocessing
+import os
+import time
+
+
+def burn(counter, stop):
+    # tight integer work, counted in batches so the shared counter isn't the bottleneck
+    while not stop.is_set():
+        value = 0
+        for i in range(100000):
+            value += i * i
+        with counter.get_lock():
+            counter.value += 1
+
+
+class CpuHog:
+    # One busy process per core (or `processes`), standing in for the application being recorded.
+    # throughput() is the work done per second, so slowdowns caused by the recording show up too.
+    def __init__(self, processes=None):
+        self.processes = processes or os.cpu_count() or 1
+        self.counter = multiprocessing.Value("q", 0)
+        self.stop_event = multiprocessing.Event()
+        self.workers = []
+        self.started = None
+        self.elapsed = 0.0
+
+    def start(self):
+        self.stop_event.clear()
+        self.counter.value = 0
+        self.workers = [multiprocessing.Process(target=burn, args=(self.counter, self.stop_event), daemon=True)
+                        for _ in range(self.processes)]
+        for worker in self.workers:
+            worker.start()
+        self.started = time.monotonic()
+
+    def stop(self):
+        self.stop_event.set()
+        for worker in self.workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self.elapsed = time.monotonic() - self.started if self.started else 0.0
+        self.workers = []
+
+    def throughput(self):
+        return self.counter.value / self.elapsed if self.elapsed else 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,67 @@
+import os
+import select
+import subprocess
+import sys
+
+
+class Xvfb:
+    def __init__(self, width=1920, height=1080, depth=24):
+        self.width = width
+        self.height = height
+        self.depth = depth
+        self.process = None
+        self.scene_process = None
+        self.display = None
+
+    def start(self, timeout=10):
+        read_fd, write_fd = os.pipe()
+        try:
+            self.process = subprocess.Popen(
+                ["Xvfb", "-displayfd", str(write_fd), "-screen", "0",
+                 f"{self.width}x{self.height}x{self.depth}", "-nolisten", "tcp"],
+                pass_fds=(write_fd,),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        finally:
+            os.close(write_fd)
+
+        try:
+            ready, _, _ = select.select([read_fd], [], [], timeout)
+            if not ready:
+                self.stop()
+                raise RuntimeError("Xvfb did not report a display number in time.")
+            number = os.read(read_fd, 32).decode().strip()
+        finally:
+            os.close(read_fd)
+
+        self.display = f":{number}"
+        return self.display
+
+    def run_scene(self, interval=0.0):
+        env = dict(os.environ, DISPLAY=self.display)
+        self.scene_process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.scene", "--interval", str(interval),
+             "--size", f"{self.width}x{self.height}"],
+            env=env,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+        return self.scene_process
+
+    def stop(self):
+        for process in [self.scene_process, self.process]:
+            if process and process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        self.scene_process = None
+        self.process = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+
+from recorder_engine import CODEC_OPTIONS, INTERMEDIATE_CODECS, FFmpegNotFoundError
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+PROBE_TIMEOUT = 10
+PROBED_CODECS = CODEC_OPTIONS + [codec for codec in INTERMEDIATE_CODECS if codec not in CODEC_OPTIONS]
+
+
+def default_cache_path():
+    return os.path.join(os.getcwd(), "capabilities.json")
+
+
+def resolve_ffmpeg(ffmpeg_path):
+    resolved = ffmpeg_path if os.path.isabs(ffmpeg_path) else shutil.which(ffmpeg_path)
+    if not resolved or not os.path.exists(resolved):
+        raise FFmpegNotFoundError(f"FFmpeg not found: {ffmpeg_path}")
+    return os.path.realpath(resolved)
+
+
+def binary_key(ffmpeg_path):
+    # path, mtime and size identify the binary without starting it; the version is stored next to them
+    resolved = resolve_ffmpeg(ffmpeg_path)
+    stat = os.stat(resolved)
+    return {"path": resolved, "mtime": stat.st_mtime, "size": stat.st_size}
+
+
+def run_ffmpeg(args, timeout=PROBE_TIMEOUT):
+    creationflags = subprocess.CREATE_NO_WINDOW if platform.system() == 'Windows' else 0
+    try:
+        return subprocess.run(args, stdin=subprocess.DEVNULL, capture_output=True, text=True,
+                              timeout=timeout, creationflags=creationflags)
+    except FileNotFoundError as e:
+        raise FFmpegNotFoundError(f"FFmpeg not found: {e}") from e
+    except subprocess.TimeoutExpired:
+        logger.warning(f"PROBE TIMED OUT: {' '.join(args)}")
+        return None
+
+
+def parse_component_list(text):
+    # lines look like " V....D libx264    libx264 H.264 ..." or " DE x11grab   X11 screen capture"
+    names = set()
+    in_list = False
+    for line in text.splitlines():
+        if line.strip().startswith("--"):
+            in_list = True
+            continue
+        parts = line.split()
+        if in_list and len(parts) >= 2:
+            names.add(parts[1])
+    return names
+
+
+def test_encoder(ffmpeg_path, codec):
+    result = run_ffmpeg([ffmpeg_path, "-hide_banner", "-loglevel", "error",
+                         "-f", "lavfi", "-i", "color=size=64x64:rate=1", "-frames:v", "1",
+                         "-c:v", codec, "-pix_fmt", "yuv420p", "-f", "null", "-"])
+    return result is not None and result.returncode == 0
+
+
+def capture_target(display=None):
+    # what the video device test grabs, and the key its result is cached under
+    if platform.system() == 'Windows':
+        return "desktop"
+    return display or os.getenv('DISPLAY') or ":0"
+
+
+def test_video_device(ffmpeg_path, display=None):
+    if platform.system() == 'Windows':
+        input_args = ["-f", "gdigrab", "-i", "desktop"]
+    else:
+        input_args = ["-f", "x11grab", "-i", capture_target(display)]
+    result = run_ffmpeg([ffmpeg_path, "-hide_banner", "-loglevel", "error"] + input_args
+                        + ["-frames:v", "1", "-f", "null", "-"])
+    return result is not None and result.returncode == 0
+
+
+def test_audio_device(ffmpeg_path):
+    if platform.system() == 'Windows':
+        # dshow needs a device name, being compiled in is all that can be checked without one
+        return None
+    result = run_ffmpeg([ffmpeg_path, "-hide_banner", "-loglevel", "error",
+                         "-f", "pulse", "-i", "default", "-t", "0.1", "-f", "null", "-"])
+    return result is not None and result.returncode == 0
+
+
+def device_names():
+    return ("gdigrab", "dshow") if platform.system() == 'Windows' else ("x11grab", "pulse")
+
+
+def probe_capabilities(ffmpeg_path, codecs=PROBED_CODECS):
+    # everything that only depends on the binary, cached until the binary changes
+    version = run_ffmpeg([ffmpeg_path, "-version"])
+    encoders = run_ffmpeg([ffmpeg_path, "-hide_banner", "-encoders"])
+    muxers = run_ffmpeg([ffmpeg_path, "-hide_banner", "-muxers"])
+    devices = run_ffmpeg([ffmpeg_path, "-hide_banner", "-devices"])
+
+    capabilities = {
+        "version": version.stdout.splitlines()[0] if version and version.stdout else None,
+        "encoders": sorted(parse_component_list(encoders.stdout)) if encoders else [],
+        "muxers": sorted(parse_component_list(muxers.stdout)) if muxers else [],
+        "devices": sorted(parse_component_list(devices.stdout)) if devices else []
+    }
+    capabilities["codecs"] = {codec: codec in capabilities["encoders"] and test_encoder(ffmpeg_path, codec)
+                              for codec in codecs}
+    logger.info(f"FFMPEG CAPABILITIES: codecs {capabilities['codecs']}")
+    return capabilities
+
+
+def probe_devices(ffmpeg_path, capabilities, display=None):
+    # whether the screen and the sound server can be opened right now, this depends on the session
+    video_device, audio_device = device_names()
+    devices = {"video_device": video_device in capabilities["devices"] and test_video_device(ffmpeg_path, display)}
+    if audio_device in capabilities["devices"]:
+        audio_works = test_audio_device(ffmpeg_path)
+        devices["audio_device"] = True if audio_works is None else audio_works
+    else:
+        devices["audio_device"] = False
+
+    logger.info(f"FFMPEG DEVICES ON {capture_target(display)}: {video_device} {devices['video_device']}, "
+                f"{audio_device} {devices['audio_device']}")
+    return devices
+
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if cache.get("cache_version") == CACHE_VERSION else {}
+
+
+def get_capabilities(ffmpeg_path, cache_path=None, refresh=False, display=None):
+    cache_path = cache_path or default_cache_path()
+    key = binary_key(ffmpeg_path)
+    cache = load_cache(cache_path)
+    entry = cache.get("binaries", {}).get(key["path"])
+    changed = refresh or not entry or entry.get("key") != key
+    if changed:
+        entry = {"key": key, "capabilities": probe_capabilities(ffmpeg_path), "devices": {}}
+
+    # device results are kept per display. A failed test is not final: the display or the sound server
+    # may simply not be up yet, so only that test runs again, the codec results stay cached
+    target = capture_target(display)
+    devices = entry["devices"].get(target)
+    if not devices or not devices.get("video_device"):
+        devices = probe_devices(ffmpeg_path, entry["capabilities"], display)
+        entry["devices"][target] = devices
+        changed = True
+
+    if changed:
+        cache.setdefault("binaries", {})[key["path"]] = entry
+        cache["cache_version"] = CACHE_VERSION
+        temp_path = f"{cache_path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, indent=2, sort_keys=True)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            logger.error(f"ERROR WRITING CAPABILITY CACHE: {e}")
+    return dict(entry["capabilities"], **devices)
+
+
+def working_codecs(capabilities, codecs=CODEC_OPTIONS):
+    return [codec for codec in codecs if capabilities.get("codecs", {}).get(codec)]
+
+
+def check_settings(settings, capabilities):
+    problems = []
+    codecs = [settings.codec]
+    if settings.capture_mode == "intermediate":
+        codecs.append(settings.intermediate_codec)
+    for codec in codecs:
+        if not capabilities.get("codecs", {}).get(codec):
+            problems.append(f"codec {codec} is not available in this ffmpeg")
+    return problems
@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# how long the pactl event stream has to be quiet before the sources are listed again
+SUBSCRIBE_DEBOUNCE = 0.3
+
+
+@dataclass
+class MonitorInfo:
+    x: int
+    y: int
+    width: int
+    height: int
+    name: Optional[str] = None
+    is_primary: Optional[bool] = None
+
+    @classmethod
+    def from_screeninfo(cls, monitor):
+        return cls(monitor.x, monitor.y, monitor.width, monitor.height,
+                   getattr(monitor, "name", None), getattr(monitor, "is_primary", None))
+
+
+@dataclass
+class AudioSource:
+    name: str
+    description: str
+
+    @property
+    def label(self):
+        return f"{self.description} ({self.name})"
+
+
+class DeviceCache:
+    # Last known audio sources and monitors, so the window can fill its combos before enumeration finishes
+    def __init__(self, path=None):
+        self.path = path or os.path.join(os.getcwd(), "devices.json")
+        self.data = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+
+    def audio_sources(self):
+        return [AudioSource(**source) for source in self.data.get("audio_sources", [])]
+
+    def audio_devices(self):
+        return list(self.data.get("audio_devices", []))
+
+    def monitors(self):
+        return [MonitorInfo(**monitor) for monitor in self.data.get("monitors", [])]
+
+    def update(self, **values):
+        changed = False
+        for key, value in values.items():
+            value = [asdict(item) if hasattr(item, "__dataclass_fields__") else item for item in value]
+            if self.data.get(key) != value:
+                self.data[key] = value
+                changed = True
+        if changed:
+            self.save()
+        return changed
+
+    def save(self):
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.error(f"ERROR WRITING DEVICE CACHE: {e}")
+
+
+def list_pulse_sources():
+    # pactl 16+ has machine-readable output, older versions only the text listing
+    try:
+        result = subprocess.run(["pactl", "-f", "json", "list", "sources"], capture_output=True, text=True,
+                                encoding='utf-8', errors='replace')
+    except FileNotFoundError:
+        logger.error("PACTL NOT FOUND, NO AUDIO SOURCES")
+        return []
+
+    if result.returncode == 0:
+        try:
+            return [AudioSource(source["name"], source.get("description") or source["name"])
+                    for source in json.loads(result.stdout)]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"UNEXPECTED PACTL JSON OUTPUT: {e}")
+
+    result = subprocess.run(["pactl", "list", "sources"], capture_output=True, text=True,
+                            encoding='utf-8', errors='replace')
+    return parse_pactl_sources(result.stdout)
+
+
+def parse_pactl_sources(text):
+    sources = []
+    current_name = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("Name:"):
+            current_name = line.split(":", 1)[1].strip()
+        elif line.startswith("Description:") and current_name:
+            sources.append(AudioSource(current_name, line.split(":", 1)[1].strip()))
+            current_name = None
+    return sources
+
+
+class PulseSourceWatcher:
+    # Follows `pactl subscribe` and calls on_change with the new source list whenever a source
+    # appears, disappears or changes, so hot-plugged devices show up without polling.
+    def __init__(self, on_change):
+        self.on_change = on_change
+        self.process = None
+        self.running = False
+        self.thread = None
+        self._changed = threading.Event()
+
+    def start(self):
+        try:
+            self.process = subprocess.Popen(["pactl", "subscribe"], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                            stderr=subprocess.DEVNULL, text=True, encoding='utf-8', errors='replace')
+        except FileNotFoundError:
+            logger.error("PACTL NOT FOUND, AUDIO HOT-PLUG IS DISABLED")
+            return False
+        self.running = True
+        threading.Thread(target=self._read_events, daemon=True).start()
+        self.thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.running = False
+        self._changed.set()
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+    def _read_events(self):
+        # lines look like "Event 'new' on source #52"
+        for line in self.process.stdout:
+            if " on source " in line or " on server " in line:
+                self._changed.set()
+        if self.running:
+            logger.warning("PACTL SUBSCRIBE EXITED, AUDIO HOT-PLUG IS DISABLED")
+
+    def _refresh_loop(self):
+        while self.running:
+            self._changed.wait()
+            # a device plug emits a burst of events, list the sources once after it settles
+            while self.running and self._changed.is_set():
+                self._changed.clear()
+                time.sleep(SUBSCRIBE_DEBOUNCE)
+            if not self.running:
+                return
+            try:
+                self.on_change(list_pulse_sources())
+            except Exception as e:
+                logger.error(f"ERROR REFRESHING AUDIO SOURCES: {e}")
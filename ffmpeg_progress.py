@@ -0,0 +1,153 @@
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+
+def _to_float(value, default=0.0):
+    try:
+        return float(value.strip().rstrip("x").replace("kbits/s", ""))
+    except (AttributeError, ValueError):
+        return default
+
+
+def _to_int(value, default=0):
+    try:
+        return int(value.strip())
+    except (AttributeError, ValueError):
+        return default
+
+
+@dataclass
+class EncoderMetrics:
+    frame: int = 0
+    fps: float = 0.0
+    speed: float = 0.0
+    bitrate_kbps: float = 0.0
+    total_size: int = 0
+    drop_frames: int = 0
+    dup_frames: int = 0
+    out_time: float = 0.0
+    # how far the audio device clock has moved away from the capture timestamps, None when not measured
+    drift_ms: Optional[float] = None
+    # frames waiting in ffmpeg's input queues (estimated from how far muxing lags wall time), the most
+    # seen in this part, and how often ffmpeg reported a full input queue
+    queue_frames: int = 0
+    queue_high_water: int = 0
+    queue_blocked: int = 0
+    # frames the Python screen grabber (capture_backend="mss") skipped because it or ffmpeg fell behind
+    grab_skipped: int = 0
+    # frames not encoded because the screen had not changed (skip_static_frames)
+    static_frames: int = 0
+    progress: str = ""
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def realtime(self):
+        # ffmpeg reports speed relative to the input clock, anything visibly below 1x means frames queue up
+        return self.speed >= 0.98
+
+    def summary(self):
+        summary = (f"frame={self.frame} fps={self.fps:.1f} speed={self.speed:.2f}x "
+                   f"bitrate={self.bitrate_kbps:.0f}kbits/s drop={self.drop_frames} dup={self.dup_frames} "
+                   f"out_time={self.out_time:.1f}s")
+        if self.queue_high_water or self.queue_blocked:
+            summary += f" queue={self.queue_frames} (max {self.queue_high_water}, full {self.queue_blocked}x)"
+        if self.grab_skipped:
+            summary += f" grab_skipped={self.grab_skipped}"
+        if self.static_frames:
+            summary += f" static={self.static_frames}"
+        if self.drift_ms is not None:
+            summary += f" drift={self.drift_ms:+.1f}ms"
+        return summary
+
+    def to_dict(self):
+        data = asdict(self)
+        data["realtime"] = self.realtime
+        return data
+
+
+class ProgressParser:
+    def __init__(self):
+        self.values = {}
+        self.latest = None
+
+    def feed(self, line):
+        if "=" not in line:
+            return None
+        key, value = line.split("=", 1)
+        key = key.strip()
+        self.values[key] = value.strip()
+        if key != "progress":
+            return None
+
+        self.latest = self._build(self.values)
+        self.values = {}
+        return self.latest
+
+    def _build(self, values):
+        if "out_time_us" in values:
+            out_time = _to_int(values["out_time_us"]) / 1000000
+        else:
+            out_time = _to_int(values.get("out_time_ms")) / 1000000
+        return EncoderMetrics(
+            frame=_to_int(values.get("frame")),
+            fps=_to_float(values.get("fps")),
+            speed=_to_float(values.get("speed")),
+            bitrate_kbps=_to_float(values.get("bitrate")),
+            total_size=_to_int(values.get("total_size")),
+            drop_frames=_to_int(values.get("drop_frames")),
+            dup_frames=_to_int(values.get("dup_frames")),
+            out_time=max(out_time, 0.0),
+            progress=values.get("progress", "")
+        )
+
+
+class DriftParser:
+    # Reads what astats + ametadata=mode=print write for every audio frame:
+    #   frame:12   pts:589824  pts_time:12.288
+    #   lavfi.astats.Overall.Number_of_samples=1024
+    # The timestamps follow the capture clock, the sample count follows the audio device's clock,
+    # so the difference between the two is how far the audio has drifted.
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.first_pts_time = None
+        self.pts_time = None
+        self.samples = 0
+        self.drift_ms = None
+
+    def feed(self, line):
+        line = line.strip()
+        if line.startswith("frame:"):
+            try:
+                self.pts_time = float(line.rsplit("pts_time:", 1)[1])
+            except (IndexError, ValueError):
+                self.pts_time = None
+            return None
+        if "Number_of_samples=" not in line or self.pts_time is None:
+            return None
+
+        if self.first_pts_time is None:
+            self.first_pts_time = self.pts_time
+        self.drift_ms = (self.samples / self.sample_rate - (self.pts_time - self.first_pts_time)) * 1000
+        # astats prints every value as a float, e.g. 1024.000000
+        self.samples += int(_to_float(line.split("=", 1)[1]))
+        return self.drift_ms
+
+
+def parse_progress_text(text):
+    parser = ProgressParser()
+    for line in text.splitlines():
+        parser.feed(line)
+    return parser.latest or EncoderMetrics()
+
+
+def write_metrics_file(path, metrics, extra=None):
+    data = metrics.to_dict()
+    if extra:
+        data.update(extra)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
@@ -0,0 +1,91 @@
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class JobRunner:
+    # Worker threads never touch Tk: results, errors and progress are queued and
+    # delivered on the Tk thread by a root.after poll that only runs while work is pending.
+    def __init__(self, root, max_workers=2, poll_interval=16, idle_interval=250):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.idle_interval = idle_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.events = queue.SimpleQueue()
+        self.active = 0
+        self.holders = 0
+        self._lock = threading.Lock()
+        self._polling = False
+        self._closed = False
+
+    def submit(self, fn, *args, on_done=None, on_error=None, **kwargs):
+        with self._lock:
+            self.active += 1
+        self.executor.submit(self._run, fn, args, kwargs, on_done, on_error)
+        self._ensure_polling()
+
+    def call_soon(self, callback, *args):
+        self.events.put((callback, args))
+        if threading.current_thread() is threading.main_thread():
+            self._ensure_polling()
+
+    def hold(self):
+        # long-lived producers (device watchers) deliver with call_soon from their own threads,
+        # a slow poll keeps running for them while no job is active
+        with self._lock:
+            self.holders += 1
+        self._ensure_polling()
+
+    def release(self):
+        with self._lock:
+            self.holders = max(0, self.holders - 1)
+
+    def busy(self):
+        return self.active > 0
+
+    def shutdown(self, wait=False):
+        self._closed = True
+        self.executor.shutdown(wait=wait)
+
+    def _run(self, fn, args, kwargs, on_done, on_error):
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"BACKGROUND JOB {getattr(fn, '__name__', fn)} FAILED: {e}")
+            if on_error:
+                self.events.put((on_error, (e,)))
+        else:
+            if on_done:
+                self.events.put((on_done, (result,)))
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def _ensure_polling(self):
+        if not self._polling and not self._closed:
+            self._polling = True
+            self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        while True:
+            try:
+                callback, args = self.events.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error(f"ERROR IN JOB CALLBACK: {e}")
+
+        if self._closed:
+            self._polling = False
+            return
+        if self.active or not self.events.empty():
+            self.root.after(self.poll_interval, self._poll)
+        elif self.holders:
+            self.root.after(self.idle_interval, self._poll)
+        else:
+            self._polling = False
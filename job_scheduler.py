@@ -0,0 +1,259 @@
+import datetime
+import logging
+import os
+import threading
+import time
+from configparser import ConfigParser
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+from recorder_engine import FORMAT_OPTIONS, RecorderEngine, RecorderError, RecordingSettings, default_ffmpeg_path
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+DAY_GROUPS = {
+    "daily": set(range(7)),
+    "weekdays": set(range(5)),
+    "weekends": {5, 6}
+}
+# ffmpeg is started this many seconds before a job so its startup never eats into the recording
+DEFAULT_LEAD_TIME = 3.0
+
+
+@dataclass
+class RecordingJob:
+    name: str
+    start: datetime.time
+    end: datetime.time
+    days: Optional[set] = None
+    date: Optional[datetime.date] = None
+    fps: int = 30
+    bitrate: str = "1000k"
+    codec: str = "libx264"
+    format: str = "mkv"
+    # first source is the main track, the rest are recorded as separate tracks
+    audio: Tuple[str, ...] = ()
+    audio_codec: Optional[str] = None
+    monitor: Optional[int] = None
+    # x, y, width, height; relative to the monitor when one is given
+    area: Optional[Tuple[int, int, int, int]] = None
+
+
+@dataclass
+class JobRun:
+    job: RecordingJob
+    start: datetime.datetime
+    end: datetime.datetime
+    engine: RecorderEngine = field(default_factory=RecorderEngine)
+    output_path: Optional[str] = None
+    final_path: Optional[str] = None
+    # why the run produced no file, when it is known
+    error: Optional[str] = None
+
+
+def parse_time(value):
+    parts = [int(part) for part in value.strip().split(":")]
+    return datetime.time(*parts)
+
+
+def parse_days(value):
+    days = set()
+    for name in value.lower().replace(" ", "").split(","):
+        if name in DAY_GROUPS:
+            days |= DAY_GROUPS[name]
+        elif name[:3] in WEEKDAYS:
+            days.add(WEEKDAYS.index(name[:3]))
+        elif name:
+            raise ValueError(f"unknown day '{name}'")
+    return days
+
+
+def load_jobs(path):
+    # INI job file: one section per job, [DEFAULT] holds settings shared by all of them.
+    # Keys follow config.ini (fps, bitrate, codec, format, audio, monitor, area) but take values, not combo indices.
+    parser = ConfigParser()
+    if not parser.read(path, encoding='utf-8'):
+        raise RecorderError(f"Cannot read job file {path}")
+
+    jobs = []
+    for name in parser.sections():
+        section = parser[name]
+        try:
+            start = parse_time(section["start"])
+            if "end" in section:
+                end = parse_time(section["end"])
+            else:
+                minutes = section.getfloat("duration")
+                # jobs repeat daily, the stop time is a time of day and can't hold a day or more
+                if not 0 < minutes < 24 * 60:
+                    raise ValueError(f"duration must be more than 0 and less than 1440 minutes, got {minutes:g}")
+                end = (datetime.datetime.combine(datetime.date.today(), start)
+                       + datetime.timedelta(minutes=minutes)).time()
+            area = section.get("area")
+            job = RecordingJob(
+                name=name,
+                start=start,
+                end=end,
+                days=parse_days(section["days"]) if "days" in section else None,
+                date=datetime.date.fromisoformat(section["date"]) if "date" in section else None,
+                fps=section.getint("fps", 30),
+                bitrate=section.get("bitrate", "1000k"),
+                codec=section.get("codec", "libx264"),
+                format=section.get("format", "mkv"),
+                audio=tuple(source.strip() for source in section.get("audio", "").split(",") if source.strip()),
+                audio_codec=section.get("audio_codec") or None,
+                monitor=section.getint("monitor") if "monitor" in section else None,
+                area=tuple(int(part) for part in area.split(",")) if area else None
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise RecorderError(f"Invalid job [{name}] in {path}: {e}") from e
+        if job.format not in FORMAT_OPTIONS:
+            raise RecorderError(f"Invalid job [{name}] in {path}: format must be one of {', '.join(FORMAT_OPTIONS)}")
+        jobs.append(job)
+    return jobs
+
+
+def next_occurrence(job, now):
+    # the first run of the job that has not ended yet; a run that already started is returned as is
+    days = [job.date] if job.date else [now.date() + datetime.timedelta(days=offset) for offset in range(-1, 8)]
+    for day in days:
+        if job.days is not None and day.weekday() not in job.days:
+            continue
+        start = datetime.datetime.combine(day, job.start)
+        end = datetime.datetime.combine(day, job.end)
+        if end <= start:
+            end += datetime.timedelta(days=1)
+        if end > now:
+            return start, end
+    return None
+
+
+def job_area(job, monitors=None):
+    if job.monitor is None:
+        return job.area
+    if monitors is None:
+        # the scheduler records what fails as a failed run, which only works for RecorderError
+        try:
+            from screeninfo import get_monitors
+
+            monitors = get_monitors()
+        except Exception as e:
+            raise RecorderError(f"Job [{job.name}]: cannot list the monitors: {e}") from e
+    if not 1 <= job.monitor <= len(monitors):
+        raise RecorderError(f"Job [{job.name}]: there is no monitor {job.monitor}, found {len(monitors)}.")
+    monitor = monitors[job.monitor - 1]
+    if job.area:
+        x, y, width, height = job.area
+        return monitor.x + x, monitor.y + y, width, height
+    return monitor.x, monitor.y, monitor.width, monitor.height
+
+
+class JobScheduler:
+    # Every run gets its own ffmpeg, started lead_time seconds early and told to keep exactly the
+    # wall-clock window of the job. Overlapping and back-to-back jobs therefore never wait for each
+    # other's startup or teardown.
+    def __init__(self, jobs, output_folder, ffmpeg_path=None, lead_time=DEFAULT_LEAD_TIME):
+        self.jobs = jobs
+        self.output_folder = output_folder
+        self.ffmpeg_path = ffmpeg_path or default_ffmpeg_path()
+        self.lead_time = lead_time
+        self.active = []
+        self.finished = []
+        self.launched = set()
+        self.stop_event = threading.Event()
+
+    def settings_for(self, run):
+        job = run.job
+        return RecordingSettings(
+            output_path=run.output_path,
+            fps=job.fps,
+            bitrate=job.bitrate,
+            codec=job.codec,
+            audio_device=job.audio[0] if job.audio else None,
+            audio_tracks=job.audio[1:],
+            audio_codec=job.audio_codec,
+            area=job_area(job),
+            start_at=max(run.start.timestamp(), time.time()),
+            stop_at=run.end.timestamp(),
+            ffmpeg_path=self.ffmpeg_path
+        )
+
+    def upcoming(self, now=None):
+        now = now or datetime.datetime.now()
+        runs = []
+        for job in self.jobs:
+            occurrence = next_occurrence(job, now)
+            if occurrence:
+                runs.append((occurrence[0], occurrence[1], job))
+        return sorted(runs, key=lambda run: run[0])
+
+    def run(self):
+        os.makedirs(self.output_folder, exist_ok=True)
+        logger.info(f"SCHEDULER STARTED WITH {len(self.jobs)} JOB(S)")
+        try:
+            while not self.stop_event.is_set():
+                now = datetime.datetime.now()
+                upcoming = self.upcoming(now)
+                for start, end, job in upcoming:
+                    if (job.name, start) not in self.launched and start - now <= datetime.timedelta(seconds=self.lead_time):
+                        self._launch(job, start, end)
+                self._reap()
+
+                if not upcoming and not self.active:
+                    logger.info("NO JOBS LEFT TO RUN")
+                    break
+                self.stop_event.wait(self._sleep_time(upcoming))
+        finally:
+            self.stop()
+        return self.finished
+
+    def stop(self):
+        self.stop_event.set()
+        for run in list(self.active):
+            self._finish(run)
+
+    def _sleep_time(self, upcoming):
+        # wake up right when the next ffmpeg has to be started, and often enough to notice finished runs
+        sleep = 0.5
+        now = datetime.datetime.now()
+        for start, _, job in upcoming:
+            if (job.name, start) not in self.launched:
+                wait = (start - now).total_seconds() - self.lead_time
+                sleep = min(sleep, max(0.0, wait))
+        return sleep
+
+    def _launch(self, job, start, end):
+        self.launched.add((job.name, start))
+        run = JobRun(job, start, end)
+        run.output_path = os.path.join(self.output_folder, f"{job.name}.{start.strftime('%Y-%m-%d.%H.%M')}.{job.format}")
+        try:
+            settings = self.settings_for(run)
+            run.engine.start(settings)
+        except RecorderError as e:
+            logger.error(f"JOB [{job.name}] FAILED TO START: {e}")
+            # kept with the finished runs so the caller sees the failure
+            run.error = f"failed to start: {e}"
+            self.finished.append(run)
+            return
+        logger.info(f"JOB [{job.name}] ARMED FOR {start:%H:%M:%S}-{end:%H:%M:%S} -> {run.output_path}")
+        self.active.append(run)
+
+    def _reap(self):
+        for run in list(self.active):
+            if not run.engine.is_alive():
+                self._finish(run)
+
+    def _finish(self, run):
+        self.active.remove(run)
+        try:
+            run.final_path = run.engine.stop()
+        except RecorderError as e:
+            logger.error(f"JOB [{run.job.name}] FAILED: {e}")
+            run.error = str(e)
+        if run.final_path:
+            logger.info(f"JOB [{run.job.name}] SAVED {run.final_path}")
+        else:
+            logger.error(f"JOB [{run.job.name}] PRODUCED NO OUTPUT")
+            run.error = run.error or "no output"
+        self.finished.append(run)
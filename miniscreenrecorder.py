@@ -1,8 +1,13 @@
 #WINDOWS
 
+import sys
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] in ("record", "recover", "replay", "schedule", "remix"):
+    from recorder_cli import main
+    sys.exit(main())
+
 import json
 import platform
-import sys
 import tkinter as tk
 from tkinter import ttk, messagebox
 import subprocess
@@ -59,6 +64,10 @@ class ScreenRecorderApp:
 
         self.init_ui()
 
+        if self.audio_manager.from_cache:
+            self.audio_manager.revalidate_in_background()
+            self.root.after(500, self.apply_revalidated_audio_devices)
+
         self.create_output_folder()
         self.recording_process = None
         self.running = False
@@ -272,6 +281,21 @@ class ScreenRecorderApp:
         self.status_label.grid(row=16, column=0, columnspan=2, pady=5)
         self.status_label.config(font=("Arial", 10))
 
+    def apply_revalidated_audio_devices(self):
+        devices = self.audio_manager.revalidated
+        if devices is None:
+            self.root.after(500, self.apply_revalidated_audio_devices)
+            return
+
+        selected = self.audio_combo.get()
+        self.audio_manager.audio_devices = devices
+        self.audio_devices = devices
+        self.audio_combo['values'] = devices
+        if selected in devices:
+            self.audio_combo.set(selected)
+        elif devices:
+            self.audio_combo.current(0)
+
     def refresh_audio_devices(self):
         self.audio_manager.refresh_devices()
         self.audio_combo['values'] = self.audio_manager.audio_devices
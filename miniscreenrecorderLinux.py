@@ -1,30 +1,47 @@
 #DEBIAN
 
+import sys
+import time
+
+STARTUP_STARTED = time.perf_counter()
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] in ("record", "recover", "replay", "schedule", "remix"):
+    from recorder_cli import main
+    sys.exit(main())
+
 import locale
 import platform
-import sys
 import tkinter as tk
 from tkinter import ttk, messagebox
 import subprocess
 import threading
 import os
-import datetime
 import webbrowser
-import time
-import mss
-import numpy as np
-import cv2
 import logging
 
+from startup_profile import StartupProfile
+
+startup_profile = StartupProfile("--profile-startup" in sys.argv, STARTUP_STARTED)
+startup_profile.mark("import standard library and tkinter")
+
 from themes import set_dark_theme, set_light_theme, set_dark_blue_theme, set_light_green_theme, set_purple_theme, set_starry_night_theme
 from translation_manager import TranslationManager
 from area_selector import AreaSelector
 from logging_config import setup_logging
+from adaptive_controller import AdaptiveController
+from capability_probe import get_capabilities, working_codecs
+from device_cache import DeviceCache, MonitorInfo, PulseSourceWatcher, list_pulse_sources
+from job_runner import JobRunner
+from process_limits import parse_cpus
+from reencode_queue import ReencodeQueue, intermediate_settings
+from recorder_engine import (RecorderEngine, RecorderError, FFmpegNotFoundError, RecordingSettings, timestamp,
+                             default_ffmpeg_path, find_incomplete_recordings, recover_recording, split_output_paths,
+                             SCRATCH_DIR, FPS_OPTIONS, BITRATE_OPTIONS, CODEC_OPTIONS, FORMAT_OPTIONS, PREVIEW_SIZE)
 from configparser import ConfigParser
-from screeninfo import get_monitors
-from PIL import ImageGrab, Image, ImageTk
+# numpy, OpenCV, mss, Pillow and screeninfo are imported where they are first used (preview, monitor probe)
 
 logger = setup_logging()
+startup_profile.mark("import app modules")
 
 class ScreenRecorderApp:
     def __init__(self, root):
@@ -41,31 +58,59 @@ class ScreenRecorderApp:
         self.translation_manager = TranslationManager(self.config.get('Settings', 'language', fallback='en-US'))
         self.set_theme(self.config.get('Settings', 'theme', fallback='dark'))
 
-        self.audio_devices = self.get_audio_devices()
-        if len(self.audio_devices) == 0:
-            messagebox.showerror("Error", "No audio devices.")
-            return
+        # the last known devices fill the combos right away, live enumeration replaces them in the background
+        self.device_cache = DeviceCache()
+        self.audio_sources = self.device_cache.audio_sources()
+        self.audio_devices = [source.label for source in self.audio_sources]
+        self.monitors = self.device_cache.monitors()
+
+        startup_profile.mark("load config, translations and device cache")
 
-        self.monitors = self.get_monitors()
-        if len(self.monitors) == 0:
-            messagebox.showerror("Error", "No monitors found.")
-            return
-        
         self.set_icon()
 
         self.init_ui()
+        startup_profile.mark("build window")
 
         self.create_output_folder()
-        self.recording_process = None
+        self.job_runner = JobRunner(root)
+        if not self.monitors:
+            self.toggle_btn.config(state="disabled")
+        self.audio_watcher = PulseSourceWatcher(
+            lambda sources: self.job_runner.call_soon(self.on_audio_sources_changed, sources))
+        # device probes spawn processes and import screeninfo, they wait until the window is on screen
+        self.probes_started = False
+        self.root.bind("<Map>", self.on_window_mapped, add="+")
+
+        self.engine = RecorderEngine()
+        self.engine.add_preview_listener(self.on_recording_preview_frame)
+        self.reencode_queue = ReencodeQueue()
+        self.final_settings = None
+        if self.config.getboolean('Settings', 'adaptive', fallback=True):
+            self.adaptive_controller = AdaptiveController(self.engine)
         self.running = False
         self.elapsed_time = 0
         self.record_area = None
         self.area_selector = AreaSelector(root)
         self.preview_window = None
         self.preview_running = False
+        self.preview = None
 
-        self.current_video_part = 0
-        self.video_parts = []
+    def on_window_mapped(self, event):
+        if event.widget is not self.root or self.probes_started:
+            return
+        self.probes_started = True
+        startup_profile.mark("window mapped")
+        self.root.after_idle(self.start_device_probes)
+
+    def start_device_probes(self):
+        startup_profile.expect("audio devices loaded", "monitors loaded", "ffmpeg capabilities loaded")
+        self.job_runner.submit(self.get_audio_devices, on_done=self.on_audio_devices_loaded)
+        if self.audio_watcher.start():
+            self.job_runner.hold()
+        self.job_runner.submit(self.get_monitors, on_done=self.on_monitors_loaded, on_error=self.on_monitors_failed)
+        self.job_runner.submit(self.recover_incomplete_recordings)
+        self.job_runner.submit(get_capabilities, default_ffmpeg_path(), on_done=self.on_capabilities_loaded,
+                               on_error=self.on_capabilities_failed)
 
     def t(self, key):
         return self.translation_manager.t(key)
@@ -105,9 +150,24 @@ class ScreenRecorderApp:
             'monitor': self.monitor_combo.current(),
             'fps': self.fps_combo.current(),
             'bitrate': self.bitrate_combo.current(),
-            'codec': self.codec_combo.current(),
+            'codec': CODEC_OPTIONS.index(self.codec_combo.get()),
             'format': self.format_combo.current(),
-            'audio': self.audio_combo.current()
+            'audio': self.audio_combo.current(),
+            'adaptive': self.config.getboolean('Settings', 'adaptive', fallback=True),
+            'fast_capture': self.fast_capture_var.get(),
+            'preview_fps': self.config.getint('Settings', 'preview_fps', fallback=15),
+            'preview_from_recording': self.config.getboolean('Settings', 'preview_from_recording', fallback=True),
+            'audio_tracks': self.config.get('Settings', 'audio_tracks', fallback=''),
+            'audio_codec': self.config.get('Settings', 'audio_codec', fallback=''),
+            'capture_backend': self.config.get('Settings', 'capture_backend', fallback='ffmpeg'),
+            'skip_static_frames': self.config.getboolean('Settings', 'skip_static_frames', fallback=False),
+            'max_size': self.config.get('Settings', 'max_size', fallback=''),
+            'scaler': self.config.get('Settings', 'scaler', fallback='bicubic'),
+            'nice': self.config.getint('Settings', 'nice', fallback=0),
+            'ionice': self.config.get('Settings', 'ionice', fallback=''),
+            'cpus': self.config.get('Settings', 'cpus', fallback=''),
+            'threads': self.config.getint('Settings', 'threads', fallback=0),
+            'cpu_quota': self.config.get('Settings', 'cpu_quota', fallback='')
         }
         with open(self.config_file, 'w') as configfile:
             self.config.write(configfile)
@@ -124,7 +184,22 @@ class ScreenRecorderApp:
                 'bitrate': 0,
                 'codec': 0,
                 'format': 0,
-                'audio': 0
+                'audio': 0,
+                'adaptive': True,
+                'fast_capture': False,
+                'preview_fps': 15,
+                'preview_from_recording': True,
+                'audio_tracks': '',
+                'audio_codec': '',
+                'capture_backend': 'ffmpeg',
+                'skip_static_frames': False,
+                'max_size': '',
+                'scaler': 'bicubic',
+                'nice': 0,
+                'ionice': '',
+                'cpus': '',
+                'threads': 0,
+                'cpu_quota': ''
             }
             with open(self.config_file, 'w') as configfile:
                 self.config.write(configfile)
@@ -184,15 +259,16 @@ class ScreenRecorderApp:
 
         self.monitor_label = ttk.Label(self.root, text=self.t("monitor") + ":")
         self.monitor_label.grid(row=2, column=0, padx=10, pady=5, sticky="e")
-        self.monitor_combo = ttk.Combobox(self.root, values=[f"Monitor {i+1}: ({monitor.width}x{monitor.height})" for i, monitor in enumerate(self.monitors)], width=25)
+        self.monitor_combo = ttk.Combobox(self.root, values=self.monitor_labels(), width=25)
         self.monitor_combo.grid(row=2, column=1, padx=10, pady=5, sticky="w")
-        self.monitor_combo.current(0)
+        if self.monitors:
+            self.monitor_combo.current(0)
         self.monitor_combo.config(state="readonly")
         self.monitor_combo.bind("<<ComboboxSelected>>", self.on_monitor_change)
 
         self.fps_label = ttk.Label(self.root, text=self.t("framerate") + ":")
         self.fps_label.grid(row=3, column=0, padx=10, pady=5, sticky="e")
-        self.fps_combo = ttk.Combobox(self.root, values=["30", "60"], width=25)
+        self.fps_combo = ttk.Combobox(self.root, values=FPS_OPTIONS, width=25)
         self.fps_combo.grid(row=3, column=1, padx=10, pady=5, sticky="w")
         self.fps_combo.current(self.config.getint('Settings', 'fps'))
         self.fps_combo.config(state="readonly")
@@ -200,7 +276,7 @@ class ScreenRecorderApp:
         
         self.bitrate_label = ttk.Label(self.root, text=self.t("bitrate") + ":")
         self.bitrate_label.grid(row=4, column=0, padx=10, pady=5, sticky="e")
-        self.bitrate_combo = ttk.Combobox(self.root, values=["1000k", "2000k", "4000k", "6000k", "8000k", "10000k", "15000k", "20000k"], width=25)
+        self.bitrate_combo = ttk.Combobox(self.root, values=BITRATE_OPTIONS, width=25)
         self.bitrate_combo.grid(row=4, column=1, padx=10, pady=5, sticky="w")
         self.bitrate_combo.current(self.config.getint('Settings', 'bitrate'))
         self.bitrate_combo.config(state="readonly")
@@ -208,15 +284,15 @@ class ScreenRecorderApp:
 
         self.codec_label = ttk.Label(self.root, text=self.t("video_codec") + ":")
         self.codec_label.grid(row=5, column=0, padx=10, pady=5, sticky="e")
-        self.codec_combo = ttk.Combobox(self.root, values=["libx264", "libx265"], width=25)
+        self.codec_combo = ttk.Combobox(self.root, values=CODEC_OPTIONS, width=25)
         self.codec_combo.grid(row=5, column=1, padx=10, pady=5, sticky="w")
-        self.codec_combo.current(self.config.getint('Settings', 'codec'))
+        self.codec_combo.set(CODEC_OPTIONS[self.config.getint('Settings', 'codec', fallback=0) % len(CODEC_OPTIONS)])
         self.codec_combo.config(state="readonly")
         self.codec_combo.bind("<<ComboboxSelected>>", self.save_config)
         
         self.format_label = ttk.Label(self.root, text=self.t("output_format") + ":")
         self.format_label.grid(row=6, column=0, padx=10, pady=5, sticky="e")
-        self.format_combo = ttk.Combobox(self.root, values=["mkv", "mp4"], width=25)
+        self.format_combo = ttk.Combobox(self.root, values=FORMAT_OPTIONS, width=25)
         self.format_combo.grid(row=6, column=1, padx=10, pady=5, sticky="w")
         self.format_combo.current(self.config.getint('Settings', 'format'))
         self.format_combo.config(state="readonly")
@@ -226,13 +302,10 @@ class ScreenRecorderApp:
         self.audio_label.grid(row=7, column=0, padx=10, pady=5, sticky="e")
         self.audio_combo = ttk.Combobox(self.root, values=self.audio_devices, width=25)
         self.audio_combo.grid(row=7, column=1, padx=10, pady=5, sticky="w")
-        self.audio_combo.current(self.config.getint('Settings', 'audio'))
-        self.audio_combo.config(state="readonly")
-        self.audio_combo.bind("<<ComboboxSelected>>", self.save_config)
         if self.audio_devices:
             self.audio_combo.current(0)
-        else:
-            messagebox.showerror(self.t("error"), self.t("error_no_audio_devices"))
+        self.audio_combo.config(state="readonly")
+        self.audio_combo.bind("<<ComboboxSelected>>", self.save_config)
 
         self.volume_label = ttk.Label(self.root, text=self.t("volume") + ":")
         self.volume_label.grid(row=8, column=0, padx=10, pady=5, sticky="e")
@@ -240,32 +313,36 @@ class ScreenRecorderApp:
         self.volume_scale.set(100)
         self.volume_scale.grid(row=8, column=1, padx=10, pady=5, sticky="w")
 
+        self.fast_capture_var = tk.BooleanVar(value=self.config.getboolean('Settings', 'fast_capture', fallback=False))
+        self.fast_capture_check = ttk.Checkbutton(self.root, text=self.t("fast_capture"), variable=self.fast_capture_var, command=self.save_config)
+        self.fast_capture_check.grid(row=9, column=0, columnspan=2, pady=2)
+
         self.toggle_btn = ttk.Button(self.root, text=self.t("start_recording"), command=self.toggle_recording)
-        self.toggle_btn.grid(row=9, column=0, columnspan=2, pady=2)
+        self.toggle_btn.grid(row=10, column=0, columnspan=2, pady=2)
 
         self.open_folder_btn = ttk.Button(self.root, text=self.t("open_output_folder"), command=self.open_output_folder)
-        self.open_folder_btn.grid(row=10, column=0, columnspan=2, pady=2)
+        self.open_folder_btn.grid(row=11, column=0, columnspan=2, pady=2)
 
         self.select_area_btn = ttk.Button(self.root, text=self.t("select_recording_area"), command=self.select_area)
-        self.select_area_btn.grid(row=11, column=0, columnspan=2, pady=2)
+        self.select_area_btn.grid(row=12, column=0, columnspan=2, pady=2)
 
         self.preview_btn = ttk.Button(self.root, text=self.t("start_preview"), command=self.toggle_preview_monitor)
-        self.preview_btn.grid(row=12, column=0, columnspan=2, pady=2)
+        self.preview_btn.grid(row=13, column=0, columnspan=2, pady=2)
 
         self.preview_frame = ttk.Frame(self.root)
-        self.preview_frame.grid(row=13, column=0, columnspan=2, pady=5, padx=10)
+        self.preview_frame.grid(row=14, column=0, columnspan=2, pady=5, padx=10)
         self.preview_label = ttk.Label(self.preview_frame)
         self.preview_label.pack()
 
         self.timer_label = ttk.Label(self.root, text="00:00:00")
-        self.timer_label.grid(row=14, column=0, columnspan=2, pady=10)
+        self.timer_label.grid(row=15, column=0, columnspan=2, pady=10)
         self.timer_label.config(font=("Arial", 13))
 
         self.info_btn = ttk.Button(self.root, text=self.t("about"), command=self.show_info)
-        self.info_btn.grid(row=15, column=0, columnspan=2, pady=2)
+        self.info_btn.grid(row=16, column=0, columnspan=2, pady=2)
 
         self.status_label = ttk.Label(self.root, text=self.t("status_ready"))
-        self.status_label.grid(row=16, column=0, columnspan=2, pady=5)
+        self.status_label.grid(row=17, column=0, columnspan=2, pady=5)
         self.status_label.config(font=("Arial", 10))
 
     def toggle_preview_monitor(self):
@@ -278,49 +355,41 @@ class ScreenRecorderApp:
             self.preview_btn.config(text=self.t("stop_preview"))
 
     def update_preview_loop(self):
-        self.preview_thread = threading.Thread(target=self._update_preview_thread, daemon=True)
-        self.preview_thread.start()
-
-    def _update_preview_thread(self):
-        with mss.mss() as sct:
-            while self.preview_running:
-                try:
-                    if self.monitor_combo and self.monitor_combo.winfo_exists():
-                        monitor_index = self.monitor_combo.current()
-                    else:
-                        break
-                    
-                    if monitor_index < len(sct.monitors) - 1:
-                        monitor = sct.monitors[monitor_index + 1]
-                    else:
-                        return
-
-                    screenshot = np.array(sct.grab(monitor))
-                    screenshot = cv2.cvtColor(screenshot, cv2.COLOR_RGBA2RGB)
-                    screenshot = cv2.cvtColor(screenshot, cv2.COLOR_BGR2RGB)
-
-                    max_size = (400, 240)
-                    screenshot = cv2.resize(screenshot, max_size, interpolation=cv2.INTER_AREA)
-
-                    image = Image.fromarray(screenshot)
-                    tk_image = ImageTk.PhotoImage(image=image)
-
-                    if self.preview_label and self.preview_label.winfo_exists():
-                        self.root.after(0, self._update_preview_label, tk_image)
-
-                    time.sleep(0.03)
-                except tk.TclError:
-                    break
-                
-    def _update_preview_label(self, tk_image):
-        if self.preview_running:
-            self.preview_label.config(image=tk_image)
-            self.preview_label.image = tk_image
+        if not self.preview:
+            # numpy, OpenCV and mss are only needed once the preview is opened
+            startup = time.perf_counter()
+            from preview import PreviewPipeline
+            logger.info(f"PREVIEW MODULES IMPORTED IN {(time.perf_counter() - startup) * 1000:.0f} ms")
+            self.preview = PreviewPipeline(self.root, self.preview_label,
+                                           fps=self.config.getint('Settings', 'preview_fps', fallback=15))
+        self.preview.monitor_index = max(0, self.monitor_combo.current())
+        self.update_preview_region()
+        self.preview.use_external_frames(self.recording_feeds_preview())
+        self.preview.start()
+
+    def update_preview_region(self):
+        if not self.preview:
+            return
+        if self.record_area:
+            x1, y1, x2, y2 = self.record_area
+            self.preview.region = (x1, y1, x2 - x1, y2 - y1) if x2 > x1 and y2 > y1 else None
+        else:
+            self.preview.region = None
+
+    def recording_feeds_preview(self):
+        settings = self.engine.settings
+        return self.engine.is_alive() and settings is not None and bool(settings.preview_size)
+
+    def on_recording_preview_frame(self, frame):
+        # runs on ffmpeg's preview reader thread, the pipeline only copies the frame into a buffer
+        preview = self.preview
+        if preview:
+            preview.feed(frame)
 
     def close_preview(self):
         self.preview_running = False
-        if hasattr(self, 'preview_thread'):
-            self.preview_thread.join(timeout=1.0)
+        if self.preview:
+            self.preview.stop()
         self.preview_label.config(image='')
         self.preview_label.image = None
 
@@ -330,44 +399,24 @@ class ScreenRecorderApp:
         self.root.destroy()
 
     def on_monitor_change(self, event=None):
+        if self.preview:
+            self.preview.monitor_index = max(0, self.monitor_combo.current())
         if self.running:
-            self.stop_current_recording()
-            self.start_new_recording()
+            # next_part waits for a previous switch to finish, keep that off the Tk thread
+            self.job_runner.submit(self.engine.next_part, self.build_recording_settings(),
+                                   on_error=self.on_monitor_switch_failed)
         self.save_config()
 
-    def start_new_recording(self):
-        self.create_new_video_file()
-        self.start_recording(continue_timer=True)
-
-    def create_new_video_file(self):
-        video_name = f"Video_part{self.current_video_part}.{datetime.datetime.now().strftime('%m-%d-%Y.%H.%M.%S')}.mkv"
-        self.video_path = os.path.join(self.output_folder, video_name)
-
-    def stop_current_recording(self):
-        if self.recording_process:
-            try:
-                self.recording_process.stdin.write('q')
-                self.recording_process.stdin.flush()
-            except (BrokenPipeError, OSError):
-                pass
-            try:
-                self.recording_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                self.recording_process.terminate()
-                try:
-                    self.recording_process.wait(timeout=2)
-                except subprocess.TimeoutExpired:
-                    self.recording_process.kill()
-
-            if os.path.exists(self.video_path) and os.path.getsize(self.video_path) > 0:
-                self.video_parts.append(self.video_path)
-            self.current_video_part += 1
-            self.recording_process = None
+    def on_monitor_switch_failed(self, error):
+        logger.error(f"ERROR SWITCHING MONITOR: {error}")
+        if self.running:
+            self.update_status_label_error_recording(self.t("error_recording"))
 
     def toggle_recording(self):
         if not self.running:
             self.start_recording()
-            self.toggle_btn.config(text=self.t("stop_recording"))
+            if self.running:
+                self.toggle_btn.config(text=self.t("stop_recording"))
         else:
             self.stop_recording()
             self.toggle_btn.config(text=self.t("start_recording"))
@@ -377,6 +426,14 @@ class ScreenRecorderApp:
         if not os.path.exists(self.output_folder):
             os.makedirs(self.output_folder)
 
+    def recover_incomplete_recordings(self):
+        for manifest in find_incomplete_recordings(self.output_folder):
+            try:
+                output_paths = recover_recording(manifest)
+                logger.info(f"RECOVERED INTERRUPTED RECORDING: {', '.join(output_paths)}")
+            except (RecorderError, OSError) as e:
+                logger.error(f"ERROR RECOVERING {manifest}: {e}")
+
     def _normalize_audio_device_name(self, audio_device):
         encodings_to_try = ['utf-8', 'latin-1', 'cp1252']
 
@@ -390,38 +447,111 @@ class ScreenRecorderApp:
         return audio_device
 
     def get_audio_devices(self):
-        devices = []
+        sources = []
         if platform.system() == 'Linux':
-            cmd = ["pactl", "list", "sources"]
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace')
-            lines = result.stdout.splitlines()
-
-            current_device = None
-            for line in lines:
-                if "Name:" in line:
-                    parts = line.split()
-                    if len(parts) > 1:
-                        current_device = parts[1]
-                elif "Description:" in line and current_device:
-                    description = line.split(":", 1)[1].strip()
-                    normalized_name = self._normalize_audio_device_name(current_device)
-                    devices.append(f"{description} ({normalized_name})")
-                    current_device = None
-
-        if not devices:
+            for source in list_pulse_sources():
+                source.name = self._normalize_audio_device_name(source.name)
+                sources.append(source)
+        return sources
+
+    def on_audio_devices_loaded(self, sources):
+        self.on_audio_sources_changed(sources)
+        startup_profile.done("audio devices loaded")
+        if not sources:
             logger.error("No active audio devices were found. Please check your audio settings.")
-            messagebox.showerror("Error", "No active audio devices were found. Please check your audio settings.")
+            messagebox.showerror(self.t("error"), self.t("error_no_audio_devices"))
+
+    def on_audio_sources_changed(self, sources):
+        selected = self.audio_combo.get()
+        self.audio_sources = sources
+        self.audio_devices = [source.label for source in sources]
+        self.audio_combo['values'] = self.audio_devices
+        if selected in self.audio_devices:
+            self.audio_combo.set(selected)
+        elif self.audio_devices:
+            if selected and not self.running:
+                logger.warning(f"AUDIO DEVICE {selected} IS GONE, USING {self.audio_devices[0]}")
+            self.audio_combo.current(0)
+        else:
+            self.audio_combo.set("")
+        self.device_cache.update(audio_sources=sources)
+
+    def extra_audio_tracks(self):
+        # pulse source names, comma separated; @DEFAULT_MONITOR@ is whatever is playing on the default output
+        value = self.config.get('Settings', 'audio_tracks', fallback='')
+        return tuple(name.strip() for name in value.split(",") if name.strip())
+
+    def max_output_size(self):
+        # WIDTHxHEIGHT the recording is shrunk to fit, empty records at the native size
+        value = self.config.get('Settings', 'max_size', fallback='').lower()
+        try:
+            width, height = (int(part) for part in value.split("x"))
+        except ValueError:
+            return None
+        return (width, height) if width >= 2 and height >= 2 else None
+
+    def encoder_cpus(self):
+        # cores ffmpeg is pinned to, e.g. 0-3,6; empty lets it run anywhere
+        try:
+            return parse_cpus(self.config.get('Settings', 'cpus', fallback='')) or None
+        except ValueError:
+            return None
+
+    def encoder_cpu_quota(self):
+        # percent of one core, empty means no cgroup limit
+        value = self.config.get('Settings', 'cpu_quota', fallback='').strip().rstrip('%')
+        return int(value) if value.isdigit() else None
+
+    def selected_audio_source(self):
+        index = self.audio_combo.current()
+        return self.audio_sources[index].name if 0 <= index < len(self.audio_sources) else None
 
-        return devices
-    
     def get_monitors(self):
-        return get_monitors()
+        from screeninfo import get_monitors
+
+        return [MonitorInfo.from_screeninfo(monitor) for monitor in get_monitors()]
+
+    def monitor_labels(self):
+        return [f"Monitor {i+1}: ({monitor.width}x{monitor.height})" for i, monitor in enumerate(self.monitors)]
+
+    def on_monitors_loaded(self, monitors):
+        startup_profile.done("monitors loaded")
+        selected = self.monitor_combo.current()
+        self.monitors = monitors
+        if not monitors:
+            messagebox.showerror("Error", "No monitors found.")
+            return
+        self.monitor_combo['values'] = self.monitor_labels()
+        self.monitor_combo.current(selected if 0 <= selected < len(monitors) else 0)
+        if not self.running:
+            self.toggle_btn.config(state="normal")
+        self.device_cache.update(monitors=monitors)
+
+    def on_capabilities_loaded(self, capabilities):
+        startup_profile.done("ffmpeg capabilities loaded")
+        # only offer the codecs that passed a test encode with this ffmpeg
+        codecs = working_codecs(capabilities)
+        if codecs:
+            selected = self.codec_combo.get()
+            self.codec_combo['values'] = codecs
+            self.codec_combo.set(selected if selected in codecs else codecs[0])
+        if not capabilities.get("video_device"):
+            self.status_label.config(text=self.t("error_capture_unavailable"))
+
+    def on_capabilities_failed(self, error):
+        startup_profile.done("ffmpeg capabilities loaded")
+        logger.error(f"ERROR PROBING FFMPEG: {error}")
+
+    def on_monitors_failed(self, error):
+        startup_profile.done("monitors loaded")
+        messagebox.showerror("Error", "No monitors found.")
 
     def select_area(self):
         self.area_selector.select_area(self.set_record_area)
 
     def set_record_area(self, record_area):
         self.record_area = record_area
+        self.update_preview_region()
         if self.record_area:
             self.preview_record_area()
 
@@ -438,19 +568,41 @@ class ScreenRecorderApp:
         preview_canvas.create_rectangle(0, 0, width, height, outline='red', width=2)
         preview_window.after(1000, preview_window.destroy)      
 
-    def start_recording(self, continue_timer=False):
-        video_name = f"Video.{datetime.datetime.now().strftime('%m-%d-%Y.%H.%M.%S')}.{self.format_combo.get()}"
-        self.video_path = os.path.join(self.output_folder, video_name)
-
-        fps = int(self.fps_combo.get())
-        bitrate = self.bitrate_combo.get()
-        codec = self.codec_combo.get()
-        audio_device = self.audio_combo.get()
-        volume = self.volume_scale.get()
-
-        monitor_index = self.monitor_combo.current()
-        monitor = self.monitors[monitor_index]
+    def build_recording_settings(self, output_path=None):
+        monitor = self.monitors[self.monitor_combo.current()]
 
+        if self.record_area:
+            x1, y1, x2, y2 = self.record_area
+            area = (x1 + monitor.x, y1 + monitor.y, x2 - x1, y2 - y1)
+        else:
+            area = (monitor.x, monitor.y, monitor.width, monitor.height)
+
+        return RecordingSettings(
+            output_path=output_path or self.engine.settings.output_path,
+            fps=int(self.fps_combo.get()),
+            bitrate=self.bitrate_combo.get(),
+            codec=self.codec_combo.get(),
+            audio_device=self.selected_audio_source(),
+            audio_tracks=self.extra_audio_tracks(),
+            audio_codec=self.config.get('Settings', 'audio_codec', fallback='') or None,
+            volume=self.volume_scale.get(),
+            area=area,
+            capture_mode="intermediate" if self.fast_capture_var.get() else "direct",
+            capture_backend=self.config.get('Settings', 'capture_backend', fallback='ffmpeg'),
+            skip_static_frames=self.config.getboolean('Settings', 'skip_static_frames', fallback=False),
+            max_size=self.max_output_size(),
+            scaler=self.config.get('Settings', 'scaler', fallback='bicubic'),
+            nice=self.config.getint('Settings', 'nice', fallback=0),
+            ionice=self.config.get('Settings', 'ionice', fallback='') or None,
+            cpu_affinity=self.encoder_cpus(),
+            threads=self.config.getint('Settings', 'threads', fallback=0),
+            cpu_quota=self.encoder_cpu_quota(),
+            metrics_path=os.path.join(os.getcwd(), "metrics.json"),
+            preview_size=PREVIEW_SIZE if self.config.getboolean('Settings', 'preview_from_recording', fallback=True) else None,
+            preview_fps=self.config.getint('Settings', 'preview_fps', fallback=15)
+        )
+
+    def start_recording(self):
         if self.record_area:
             x1, y1, x2, y2 = self.record_area
             width = x2 - x1
@@ -459,9 +611,7 @@ class ScreenRecorderApp:
             if width <= 0 or height <= 0:
                 messagebox.showerror(self.t("error"), self.t("error_invalid_area"))
                 self.update_status_label_error_recording(self.t("error_recording"))
-                self.stop_recording()
-                self.stop_timer()
-                self.toggle_widgets()
+                self.abort_recording()
                 return
 
             width -= width % 2
@@ -469,188 +619,133 @@ class ScreenRecorderApp:
             if width <= 0 or height <= 0:
                 messagebox.showerror(self.t("error"), self.t("error_adjusted_area"))
                 self.update_status_label_error_recording(self.t("error_recording"))
-                self.stop_recording()
-                self.stop_timer()
-                self.toggle_widgets()
+                self.abort_recording()
                 return
-        else:
-            x1 = y1 = 0
-            width = monitor.width
-            height = monitor.height
-
-        display = os.getenv('DISPLAY')
-        ffmpeg_args = [
-            "ffmpeg",
-            "-f", "x11grab",
-            "-framerate", str(fps),
-            "-video_size", f"{width}x{height}",
-            "-i", f"{display}+{x1+monitor.x},{y1+monitor.y}",
-            "-f", "pulse",
-            "-i", audio_device,
-            "-filter:a", f"volume={volume/100}",
-            "-threads", "0",
-            "-pix_fmt", "yuv420p",
-            "-loglevel", "info",
-            "-hide_banner"
-        ]
-
-        if codec == "libx264":
-            ffmpeg_args.extend([
-                "-c:v", "libx264",
-                "-preset", "veryfast",
-                "-b:v", bitrate,
-            ])
-        elif codec == "libx265":
-            ffmpeg_args.extend([
-                "-c:v", "libx265",
-                "-preset", "medium",
-                "-b:v", bitrate,
-            ])
-        else:
-            ffmpeg_args.extend([
-                "-c:v", codec,
-                "-b:v", bitrate,
-            ])
 
-        ffmpeg_args.append(self.video_path)
+        output_path = os.path.join(self.output_folder, f"Video_{timestamp()}.{self.format_combo.get()}")
+
+        settings = self.build_recording_settings(output_path)
+        self.final_settings = None
+        if settings.capture_mode == "intermediate":
+            self.final_settings = settings
+            settings = intermediate_settings(settings, os.path.join(self.output_folder, SCRATCH_DIR))
 
         try:
-            self.recording_process = subprocess.Popen(
-                ffmpeg_args, 
-                stdin=subprocess.PIPE, 
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE, 
-                universal_newlines=True
-            )
-        except FileNotFoundError as e:
+            self.engine.start(settings)
+        except FFmpegNotFoundError as e:
             messagebox.showerror("Error", f"FFmpeg not found.")
             self.update_status_label_error_recording(self.t("error_recording"))
             logger.error(f"FFmpeg not found: {e}")
-            self.stop_recording()
-            self.stop_timer()
-            self.toggle_widgets()
-        except Exception as e:
+            self.abort_recording()
+            return
+        except RecorderError as e:
             messagebox.showerror("Error", f"An error has occurred.")
             self.update_status_label_error_recording(self.t("error_recording"))
             logger.error(f"Error starting recording: {e}")
-            self.stop_recording()
-            self.stop_timer()
-            self.toggle_widgets()
+            self.abort_recording()
+            return
+
+        if self.preview:
+            self.preview.use_external_frames(self.recording_feeds_preview())
 
         self.toggle_widgets(recording=True)
         self.status_label.config(text=self.t("status_recording"))
+        self.start_timer()
 
-        if not continue_timer:
-            self.start_timer()
-
-        threading.Thread(target=self.read_ffmpeg_output, daemon=True).start()
-
+    def abort_recording(self):
+        # nothing was recorded, undo what start_recording changed but keep the error in the status bar
+        self.final_settings = None
+        self.record_area = None
+        self.update_preview_region()
+        self.stop_timer()
+        self.toggle_widgets(recording=False)
+        if self.preview:
+            self.preview.use_external_frames(False)
 
     def update_status_label_error_recording(self, text):
         self.status_label.after(0, lambda: self.status_label.config(text=text))
 
-    def stop_recording(self):
-        if self.recording_process:
-            try:
-                self.recording_process.stdin.write('q')
-                self.recording_process.stdin.flush()
-            except (BrokenPipeError, OSError):
-                pass
+    def stop_recording(self, on_stopped=None):
+        elapsed = self.engine.status().elapsed
+        final_settings = self.final_settings
+        self.final_settings = None
 
-            try:
-                self.recording_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                self.recording_process.terminate()
-                try:
-                    self.recording_process.wait(timeout=2)
-                except subprocess.TimeoutExpired:
-                    self.recording_process.kill()
-
-            for pipe in [self.recording_process.stdin, self.recording_process.stdout, self.recording_process.stderr]:
-                try:
-                    pipe.close()
-                except:
-                    pass
-
-            if os.path.exists(self.video_path) and os.path.getsize(self.video_path) > 0:
-                self.video_parts.append(self.video_path)
-
-            self.recording_process = None
-
-        self.concat_video_parts()
-        
-        self.toggle_widgets(recording=False)
         self.stop_timer()
-        self.status_label.config(text=self.t("status_ready"))
-        
         self.record_area = None
+        self.update_preview_region()
         self.running = False
+        self.toggle_btn.config(state="disabled")
+        self.status_label.config(text=self.t("status_saving"))
+        if self.preview:
+            self.preview.use_external_frames(False)
+
+        # waiting for ffmpeg and joining the parts can take a while, keep it off the Tk thread
+        self.job_runner.submit(
+            self.engine.stop,
+            on_done=lambda captured_path: self.on_recording_stopped(captured_path, final_settings, elapsed, on_stopped),
+            on_error=lambda error: self.on_recording_stop_failed(error, on_stopped)
+        )
+
+    def on_recording_stopped(self, captured_path, final_settings, elapsed, on_stopped=None):
+        self.toggle_widgets(recording=False)
+        self.toggle_btn.config(state="normal")
+        self.status_label.config(text=self.t("status_ready"))
 
-    def read_ffmpeg_output(self):
-        if self.recording_process:
-            buffer = []
-            try:
-                for stdout_line in iter(self.recording_process.stderr.readline, ""):
-                    buffer.append(stdout_line)
-                    if len(buffer) >= 100:
-                        logger.error("".join(buffer))
-                        buffer = []
-            except BrokenPipeError:
-                logger.warning("FFMPEG PROCESS HAS BEEN CLOSED")
-            except Exception as e:
-                logger.error(f"ERROR READING FFMPEG OUTPUT: {e}")
-                self.update_status_label_error_recording(self.t("error_recording"))
-            finally:
-                if buffer:
-                    logger.info("".join(buffer))
-                if self.recording_process and self.recording_process.stderr:
-                    self.recording_process.stderr.close()
-
-    def concat_video_parts(self):
-        if len(self.video_parts) > 0:
-            concat_file = os.path.join(self.output_folder, "concat_list.txt")     
-            output_file = os.path.join(self.output_folder, f"Video_{datetime.datetime.now().strftime('%m-%d-%Y.%H.%M.%S')}.{self.format_combo.get()}")
-
-            with open(concat_file, 'w') as f:
-                for video in self.video_parts:
-                    f.write(f"file '{os.path.basename(video)}'\n")
-            
-            concat_command = [
-                "ffmpeg",
-                "-f", "concat",
-                "-safe", "0",
-                "-i", concat_file,
-                "-c", "copy",
-                "-movflags", "+faststart",
-                output_file
-            ]
-            
-            try:
-                print(f"Executing command: {' '.join(concat_command)}")
-                result = subprocess.run(concat_command, check=True, capture_output=True, text=True)
-                print(f"FFmpeg output: {result.stderr}")
-                
-                os.remove(concat_file)
-                for video in self.video_parts:
-                    os.remove(video)
-                
-            except subprocess.CalledProcessError as e:
-                error_message = e.stderr.decode() if e.stderr else str(e)
-                messagebox.showerror(self.t("error"), self.t("error_concat_video").format(error=error_message))
-                logger.error(f"ERROR MERGING VIDEO: {error_message}")
-                self.update_status_label_error_recording(self.t("error_recording"))
+        if captured_path and final_settings:
+            # after a stream break the recording is in several files, each one gets its own re-encode
+            captured_paths = self.engine.output_paths
+            final_paths = split_output_paths(final_settings.output_path, len(captured_paths))
+            for captured, final_path in zip(captured_paths, final_paths):
+                self.reencode_queue.submit(captured, final_path, final_settings,
+                                           duration=elapsed if len(captured_paths) == 1 else None)
+            self.update_reencode_status()
+
+        if on_stopped:
+            on_stopped()
+
+    def on_recording_stop_failed(self, error, on_stopped=None):
+        self.toggle_widgets(recording=False)
+        self.toggle_btn.config(state="normal")
+        messagebox.showerror(self.t("error"), self.t("error_concat_video").format(error=error))
+        self.update_status_label_error_recording(self.t("error_recording"))
+
+        if on_stopped:
+            on_stopped()
+
+    def update_reencode_status(self):
+        job = self.reencode_queue.current
+        if job:
+            if not self.running:
+                self.status_label.config(text=self.t("status_reencoding").format(
+                    progress=int(job.progress * 100), pending=self.reencode_queue.pending()))
+            self.root.after(500, self.update_reencode_status)
+            return
+
+        if self.reencode_queue.pending():
+            self.root.after(500, self.update_reencode_status)
+            return
+
+        last_job = self.reencode_queue.history[-1] if self.reencode_queue.history else None
+        if last_job and not self.running:
+            if last_job.state == "done":
+                self.status_label.config(text=self.t("status_reencoded").format(size=f"{last_job.output_size / (1024 * 1024):.1f}"))
+            else:
+                self.update_status_label_error_recording(self.t("error_reencode"))
 
-            self.video_parts = []
-            self.current_video_part = 0
-            
     def on_closing(self):
         self.close_preview()
+        if self.reencode_queue.pending() and not messagebox.askokcancel(self.t("warning"), self.t("warning_quit_encoding")):
+            return
         if self.running:
             if messagebox.askokcancel(self.t("warning"), self.t("warning_quit")):
-                self.stop_recording()
-                self.root.destroy()
+                self.stop_recording(on_stopped=self.destroy)
         else:
-            self.root.destroy()
+            self.destroy()
+
+    def destroy(self):
+        self.audio_watcher.stop()
+        self.job_runner.shutdown()
+        self.root.destroy()
 
     def toggle_widgets(self, recording):
         state = "disabled" if recording else "normal"
@@ -663,6 +758,7 @@ class ScreenRecorderApp:
         self.format_combo.config(state=readonly_state)
         self.audio_combo.config(state=readonly_state)
         self.volume_scale.config(state=state)
+        self.fast_capture_check.config(state=state)
         self.select_area_btn.config(state=state)
         self.language_combo.config(state=readonly_state)
         self.theme_combo.config(state=readonly_state)
@@ -694,8 +790,20 @@ class ScreenRecorderApp:
             self.elapsed_time += 1
             elapsed_time_str = time.strftime("%H:%M:%S", time.gmtime(self.elapsed_time))
             self.timer_label.config(text=elapsed_time_str, foreground="red")
+            self.update_status_metrics()
             self.root.after(1000, self.update_timer)
 
+    def update_status_metrics(self):
+        metrics = self.engine.metrics
+        if not metrics:
+            return
+        key = "status_recording_metrics" if metrics.realtime else "status_recording_behind"
+        text = self.t(key).format(fps=f"{metrics.fps:.0f}", speed=f"{metrics.speed:.2f}", drops=metrics.drop_frames)
+        if self.engine.limits:
+            # nice, cores and threads ffmpeg is really running with, read back from the system
+            text += "\n" + self.t("status_encoder_limits").format(limits=self.engine.limits.summary())
+        self.status_label.config(text=text)
+
     def show_info(self):
         info_window = tk.Toplevel(self.root)
         info_window.title(self.t("about"))
@@ -0,0 +1,160 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Optional, Tuple
+
+from recorder_engine import RecorderEngine, RecorderError, output_size
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StreamPlan:
+    cpus: Tuple[int, ...]
+    threads: int
+
+
+@dataclass
+class StreamStatus:
+    output_path: str
+    cpus: Tuple[int, ...]
+    threads: int
+    fps: float = 0.0
+    speed: float = 0.0
+    drop_frames: int = 0
+    state: str = "idle"
+    final_path: Optional[str] = None
+
+
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class EncoderScheduler:
+    # Splits the cores this process may use into disjoint blocks, one per stream, sized by the
+    # pixels per second each stream has to encode. Every ffmpeg gets as many encoder threads as
+    # cores in its block and is pinned to them, so parallel encodes don't fight over the same cores.
+    def __init__(self, cpus=None):
+        self.cpus = list(cpus) if cpus else available_cpus()
+
+    def plan(self, weights):
+        count = len(weights)
+        if count == 0:
+            return []
+        if count >= len(self.cpus):
+            # more streams than cores: one thread each, streams share cores round robin
+            return [StreamPlan((self.cpus[i % len(self.cpus)],), 1) for i in range(count)]
+
+        total = sum(weights) or count
+        shares = [max(1, int(len(self.cpus) * weight / total)) for weight in weights]
+        # hand the cores lost to rounding down to the heaviest streams
+        for index in sorted(range(count), key=lambda i: weights[i], reverse=True):
+            if sum(shares) >= len(self.cpus):
+                break
+            shares[index] += 1
+        while sum(shares) > len(self.cpus):
+            shares[shares.index(max(shares))] -= 1
+
+        plans = []
+        start = 0
+        for share in shares:
+            block = tuple(self.cpus[start:start + share])
+            plans.append(StreamPlan(block, len(block)))
+            start += share
+        return plans
+
+
+def stream_weight(settings):
+    area = settings.area
+    width, height = (area[2], area[3]) if area else (1920, 1080)
+    # the encoder only sees the scaled frames
+    width, height = output_size(width, height, settings.max_size, settings.scale)
+    return width * height * settings.fps
+
+
+class MultiRecorder:
+    # Records several monitors or regions at once, one ffmpeg per stream, with cores assigned by EncoderScheduler
+    def __init__(self, settings_list, scheduler=None, summary_interval=10.0):
+        if not settings_list:
+            raise RecorderError("Nothing to record.")
+        self.scheduler = scheduler or EncoderScheduler()
+        plans = self.scheduler.plan([stream_weight(settings) for settings in settings_list])
+        # a thread cap given in the settings still applies on top of the plan
+        self.settings_list = [replace(settings, threads=min(plan.threads, settings.threads or plan.threads),
+                                      cpu_affinity=plan.cpus)
+                              for settings, plan in zip(settings_list, plans)]
+        self.engines = [RecorderEngine() for _ in self.settings_list]
+        self.streams = [StreamStatus(settings.output_path, settings.cpu_affinity, settings.threads)
+                        for settings in self.settings_list]
+        self.summary_interval = summary_interval
+        self._last_summary = 0.0
+        self._lock = threading.Lock()
+        for index, engine in enumerate(self.engines):
+            engine.add_metrics_listener(lambda metrics, index=index: self._on_metrics(index, metrics))
+
+    def start(self):
+        started = []
+        try:
+            for engine, settings, stream in zip(self.engines, self.settings_list, self.streams):
+                engine.start(settings)
+                stream.state = "recording"
+                started.append(engine)
+                logger.info(f"STREAM {settings.output_path}: {settings.threads} thread(s) on cpus {settings.cpu_affinity}")
+        except RecorderError:
+            for engine in started:
+                engine.stop()
+            raise
+
+    def is_alive(self):
+        return any(engine.is_alive() for engine in self.engines)
+
+    def elapsed(self):
+        return max(engine.status().elapsed for engine in self.engines)
+
+    def stop(self, timeout=5):
+        # every ffmpeg gets 'q' at the same time, so the files end together
+        threads = [threading.Thread(target=self._stop_stream, args=(index, timeout)) for index in range(len(self.engines))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.log_summary()
+        return [stream.final_path for stream in self.streams]
+
+    def _stop_stream(self, index, timeout):
+        stream = self.streams[index]
+        try:
+            stream.final_path = self.engines[index].stop(timeout)
+            stream.state = "finished" if stream.final_path else "error"
+        except RecorderError as e:
+            logger.error(f"ERROR STOPPING STREAM {stream.output_path}: {e}")
+            stream.state = "error"
+
+    def stream_fps(self):
+        return {stream.output_path: stream.fps for stream in self.streams}
+
+    def summary(self):
+        return " | ".join(f"{os.path.basename(stream.output_path)}: {stream.fps:.1f} fps {stream.speed:.2f}x "
+                          f"drop={stream.drop_frames} cpus={','.join(str(cpu) for cpu in stream.cpus)}"
+                          for stream in self.streams)
+
+    def log_summary(self):
+        logger.info(f"STREAMS: {self.summary()}")
+
+    def _on_metrics(self, index, metrics):
+        stream = self.streams[index]
+        if metrics.fps:
+            stream.fps = metrics.fps
+            stream.speed = metrics.speed
+        stream.drop_frames = max(stream.drop_frames, metrics.drop_frames)
+
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_summary < self.summary_interval:
+                return
+            self._last_summary = now
+        self.log_summary()
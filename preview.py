@@ -0,0 +1,201 @@
+import logging
+import threading
+import time
+
+import cv2
+import mss
+import numpy as np
+from PIL import Image, ImageTk
+
+from recorder_engine import PREVIEW_SIZE
+
+logger = logging.getLogger(__name__)
+
+# while nothing changes on screen the grab interval doubles up to this many seconds
+IDLE_INTERVAL = 0.5
+
+
+class FrameConverter:
+    # Turns a full-resolution BGRA grab into a small RGB frame. Buffers are allocated once per
+    # source geometry: decimate with a strided view first, then one resize and one colour conversion.
+    # The two decimated buffers alternate, so the previous frame is always at hand to detect changes.
+    def __init__(self, size=PREVIEW_SIZE):
+        self.size = size
+        width, height = size
+        self.small_bgra = np.empty((height, width, 4), np.uint8)
+        self.decimated = None
+        self.current = 0
+        self.has_previous = False
+        self.step = 1
+
+    def prepare(self, source_width, source_height):
+        width, height = self.size
+        # keep at least 2x the target resolution so INTER_AREA still has pixels to average
+        self.step = max(1, min(source_width // (width * 2), source_height // (height * 2)))
+        shape = (len(range(0, source_height, self.step)), len(range(0, source_width, self.step)), 4)
+        if self.decimated is None or self.decimated[0].shape != shape:
+            self.decimated = [np.empty(shape, np.uint8) for _ in range(2)]
+        self.has_previous = False
+
+    def update(self, raw, source_width, source_height):
+        # the preview is computed from the decimated pixels only, so equal decimated frames render identically
+        frame = np.frombuffer(raw, np.uint8).reshape(source_height, source_width, 4)
+        target = self.decimated[1 - self.current]
+        np.copyto(target, frame[::self.step, ::self.step])
+        if self.has_previous and np.array_equal(target, self.decimated[self.current]):
+            return False
+        self.current = 1 - self.current
+        self.has_previous = True
+        return True
+
+    def render(self, out):
+        cv2.resize(self.decimated[self.current], self.size, dst=self.small_bgra, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small_bgra, cv2.COLOR_BGRA2RGB, dst=out)
+        return out
+
+    def convert(self, raw, source_width, source_height, out):
+        self.update(raw, source_width, source_height)
+        return self.render(out)
+
+
+class PreviewPipeline:
+    def __init__(self, root, label, size=PREVIEW_SIZE, fps=15):
+        self.root = root
+        self.label = label
+        self.size = size
+        self.fps = fps
+        self.monitor_index = 0
+        # (x, y, width, height) inside the monitor, None previews the whole monitor
+        self.region = None
+        self.interval = 1.0 / fps
+        self.converter = FrameConverter(size)
+        width, height = size
+        # three buffers: one being filled, one ready to show and one being pasted into Tk
+        self.buffers = [np.empty((height, width, 3), np.uint8) for _ in range(3)]
+        self.photo = ImageTk.PhotoImage("RGB", size)
+        self.ready = None
+        self.pasting = None
+        self.last_written = None
+        self.running = False
+        # while a recording tees its frames to the preview, feed() replaces the mss capture thread
+        self.external = False
+        self.thread = None
+        self._capturing = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.interval = 1.0 / self.fps
+        self.converter.has_previous = False
+        self.label.config(image=self.photo)
+        self.label.image = self.photo
+        if not self.external:
+            self._start_capture()
+        self._display_tick()
+
+    def stop(self):
+        self.running = False
+        self._stop_capture()
+        self.ready = None
+        self.pasting = None
+        self.last_written = None
+
+    def use_external_frames(self, enabled):
+        if enabled == self.external:
+            return
+        self.external = enabled
+        # make the first frame from the new source show up even if it looks like the last one
+        self.converter.has_previous = False
+        self.last_written = None
+        if enabled:
+            self._stop_capture()
+        elif self.running:
+            self._start_capture()
+
+    def feed(self, frame):
+        # called from ffmpeg's preview reader thread with a size[0] x size[1] rgb24 frame
+        if not self.running or not self.external:
+            return
+        width, height = self.size
+        frame = np.frombuffer(frame, np.uint8).reshape(height, width, 3)
+        if self.last_written is not None and np.array_equal(frame, self.buffers[self.last_written]):
+            self.interval = min(self.interval * 2, IDLE_INTERVAL)
+            return
+        self.interval = 1.0 / self.fps
+        back = self._back_buffer()
+        np.copyto(self.buffers[back], frame)
+        with self._lock:
+            self.ready = back
+        self.last_written = back
+
+    def _start_capture(self):
+        self._capturing = True
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+
+    def _stop_capture(self):
+        self._capturing = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+    def _back_buffer(self):
+        with self._lock:
+            busy = (self.ready, self.pasting)
+        return next(index for index in range(len(self.buffers)) if index not in busy)
+
+    def _grab_area(self, monitor):
+        if not self.region:
+            return monitor
+        x, y, width, height = self.region
+        return {"left": monitor["left"] + x, "top": monitor["top"] + y, "width": width, "height": height}
+
+    def _capture_loop(self):
+        geometry = None
+        with mss.mss() as sct:
+            next_frame = time.monotonic()
+            while self.running and self._capturing:
+                monitors = sct.monitors
+                if self.monitor_index + 1 >= len(monitors):
+                    break
+                area = self._grab_area(monitors[self.monitor_index + 1])
+
+                try:
+                    shot = sct.grab(area)
+                except mss.exception.ScreenShotError as e:
+                    logger.error(f"PREVIEW GRAB FAILED: {e}")
+                    break
+
+                if geometry != (shot.width, shot.height):
+                    geometry = (shot.width, shot.height)
+                    self.converter.prepare(*geometry)
+
+                if self.converter.update(shot.raw, shot.width, shot.height):
+                    self.interval = 1.0 / self.fps
+                    back = self._back_buffer()
+                    self.converter.render(self.buffers[back])
+                    with self._lock:
+                        self.ready = back
+                else:
+                    self.interval = min(self.interval * 2, IDLE_INTERVAL)
+
+                next_frame += self.interval
+                delay = next_frame - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_frame = time.monotonic()
+
+    def _display_tick(self):
+        if not self.running:
+            return
+        with self._lock:
+            ready, self.ready = self.ready, None
+            self.pasting = ready
+        if ready is not None:
+            self.photo.paste(Image.frombuffer("RGB", self.size, self.buffers[ready], "raw", "RGB", 0, 1))
+            with self._lock:
+                self.pasting = None
+        self.root.after(max(1, int(self.interval * 1000)), self._display_tick)
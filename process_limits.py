@@ -0,0 +1,192 @@
+import logging
+import os
+import platform
+import shutil
+import subprocess
+from dataclasses import asdict, dataclass
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IONICE_CLASSES = {"realtime": "1", "best-effort": "2", "idle": "3"}
+
+
+@dataclass
+class ProcessLimits:
+    # what a running process actually got, read back from the kernel rather than taken from the settings
+    pid: int
+    nice: Optional[int] = None
+    ionice: Optional[str] = None
+    cpus: Optional[Tuple[int, ...]] = None
+    # the -threads cap ffmpeg was given (0 = its own choice) and the threads it is running
+    threads: int = 0
+    os_threads: Optional[int] = None
+    cgroup: Optional[str] = None
+    # percent of one core allowed by the cgroup's cpu.max, None when unlimited
+    cpu_quota: Optional[float] = None
+
+    def summary(self):
+        parts = [f"nice={self.nice if self.nice is not None else '?'}"]
+        if self.ionice:
+            parts.append(f"ionice={self.ionice}")
+        if self.cpus is not None:
+            parts.append(f"cpus={format_cpus(self.cpus)}")
+        parts.append(f"threads={self.threads or 'auto'}" + (f" ({self.os_threads} running)" if self.os_threads else ""))
+        if self.cpu_quota is not None:
+            parts.append(f"cpu_quota={self.cpu_quota:.0f}%")
+        return " ".join(parts)
+
+    def to_dict(self):
+        data = asdict(self)
+        data["cpus"] = list(self.cpus) if self.cpus is not None else None
+        return data
+
+
+def format_cpus(cpus):
+    # 0,1,2,3,6 -> 0-3,6
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+
+
+def parse_cpus(value):
+    # "0-3,6" -> (0, 1, 2, 3, 6)
+    cpus = set()
+    for part in value.split(","):
+        first, _, last = part.strip().partition("-")
+        first, last = int(first), int(last or first)
+        if first < 0 or last < first:
+            raise ValueError(f"invalid cpu range '{part}'")
+        cpus.update(range(first, last + 1))
+    return tuple(sorted(cpus))
+
+
+def parse_ionice(value):
+    # "idle", "best-effort" or "best-effort:7" (0 is the highest level, 7 the lowest)
+    name, _, level = value.partition(":")
+    if name not in IONICE_CLASSES:
+        raise ValueError(f"unknown I/O class '{name}', use one of {', '.join(IONICE_CLASSES)}")
+    if level and (not level.isdigit() or int(level) > 7):
+        raise ValueError(f"I/O priority level must be 0 to 7, got '{level}'")
+    if level and name == "idle":
+        raise ValueError("the idle I/O class has no levels")
+    return IONICE_CLASSES[name], level or None
+
+
+def limited_command(args, ionice=None, cpu_quota=None):
+    # both wrappers exec the next program in the same process, so the pid, the inherited pipes and
+    # whatever was set in preexec_fn stay those of ffmpeg
+    if platform.system() == 'Windows':
+        if ionice or cpu_quota:
+            logger.warning("I/O PRIORITY AND CPU QUOTA ARE NOT AVAILABLE ON WINDOWS, IGNORED")
+        return list(args)
+    prefix = []
+    if cpu_quota:
+        prefix += [shutil.which("systemd-run") or "systemd-run", "--user", "--scope", "--quiet", "--collect",
+                   "-p", f"CPUQuota={cpu_quota}%", "--"]
+    if ionice:
+        io_class, level = parse_ionice(ionice)
+        ionice_path = shutil.which("ionice")
+        if ionice_path:
+            prefix += [ionice_path, "-c", io_class] + (["-n", level] if level else [])
+        else:
+            logger.warning("IONICE NOT FOUND (util-linux), THE ENCODER KEEPS ITS I/O PRIORITY")
+    return prefix + list(args)
+
+
+def priority_class(nice):
+    # Windows has no nice levels, only a handful of priority classes
+    if nice >= 15:
+        return subprocess.IDLE_PRIORITY_CLASS
+    if nice > 0:
+        return subprocess.BELOW_NORMAL_PRIORITY_CLASS
+    return 0
+
+
+def limit_current_process(nice=0, cpus=None):
+    # runs in the child between fork and exec (preexec_fn), before ffmpeg starts any thread, so every
+    # thread inherits the limits. Failures only show up as missing values in read_limits
+    if nice:
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError:
+            pass
+
+
+def read_limits(pid, threads=0):
+    limits = ProcessLimits(pid=pid, threads=threads)
+    if platform.system() == 'Windows':
+        return limits
+    try:
+        limits.nice = os.getpriority(os.PRIO_PROCESS, pid)
+    except OSError:
+        pass
+    if hasattr(os, "sched_getaffinity"):
+        try:
+            limits.cpus = tuple(sorted(os.sched_getaffinity(pid)))
+        except OSError:
+            pass
+    limits.os_threads = _proc_threads(pid)
+    limits.ionice = _ionice_of(pid)
+    limits.cgroup, limits.cpu_quota = _cgroup_quota(pid)
+    return limits
+
+
+def _proc_threads(pid):
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _ionice_of(pid):
+    ionice_path = shutil.which("ionice")
+    if not ionice_path:
+        return None
+    try:
+        result = subprocess.run([ionice_path, "-p", str(pid)], capture_output=True, text=True, timeout=2)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0:
+        return None
+    # "idle", "best-effort: prio 4" or "none: prio 4" (none follows the cpu nice level)
+    return result.stdout.strip().replace(": prio ", ":") or None
+
+
+def _cgroup_quota(pid):
+    try:
+        with open(f"/proc/{pid}/cgroup", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None, None
+    # cgroup v2 has a single "0::/path" line
+    path = next((line.split(":", 2)[2] for line in lines if line.startswith("0::")), None)
+    if not path:
+        return None, None
+    quota = None
+    directory = "/sys/fs/cgroup" + path
+    # a limit on any parent applies too, the tightest one wins
+    while directory.startswith("/sys/fs/cgroup/"):
+        try:
+            with open(os.path.join(directory, "cpu.max"), encoding="utf-8") as f:
+                limit, period = f.read().split()
+            if limit != "max":
+                percent = int(limit) / int(period) * 100
+                quota = percent if quota is None else min(quota, percent)
+        except (OSError, ValueError):
+            pass
+        directory = os.path.dirname(directory)
+    return path, quota
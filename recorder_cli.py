@@ -0,0 +1,526 @@
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from dataclasses import replace
+
+from adaptive_controller import AdaptiveController
+from audio_mixer import remix
+from capability_probe import check_settings, get_capabilities
+from job_scheduler import JobScheduler, load_jobs
+from multi_recorder import EncoderScheduler, MultiRecorder
+from process_limits import parse_cpus, parse_ionice
+from reencode_queue import ReencodeQueue, intermediate_settings
+from replay_buffer import ReplayBuffer
+from recorder_engine import (SCALER_OPTIONS, SCRATCH_DIR, FFmpegNotFoundError, RecorderEngine, RecorderError,
+                             RecordingSettings, default_ffmpeg_path, find_incomplete_recordings, recover_recording,
+                             split_output_paths, timestamp)
+
+logger = logging.getLogger(__name__)
+
+
+REPLAY_USAGE = "commands: Enter or 'save' saves the buffer, 'save SECONDS' the last SECONDS, 'quit' stops"
+
+
+def parse_track_volume(value):
+    try:
+        track, percent = value.split("=")
+        track = int(track)
+        percent = float(percent)
+    except ValueError:
+        raise argparse.ArgumentTypeError("volume must be TRACK=PERCENT, e.g. 2=150")
+    if track < 1 or percent < 0:
+        raise argparse.ArgumentTypeError("tracks count from 1 and the volume can't be negative")
+    return track - 1, percent / 100
+
+
+def parse_area(value):
+    try:
+        x, y, width, height = (int(part) for part in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("area must be x,y,width,height")
+    return x, y, width, height
+
+
+def parse_size(value):
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("size must be WIDTHxHEIGHT")
+    if width < 2 or height < 2:
+        raise argparse.ArgumentTypeError("size must be at least 2x2")
+    return width, height
+
+
+def parse_cpu_list(value):
+    try:
+        return parse_cpus(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("cpus must be a list like 0-3,6")
+
+
+def parse_io_priority(value):
+    try:
+        parse_ionice(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def add_capture_arguments(parser):
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--bitrate", default="1000k")
+    parser.add_argument("--codec", default="libx264")
+    parser.add_argument("--audio", action="append", default=[],
+                        help="audio input device (pulse source on Linux, dshow name on Windows), "
+                             "repeat to record several sources as separate tracks")
+    parser.add_argument("--audio-codec", choices=["aac", "libopus", "flac"],
+                        help="audio encoder (default: the container's), flac keeps the tracks lossless")
+    parser.add_argument("--volume", type=float, default=100)
+    parser.add_argument("--area", type=parse_area, action="append", default=[],
+                        help="x,y,width,height in desktop coordinates, repeat to record several areas")
+    parser.add_argument("--monitor", type=int, action="append", default=[],
+                        help="record monitor N (counting from 1), repeat to record several monitors")
+    parser.add_argument("--display", help="X11 display to grab (default: $DISPLAY)")
+    parser.add_argument("--capture-backend", choices=["ffmpeg", "mss"], default="ffmpeg",
+                        help="grab with ffmpeg's x11grab, or with mss in Python and pipe raw frames to ffmpeg")
+    parser.add_argument("--skip-static", action="store_true",
+                        help="don't encode frames that didn't change, the file gets variable frame rate")
+    parser.add_argument("--max-size", type=parse_size,
+                        help="WIDTHxHEIGHT to shrink the video to fit, e.g. 1920x1080 to record a 4K monitor at 1080p")
+    parser.add_argument("--scaler", choices=SCALER_OPTIONS, default="bicubic",
+                        help="scaling algorithm for --max-size, fast_bilinear is cheapest, lanczos sharpest")
+    parser.add_argument("--nice", type=int, choices=range(20), default=0, metavar="0-19",
+                        help="run ffmpeg at this nice level, so the recorded application gets the CPU first")
+    parser.add_argument("--ionice", type=parse_io_priority, metavar="CLASS[:LEVEL]",
+                        help="ffmpeg's I/O priority: idle, best-effort or best-effort:0-7")
+    parser.add_argument("--cpus", type=parse_cpu_list, help="pin ffmpeg to these cores, e.g. 0-3,6")
+    parser.add_argument("--threads", type=int, default=0, help="cap ffmpeg's encoder threads (default: ffmpeg decides)")
+    parser.add_argument("--cpu-quota", type=int, metavar="PERCENT",
+                        help="cap ffmpeg's CPU time in a cgroup, 100 is one full core (needs systemd-run)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="miniscreenrecorder", description="Mini Screen Recorder command line")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record = subparsers.add_parser("record", help="record the screen without opening the window")
+    record.add_argument("--out", help="output file (default: OutputFiles/Video.<date>.mkv)")
+    record.add_argument("--seconds", type=float, help="stop after this many seconds (default: until Ctrl+C)")
+    add_capture_arguments(record)
+    record.add_argument("--layout", choices=["separate", "composite"], default="separate",
+                        help="with several areas/monitors: one file per stream, or all side by side in one file")
+    record.add_argument("--adaptive", action="store_true",
+                        help="switch to a cheaper preset, lower fps or smaller scale when ffmpeg falls behind")
+    record.add_argument("--fast-capture", action="store_true",
+                        help="capture near-lossless first and encode with --codec/--bitrate after stopping")
+    record.add_argument("--intermediate-codec", choices=["libx264", "ffv1"], default="libx264")
+    record.add_argument("--metrics", help="keep the latest encoder metrics in this JSON file")
+    record.add_argument("--ffmpeg", default=None, help="path to the ffmpeg binary")
+    record.set_defaults(func=cmd_record)
+
+    replay = subparsers.add_parser("replay", help="keep the last seconds of screen in a ring buffer and save them on demand",
+                                   description="Press Enter (or type 'save SECONDS') to save, send SIGUSR1 to save "
+                                               "from a desktop shortcut, Ctrl+C or 'quit' to stop.")
+    replay.add_argument("--buffer", type=float, default=60, help="seconds of footage to keep (default: 60)")
+    replay.add_argument("--segment", type=float, default=2.0, help="length of each ring segment in seconds")
+    replay.add_argument("--buffer-dir", help="where the ring segments live (default: a folder in /dev/shm or the temp dir)")
+    replay.add_argument("--out-dir", help="folder for saved clips (default: OutputFiles)")
+    replay.add_argument("--format", choices=["mkv", "mp4"], default="mkv")
+    add_capture_arguments(replay)
+    replay.add_argument("--ffmpeg", default=None, help="path to the ffmpeg binary")
+    replay.set_defaults(func=cmd_replay)
+
+    recover = subparsers.add_parser("recover", help="finalize recordings left behind by a crash")
+    recover.add_argument("paths", nargs="*", help="*.parts.ffconcat manifests (default: every one in OutputFiles)")
+    recover.add_argument("--ffmpeg", default=None, help="path to the ffmpeg binary")
+    recover.set_defaults(func=cmd_recover)
+
+    remix = subparsers.add_parser("remix", help="change the audio levels of a recording without re-encoding the video")
+    remix.add_argument("input", help="recording to remix")
+    remix.add_argument("--out", help="output file (default: <input>.remix.<ext>)")
+    remix.add_argument("--volume", type=parse_track_volume, action="append", default=[],
+                       help="TRACK=PERCENT, e.g. 2=150 makes the second audio track 50%% louder")
+    remix.add_argument("--mix", action="store_true", help="mix all audio tracks down to one")
+    remix.add_argument("--normalize", action="store_true", help="two-pass loudness normalization (loudnorm)")
+    remix.add_argument("--audio-codec", choices=["aac", "libopus", "flac"],
+                       help="audio encoder (default: flac for mkv, aac for mp4)")
+    remix.add_argument("--ffmpeg", default=None, help="path to the ffmpeg binary")
+    remix.set_defaults(func=cmd_remix)
+
+    schedule = subparsers.add_parser("schedule", help="record the jobs of a job file at their times, without the window")
+    schedule.add_argument("jobfile", help="INI file with one [section] per recording job")
+    schedule.add_argument("--out-dir", help="folder for the recordings (default: OutputFiles)")
+    schedule.add_argument("--lead-time", type=float, default=3.0,
+                          help="seconds to start ffmpeg ahead of each job (default: 3)")
+    schedule.add_argument("--list", action="store_true", help="print the next run of every job and exit")
+    schedule.add_argument("--ffmpeg", default=None, help="path to the ffmpeg binary")
+    schedule.set_defaults(func=cmd_schedule)
+
+    return parser
+
+
+def default_output_path(extension="mkv"):
+    output_folder = os.path.join(os.getcwd(), "OutputFiles")
+    os.makedirs(output_folder, exist_ok=True)
+    return os.path.join(output_folder, f"Video.{timestamp()}.{extension}")
+
+
+def capture_areas(args):
+    areas = list(args.area)
+    if args.monitor:
+        from screeninfo import get_monitors
+
+        monitors = get_monitors()
+        for number in args.monitor:
+            if not 1 <= number <= len(monitors):
+                raise RecorderError(f"There is no monitor {number}, found {len(monitors)}.")
+            monitor = monitors[number - 1]
+            areas.append((monitor.x, monitor.y, monitor.width, monitor.height))
+    return areas
+
+
+def stream_output_path(output_path, index):
+    stem, extension = os.path.splitext(output_path)
+    return f"{stem}.{index + 1}{extension}"
+
+
+def settings_from_args(args, area=None):
+    return RecordingSettings(
+        output_path=os.path.abspath(args.out) if args.out else default_output_path(),
+        fps=args.fps,
+        bitrate=args.bitrate,
+        codec=args.codec,
+        audio_device=args.audio[0] if args.audio else None,
+        audio_tracks=tuple(args.audio[1:]),
+        audio_codec=args.audio_codec,
+        volume=args.volume,
+        intermediate_codec=args.intermediate_codec,
+        area=area,
+        display=args.display,
+        capture_backend=args.capture_backend,
+        skip_static_frames=args.skip_static,
+        max_size=args.max_size,
+        scaler=args.scaler,
+        nice=args.nice,
+        ionice=args.ionice,
+        cpu_affinity=args.cpus,
+        threads=args.threads,
+        cpu_quota=args.cpu_quota,
+        duration=args.seconds,
+        metrics_path=os.path.abspath(args.metrics) if args.metrics else None,
+        ffmpeg_path=args.ffmpeg or default_ffmpeg_path()
+    )
+
+
+def preflight(settings):
+    try:
+        capabilities = get_capabilities(settings.ffmpeg_path, display=settings.display)
+    except FFmpegNotFoundError as e:
+        return [str(e)]
+    return check_settings(settings, capabilities)
+
+
+def cmd_record(args):
+    try:
+        areas = capture_areas(args)
+    except RecorderError as e:
+        print(f"Cannot record: {e}", file=sys.stderr)
+        return 1
+
+    if len(areas) > 1 and args.layout == "separate":
+        return record_streams(args, areas)
+
+    settings = settings_from_args(args, areas[0] if areas else None)
+    if len(areas) > 1:
+        settings = replace(settings, composite_areas=tuple(areas))
+    engine = RecorderEngine()
+    if args.adaptive:
+        AdaptiveController(engine)
+    interrupted = []
+
+    def request_stop(signum, frame):
+        interrupted.append(signum)
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    capture_settings = settings
+    if args.fast_capture:
+        scratch_dir = os.path.join(os.path.dirname(settings.output_path), SCRATCH_DIR)
+        capture_settings = intermediate_settings(settings, scratch_dir)
+
+    problems = preflight(capture_settings)
+    if problems:
+        for problem in problems:
+            print(f"Cannot record: {problem}", file=sys.stderr)
+        return 1
+
+    try:
+        engine.start(capture_settings)
+        limits_shown = False
+        while engine.is_alive() and not interrupted:
+            if engine.limits and not limits_shown:
+                print(f"encoder limits: {engine.limits.summary()}", file=sys.stderr)
+                limits_shown = True
+            time.sleep(0.1)
+        elapsed = engine.status().elapsed
+        engine.stop()
+    except RecorderError as e:
+        logger.error(f"RECORDING FAILED: {e}")
+        print(f"Recording failed: {e}", file=sys.stderr)
+        return 1
+
+    output_paths = engine.output_paths
+    if not output_paths:
+        print("Recording failed: ffmpeg produced no output.", file=sys.stderr)
+        return 1
+
+    if args.fast_capture:
+        reencode_queue = ReencodeQueue()
+        # a recording split by a stream break is re-encoded file by file, only a single file has a known length
+        duration = elapsed if len(output_paths) == 1 else None
+        jobs = [reencode_queue.submit(captured_path, final_path, settings, duration=duration)
+                for captured_path, final_path in zip(output_paths,
+                                                     split_output_paths(settings.output_path, len(output_paths)))]
+        reencode_queue.wait()
+        failed = [job for job in jobs if job.state != "done"]
+        for job in failed:
+            print(f"Encoding failed: {job.error}", file=sys.stderr)
+        if failed:
+            return 1
+        output_paths = [job.output_path for job in jobs]
+
+    for output_path in output_paths:
+        print(output_path)
+    return 0
+
+
+def record_streams(args, areas):
+    if args.fast_capture:
+        print("Cannot record: --fast-capture works with a single stream or --layout composite.", file=sys.stderr)
+        return 1
+
+    base = settings_from_args(args)
+    settings_list = [replace(base, area=area, output_path=stream_output_path(base.output_path, index),
+                             metrics_path=None) for index, area in enumerate(areas)]
+    problems = preflight(base)
+    if problems:
+        for problem in problems:
+            print(f"Cannot record: {problem}", file=sys.stderr)
+        return 1
+
+    # the streams split --cpus between them, or every core when it isn't given
+    recorder = MultiRecorder(settings_list, EncoderScheduler(args.cpus) if args.cpus else None)
+    if args.adaptive:
+        for engine in recorder.engines:
+            AdaptiveController(engine)
+    interrupted = []
+
+    def request_stop(signum, frame):
+        interrupted.append(signum)
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    try:
+        recorder.start()
+        # a stream that dies early doesn't end the others, the recording stops when all are gone
+        while recorder.is_alive() and not interrupted:
+            time.sleep(0.1)
+        output_paths = recorder.stop()
+    except RecorderError as e:
+        logger.error(f"RECORDING FAILED: {e}")
+        print(f"Recording failed: {e}", file=sys.stderr)
+        return 1
+
+    print(f"streams: {recorder.summary()}", file=sys.stderr)
+    for output_path in output_paths:
+        if output_path:
+            print(output_path)
+    return 0 if all(output_paths) else 1
+
+
+def cmd_replay(args):
+    try:
+        areas = capture_areas(args)
+    except RecorderError as e:
+        print(f"Cannot record: {e}", file=sys.stderr)
+        return 1
+    output_folder = os.path.abspath(args.out_dir) if args.out_dir else os.path.join(os.getcwd(), "OutputFiles")
+    os.makedirs(output_folder, exist_ok=True)
+    settings = RecordingSettings(
+        output_path=os.path.join(output_folder, f"Replay.{args.format}"),
+        fps=args.fps,
+        bitrate=args.bitrate,
+        codec=args.codec,
+        audio_device=args.audio[0] if args.audio else None,
+        audio_tracks=tuple(args.audio[1:]),
+        audio_codec=args.audio_codec,
+        volume=args.volume,
+        area=areas[0] if areas else None,
+        composite_areas=tuple(areas) if len(areas) > 1 else None,
+        display=args.display,
+        capture_backend=args.capture_backend,
+        skip_static_frames=args.skip_static,
+        max_size=args.max_size,
+        scaler=args.scaler,
+        nice=args.nice,
+        ionice=args.ionice,
+        cpu_affinity=args.cpus,
+        threads=args.threads,
+        cpu_quota=args.cpu_quota,
+        ffmpeg_path=args.ffmpeg or default_ffmpeg_path()
+    )
+    problems = preflight(settings)
+    if problems:
+        for problem in problems:
+            print(f"Cannot record: {problem}", file=sys.stderr)
+        return 1
+
+    replay = ReplayBuffer(settings, buffer_seconds=args.buffer, segment_seconds=args.segment, buffer_dir=args.buffer_dir)
+    requests = []
+
+    def request_stop(signum, frame):
+        requests.append(("quit", None))
+
+    def request_save(signum, frame):
+        requests.append(("save", None))
+
+    def read_commands():
+        for line in sys.stdin:
+            words = line.split()
+            if not words or words[0] == "save":
+                seconds = None
+                if len(words) > 1:
+                    try:
+                        seconds = float(words[1])
+                    except ValueError:
+                        seconds = None
+                    if not seconds or not seconds > 0:
+                        # a bad line must not end this thread, the buffer would stop listening
+                        print(REPLAY_USAGE, file=sys.stderr)
+                        continue
+                requests.append(("save", seconds))
+            elif words[0] in ("quit", "exit"):
+                requests.append(("quit", None))
+                return
+            else:
+                print(REPLAY_USAGE, file=sys.stderr)
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, request_save)
+    threading.Thread(target=read_commands, daemon=True).start()
+
+    try:
+        replay.start()
+    except RecorderError as e:
+        print(f"Replay buffer failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Keeping the last {args.buffer:g} s. Press Enter to save them, Ctrl+C to stop.", file=sys.stderr)
+
+    limits_shown = False
+    try:
+        while replay.is_alive():
+            if replay.limits and not limits_shown:
+                print(f"encoder limits: {replay.limits.summary()}", file=sys.stderr)
+                limits_shown = True
+            if not requests:
+                time.sleep(0.1)
+                continue
+            command, seconds = requests.pop(0)
+            if command == "quit":
+                break
+            try:
+                print(replay.save(seconds))
+            except (RecorderError, OSError) as e:
+                logger.error(f"ERROR SAVING REPLAY: {e}")
+                print(f"Could not save the replay: {e}", file=sys.stderr)
+        else:
+            print("Replay buffer failed: ffmpeg exited.", file=sys.stderr)
+            return 1
+    finally:
+        replay.stop()
+    return 0
+
+
+def cmd_recover(args):
+    manifests = args.paths or find_incomplete_recordings(os.path.join(os.getcwd(), "OutputFiles"))
+    failed = False
+    for manifest in manifests:
+        try:
+            output_paths = recover_recording(manifest, args.ffmpeg)
+        except (RecorderError, OSError) as e:
+            print(f"Could not recover {manifest}: {e}", file=sys.stderr)
+            failed = True
+            continue
+        print("\n".join(output_paths) or f"{manifest}: no usable parts")
+    return 1 if failed else 0
+
+
+def cmd_remix(args):
+    stem, extension = os.path.splitext(args.input)
+    output_path = args.out or f"{stem}.remix{extension}"
+    try:
+        output_path = remix(args.input, output_path, volumes=dict(args.volume), mix=args.mix, normalize=args.normalize,
+                            audio_codec=args.audio_codec, ffmpeg_path=args.ffmpeg)
+    except RecorderError as e:
+        print(f"Remix failed: {e}", file=sys.stderr)
+        return 1
+    print(output_path)
+    return 0
+
+
+def cmd_schedule(args):
+    try:
+        jobs = load_jobs(args.jobfile)
+    except RecorderError as e:
+        print(f"Cannot schedule: {e}", file=sys.stderr)
+        return 1
+
+    scheduler = JobScheduler(jobs, args.out_dir or os.path.join(os.getcwd(), "OutputFiles"),
+                             ffmpeg_path=args.ffmpeg, lead_time=args.lead_time)
+    if args.list:
+        for start, end, job in scheduler.upcoming():
+            print(f"{start:%Y-%m-%d %H:%M:%S} - {end:%Y-%m-%d %H:%M:%S}  {job.name}")
+        return 0
+
+    for job in jobs:
+        problems = preflight(RecordingSettings(output_path="", fps=job.fps, bitrate=job.bitrate, codec=job.codec,
+                                               ffmpeg_path=scheduler.ffmpeg_path))
+        if problems:
+            for problem in problems:
+                print(f"Cannot schedule [{job.name}]: {problem}", file=sys.stderr)
+            return 1
+
+    def request_stop(signum, frame):
+        scheduler.stop_event.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    failed = False
+    for run in scheduler.run():
+        if run.final_path:
+            print(run.final_path)
+        else:
+            print(f"Job [{run.job.name}] at {run.start:%Y-%m-%d %H:%M}: {run.error}", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    from logging_config import setup_logging
+
+    setup_logging()
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
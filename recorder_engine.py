@@ -0,0 +1,1232 @@
+import datetime
+import logging
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Optional, Tuple
+
+from ffmpeg_progress import DriftParser, EncoderMetrics, ProgressParser, write_metrics_file
+from process_limits import ProcessLimits, limit_current_process, limited_command, parse_ionice, priority_class, read_limits
+
+logger = logging.getLogger(__name__)
+
+FPS_OPTIONS = ["30", "60"]
+BITRATE_OPTIONS = ["1000k", "2000k", "4000k", "6000k", "8000k", "10000k", "15000k", "20000k"]
+CODEC_OPTIONS = ["libx264", "libx265"]
+FORMAT_OPTIONS = ["mkv", "mp4"]
+# swscale algorithms for RecordingSettings.scaler, cheapest and softest first
+SCALER_OPTIONS = ["fast_bilinear", "bilinear", "bicubic", "lanczos"]
+DEFAULT_PRESETS = {"libx264": "veryfast", "libx265": "medium"}
+# cheap codecs for capture_mode="intermediate", the real encode happens afterwards in ReencodeQueue
+INTERMEDIATE_CODECS = {
+    "libx264": ["-c:v", "libx264", "-preset", "ultrafast", "-qp", "0"],
+    "ffv1": ["-c:v", "ffv1", "-level", "3", "-slices", "4"]
+}
+STREAMING_MOVFLAGS = "+frag_keyframe+empty_moov+default_base_moof"
+MANIFEST_SUFFIX = ".parts.ffconcat"
+# fast capture records into this folder next to the output, the re-encode writes the final file
+SCRATCH_DIR = ".scratch"
+STREAM_BREAK = "# stream parameters changed"
+# "# owner PID START": the process writing the parts, recovery leaves the manifest alone while it runs
+MANIFEST_OWNER = "# owner"
+PREVIEW_SIZE = (400, 240)
+AUDIO_SAMPLE_RATE = 48000
+SYNTHETIC_AUDIO_SOURCES = {
+    "sine": f"sine=frequency=440:sample_rate={AUDIO_SAMPLE_RATE}",
+    "anullsrc": f"anullsrc=channel_layout=stereo:sample_rate={AUDIO_SAMPLE_RATE}"
+}
+SYNTHETIC_VIDEO_SOURCES = {
+    "testsrc": "testsrc2=size={width}x{height}:rate={fps}"
+}
+# input queues hold this much capture (scaled up when the encoder is measured running behind), so short
+# encoder stalls are absorbed instead of blocking the grabbing thread. Video queues are capped by memory
+QUEUE_SECONDS = 1.0
+MAX_QUEUE_SECONDS = 4.0
+VIDEO_QUEUE_MEMORY = 512 * 1024 * 1024
+MIN_THREAD_QUEUE = 8
+AUDIO_THREAD_QUEUE = 4096
+# stretch or squeeze the audio by up to 1000 samples per second so it follows its timestamps
+# instead of the device's own clock, which drifts away from the video over long recordings
+AV_SYNC_FILTER = "aresample=async=1000"
+# how long reading the encoder's process limits waits for its first frames before it reads them anyway
+LIMITS_READ_TIMEOUT = 5.0
+
+
+class RecorderError(Exception):
+    pass
+
+
+class FFmpegNotFoundError(RecorderError):
+    pass
+
+
+def scale_factor(width, height, max_size=None, scale=1.0):
+    # shrink to fit max_size (never enlarge), then apply the relative scale on top
+    factor = 1.0
+    if max_size:
+        factor = min(1.0, max_size[0] / width, max_size[1] / height)
+    return factor * (scale or 1.0)
+
+
+def output_size(width, height, max_size=None, scale=1.0):
+    factor = scale_factor(width, height, max_size, scale)
+    return max(2, int(width * factor) // 2 * 2), max(2, int(height * factor) // 2 * 2)
+
+
+def default_ffmpeg_path():
+    if getattr(sys, 'frozen', False):
+        base_path = sys._MEIPASS
+    else:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+
+    if platform.system() == 'Windows':
+        bundled = os.path.join(base_path, 'ffmpeg_files', 'ffmpeg.exe')
+    else:
+        bundled = os.path.join(base_path, 'ffmpeg_files', 'ffmpeg')
+
+    return bundled if os.path.exists(bundled) else "ffmpeg"
+
+
+def timestamp():
+    return datetime.datetime.now().strftime('%m-%d-%Y.%H.%M.%S')
+
+
+def manifest_path_for(output_path):
+    stem, _ = os.path.splitext(output_path)
+    return f"{stem}{MANIFEST_SUFFIX}"
+
+
+def frame_size(settings):
+    # size of the encoded frames, None when the whole display is grabbed and only ffmpeg knows it
+    areas = settings.composite_areas or ([settings.area] if settings.area else [])
+    if not areas:
+        return None
+    sizes = [(width - width % 2, height - height % 2) for _, _, width, height in areas]
+    if len(sizes) == 1:
+        return output_size(*sizes[0], settings.max_size, settings.scale)
+    # every composite area is scaled by the factor of the whole canvas before xstack joins them
+    factor = scale_factor(sum(width for width, _ in sizes), max(height for _, height in sizes),
+                          settings.max_size, settings.scale)
+    scaled = [output_size(width, height, scale=factor) if factor != 1.0 else (width, height) for width, height in sizes]
+    return sum(width for width, _ in scaled), max(height for _, height in scaled)
+
+
+def stream_parameters(settings):
+    # what ends up in the codec headers or the frame size; parts that differ here can't be joined by stream copy.
+    # The capture offsets don't count, a switch between monitors of the same size joins into one file
+    if settings.capture_mode == "intermediate":
+        # INTERMEDIATE_CODECS fix every encoder option, codec, preset and audio codec are not used
+        codec = (settings.capture_mode, settings.intermediate_codec)
+    else:
+        codec = (settings.capture_mode, settings.codec, settings.preset or DEFAULT_PRESETS.get(settings.codec),
+                 settings.audio_codec)
+    size = frame_size(settings)
+    return codec + (settings.fps, size or (settings.display, settings.scale, settings.max_size))
+
+
+def process_start_time(pid):
+    # tells a live owner from an unrelated process that got its pid after a crash (Linux only)
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def process_alive(pid):
+    if platform.system() == 'Windows':
+        import ctypes
+        # os.kill would terminate the process on Windows, ask for its exit code instead
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return code.value == 259
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def write_manifest(manifest_path, parts, outpoints=None, breaks=()):
+    outpoints = outpoints or {}
+    temp_path = f"{manifest_path}.tmp"
+    pid = os.getpid()
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write("ffconcat version 1.0\n")
+        f.write(f"{MANIFEST_OWNER} {pid} {process_start_time(pid) or '-'}\n")
+        for part in parts:
+            if part in breaks:
+                # a comment for ffmpeg, read_manifest starts a new output file here
+                f.write(f"{STREAM_BREAK}\n")
+            escaped = os.path.abspath(part).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+            if outpoints.get(part):
+                f.write(f"outpoint {outpoints[part]:.3f}\n")
+    os.replace(temp_path, manifest_path)
+
+
+def read_manifest(manifest_path):
+    parts = []
+    outpoints = {}
+    breaks = set()
+    pending_break = False
+    with open(manifest_path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line == STREAM_BREAK:
+                pending_break = True
+            elif line.startswith("file "):
+                parts.append(line[5:].strip("'").replace("'\\''", "'"))
+                if pending_break:
+                    breaks.add(parts[-1])
+                    pending_break = False
+            elif line.startswith("outpoint ") and parts:
+                outpoints[parts[-1]] = float(line.split()[1])
+    return parts, outpoints, breaks
+
+
+def concat_parts(parts, output_path, ffmpeg_path, manifest_path, outpoints=None):
+    write_manifest(manifest_path, parts, outpoints)
+    concat_command = [
+        ffmpeg_path,
+        "-f", "concat",
+        "-safe", "0",
+        "-i", manifest_path,
+        "-map", "0",
+        "-c", "copy"
+    ]
+    if output_path.lower().endswith(".mp4"):
+        concat_command.extend(["-movflags", STREAMING_MOVFLAGS])
+    concat_command.extend(["-y", output_path])
+
+    try:
+        logger.info(f"EXECUTING COMMAND: {' '.join(concat_command)}")
+        subprocess.run(concat_command, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        error_message = e.stderr if e.stderr else str(e)
+        logger.error(f"ERROR MERGING VIDEO: {error_message}")
+        raise RecorderError(error_message) from e
+    except FileNotFoundError as e:
+        raise FFmpegNotFoundError(f"FFmpeg not found: {e}") from e
+
+
+def open_pipe(opened):
+    # opened collects every descriptor, so a failed launch can close all of them
+    read_fd, write_fd = os.pipe()
+    opened.extend((read_fd, write_fd))
+    return read_fd, write_fd
+
+
+def split_streams(parts, breaks):
+    groups = []
+    for part in parts:
+        if not groups or part in breaks:
+            groups.append([])
+        groups[-1].append(part)
+    return groups
+
+
+def split_output_paths(output_path, count):
+    # the first file keeps the name, the ones after a stream break get .2, .3, ... before the extension
+    stem, extension = os.path.splitext(output_path)
+    return [output_path] + [f"{stem}.{number}{extension}" for number in range(2, count + 1)]
+
+
+def finalize_parts(parts, output_path, ffmpeg_path, outpoints=None, breaks=()):
+    # returns every file written, more than one when the stream parameters changed during the recording
+    outpoints = outpoints or {}
+    manifest_path = manifest_path_for(output_path)
+    existing = [part for part in parts if os.path.exists(part) and os.path.getsize(part) > 0]
+    # a break on a part that produced nothing moves to the next part that did
+    breaks = set(breaks)
+    for index, part in enumerate(parts):
+        if part in breaks and part not in existing and index + 1 < len(parts):
+            breaks.add(parts[index + 1])
+    parts = existing
+    if not parts:
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        return []
+
+    groups = split_streams(parts, breaks)
+    stem, _ = os.path.splitext(output_path)
+    outputs = split_output_paths(output_path, len(groups))
+    if len(groups) > 1:
+        # concat with stream copy keeps the first part's codec headers, later parts would decode wrongly
+        logger.warning(f"ENCODING SETTINGS CHANGED DURING THE RECORDING, SAVING {len(groups)} FILES INSTEAD OF ONE: "
+                       f"{', '.join(outputs)}")
+
+    for index, (group, path) in enumerate(zip(groups, outputs)):
+        # every part is already a playable streaming file, so a single part only needs renaming, unless
+        # a handover left an overlap to trim
+        if len(group) == 1 and not outpoints.get(group[0]):
+            os.replace(group[0], path)
+            continue
+        group_manifest = manifest_path if len(groups) == 1 else f"{stem}.{index + 1}{MANIFEST_SUFFIX}.tmp"
+        try:
+            concat_parts(group, path, ffmpeg_path, group_manifest, outpoints)
+        finally:
+            if group_manifest != manifest_path and os.path.exists(group_manifest):
+                os.remove(group_manifest)
+    for part in parts:
+        if os.path.exists(part):
+            os.remove(part)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    return outputs
+
+
+def manifest_owner(manifest_path):
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            for line in f:
+                if line.startswith(MANIFEST_OWNER + " "):
+                    _, _, pid, start = line.split()
+                    return int(pid), None if start == "-" else start
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def recording_in_progress(manifest_path):
+    owner = manifest_owner(manifest_path)
+    if not owner:
+        return False
+    pid, start = owner
+    if not process_alive(pid):
+        return False
+    current_start = process_start_time(pid)
+    return start is None or current_start is None or current_start == start
+
+
+def find_incomplete_recordings(folder):
+    manifests = []
+    # fast capture recordings keep their parts and manifest in the scratch folder until they are re-encoded
+    for directory in (folder, os.path.join(folder, SCRATCH_DIR)):
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(MANIFEST_SUFFIX):
+                continue
+            path = os.path.join(directory, name)
+            # a schedule job or another record run may still be writing these parts
+            if recording_in_progress(path):
+                logger.info(f"SKIPPING {path}, ITS RECORDING IS STILL RUNNING")
+                continue
+            manifests.append(path)
+    return manifests
+
+
+def recover_recording(manifest_path, ffmpeg_path=None):
+    if recording_in_progress(manifest_path):
+        raise RecorderError(f"{manifest_path} is still being recorded by process {manifest_owner(manifest_path)[0]}.")
+    parts, outpoints, breaks = read_manifest(manifest_path)
+    extension = os.path.splitext(parts[0])[1] if parts else ".mkv"
+    output_path = manifest_path[:-len(MANIFEST_SUFFIX)] + extension
+    directory, name = os.path.split(output_path)
+    if os.path.basename(directory) == SCRATCH_DIR:
+        # the re-encode settings died with the crash, the capture is saved as it is where the user looks for it
+        output_path = os.path.join(os.path.dirname(directory), name)
+    logger.info(f"RECOVERING {len(parts)} PART(S) FROM {manifest_path}")
+    output_paths = finalize_parts(parts, output_path, ffmpeg_path or default_ffmpeg_path(), outpoints, breaks)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    return output_paths
+
+
+def audio_codec_args(codec, output_path):
+    args = ["-c:a", codec]
+    if codec == "flac" and output_path.lower().endswith(".mp4"):
+        # older ffmpeg builds still flag FLAC in MP4 as experimental
+        args.extend(["-strict", "experimental"])
+    return args
+
+
+def popen_ffmpeg(args, pass_fds=(), nice=0, cpus=None):
+    creationflags = 0
+    preexec_fn = None
+    if platform.system() == 'Windows':
+        creationflags = subprocess.CREATE_NO_WINDOW | priority_class(nice)
+    elif nice or cpus:
+        preexec_fn = lambda: limit_current_process(nice, cpus)
+    try:
+        return subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            creationflags=creationflags,
+            preexec_fn=preexec_fn,
+            pass_fds=pass_fds
+        )
+    except FileNotFoundError as e:
+        raise FFmpegNotFoundError(f"FFmpeg not found: {e}") from e
+    except OSError as e:
+        raise RecorderError(f"Error starting recording: {e}") from e
+
+
+@dataclass
+class RecordingSettings:
+    output_path: str
+    fps: int = 30
+    bitrate: str = "1000k"
+    codec: str = "libx264"
+    preset: Optional[str] = None
+    audio_device: Optional[str] = None
+    # "device" records audio_device, "sine"/"anullsrc" substitute a synthetic lavfi source
+    audio_source: str = "device"
+    # "device" grabs the screen, "testsrc" substitutes a synthetic lavfi source. Synthetic inputs are
+    # not paced, they run as fast as the encoder allows
+    video_source: str = "device"
+    # resample the audio to its timestamps (AV_SYNC_FILTER) and measure the drift of the first audio track
+    av_sync: bool = True
+    measure_drift: bool = True
+    # test mode: make the synthetic audio clock run this many ppm fast (negative: slow)
+    synthetic_drift_ppm: float = 0.0
+    # size -thread_queue_size of every input and -probesize of the screen grab from fps and frame size. Parts
+    # started by a rollover also use the encoder speed measured before it; queue_seconds overrides the buffer length
+    auto_queues: bool = True
+    queue_seconds: Optional[float] = None
+    # "ffmpeg" grabs with x11grab/gdigrab, "mss" grabs in Python (ScreenPipeSource) and pipes raw frames
+    # to ffmpeg, for X servers where x11grab is slow or tears. Linux only, needs a single area
+    capture_backend: str = "ffmpeg"
+    # don't send frames identical to the previous one to the encoder, the output keeps their real (VFR)
+    # timestamps. Static desktops then cost almost nothing to encode or store. The mss backend compares
+    # frame hashes before piping, the ffmpeg backend drops duplicates with mpdecimate before the encoder
+    skip_static_frames: bool = False
+    # more sources recorded next to audio_device, each as its own audio track so levels can be mixed afterwards
+    audio_tracks: Tuple[str, ...] = ()
+    # None keeps the container's default audio encoder, "flac" records the tracks losslessly
+    audio_codec: Optional[str] = None
+    volume: float = 100
+    # (x, y, width, height) in absolute desktop coordinates, None grabs the whole display
+    area: Optional[Tuple[int, int, int, int]] = None
+    # several areas recorded side by side into one video with xstack, replaces `area`
+    composite_areas: Optional[Tuple[Tuple[int, int, int, int], ...]] = None
+    display: Optional[str] = None
+    scale: float = 1.0
+    # (width, height) the video is shrunk to fit, keeping its aspect ratio, e.g. a 4K monitor recorded at
+    # 1920x1080. The scale runs first in the filter graph, so everything after it handles the small frames
+    max_size: Optional[Tuple[int, int]] = None
+    # swscale algorithm used for max_size and scale, one of SCALER_OPTIONS
+    scaler: str = "bicubic"
+    # keyframe/fragment spacing of the streaming muxer, a crash loses at most this much video
+    fragment_seconds: float = 1.0
+    # "direct" encodes with codec/bitrate while recording, "intermediate" captures near-lossless for a later re-encode
+    capture_mode: str = "direct"
+    intermediate_codec: str = "libx264"
+    duration: Optional[float] = None
+    # wall-clock (epoch seconds) window to keep. x11grab/gdigrab/pulse stamp frames with the wall clock,
+    # so with -copyts the cut is exact even though ffmpeg was started a few seconds early
+    start_at: Optional[float] = None
+    stop_at: Optional[float] = None
+    stats_period: float = 1.0
+    # how long a part switch waits for the new ffmpeg to produce frames before stopping the old one
+    handover_timeout: float = 5.0
+    summary_interval: float = 10.0
+    metrics_path: Optional[str] = None
+    # (width, height) of an extra low-fps rgb24 copy of the captured video that ffmpeg writes to a pipe
+    # for the live preview, so the screen is not grabbed a second time. Not available on Windows.
+    preview_size: Optional[Tuple[int, int]] = None
+    preview_fps: int = 10
+    # replay buffer: cut the output into segments of this many seconds and reuse segment_wrap file names
+    segment_seconds: Optional[float] = None
+    segment_wrap: int = 0
+    # encoder threads (0 lets ffmpeg decide) and the cores ffmpeg may run on, set by EncoderScheduler
+    threads: int = 0
+    cpu_affinity: Optional[Tuple[int, ...]] = None
+    # keep ffmpeg from competing with the application being recorded: a nice level (0-19), an I/O class
+    # ("idle", "best-effort" or "best-effort:0-7", needs ionice) and a CPU cap in percent of one core,
+    # enforced by a cgroup (systemd-run --user --scope). Windows only maps nice to a priority class.
+    # What ffmpeg actually ended up with is in RecorderStatus.limits
+    nice: int = 0
+    ionice: Optional[str] = None
+    cpu_quota: Optional[int] = None
+    ffmpeg_path: str = field(default_factory=default_ffmpeg_path)
+
+    @property
+    def container(self):
+        return os.path.splitext(self.output_path)[1].lstrip('.').lower() or "mkv"
+
+
+@dataclass
+class RecorderStatus:
+    state: str
+    output_path: Optional[str] = None
+    elapsed: float = 0.0
+    parts: int = 0
+    returncode: Optional[int] = None
+    metrics: Optional[EncoderMetrics] = None
+    limits: Optional[ProcessLimits] = None
+
+
+class Capture:
+    def __init__(self, process, part_path, on_metrics, preview_pipe=None, preview_size=None, on_preview=None,
+                 drift_pipe=None, source=None, encoder_threads=0, on_limits=None):
+        self.process = process
+        self.source = source
+        self.part_path = part_path
+        self.on_metrics = on_metrics
+        self.on_preview = on_preview
+        self.spawned_at = time.monotonic()
+        self.first_frame_at = None
+        # how much later than first_frame_at any report dated the first frame: the encoder delay jitter a
+        # single report can be off by. out_time is the video muxed so far at the last report
+        self.first_frame_spread = 0.0
+        self.out_time = 0.0
+        self.stopped_at = None
+        self.ready = threading.Event()
+        self.outpoint = None
+        self.drift_ms = None
+        self.queue_high_water = 0
+        self.queue_blocked = 0
+        self.limits = None
+        self.on_limits = on_limits
+        self.threads = [
+            threading.Thread(target=self._read_output, daemon=True),
+            threading.Thread(target=self._read_progress, daemon=True),
+            threading.Thread(target=self._read_limits, args=(encoder_threads,), daemon=True)
+        ]
+        if preview_pipe is not None:
+            self.threads.append(threading.Thread(target=self._read_preview, args=(preview_pipe, preview_size),
+                                                 daemon=True))
+        if drift_pipe is not None:
+            self.threads.append(threading.Thread(target=self._read_drift, args=(drift_pipe,), daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def stop(self, timeout=5):
+        process = self.process
+        if self.source:
+            self.source.stop()
+        try:
+            process.stdin.write('q')
+            process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):
+            pass
+
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.terminate()
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        self.stopped_at = time.monotonic()
+
+        try:
+            process.stdin.close()
+        except (OSError, ValueError):
+            pass
+
+        for thread in self.threads:
+            thread.join(timeout=1.0)
+        self.ready.set()
+        return process.returncode
+
+    def has_output(self):
+        return os.path.exists(self.part_path) and os.path.getsize(self.part_path) > 0
+
+    def _read_output(self):
+        process = self.process
+        try:
+            for line in iter(process.stderr.readline, ""):
+                line = line.rstrip()
+                if line:
+                    if "thread message queue blocking" in line.lower():
+                        self.queue_blocked += 1
+                    logger.warning(f"FFMPEG: {line}")
+        except BrokenPipeError:
+            logger.warning("FFMPEG PROCESS HAS BEEN CLOSED")
+        except (OSError, ValueError) as e:
+            logger.error(f"ERROR READING FFMPEG OUTPUT: {e}")
+        finally:
+            try:
+                process.stderr.close()
+            except (OSError, ValueError):
+                pass
+
+    def _read_limits(self, encoder_threads):
+        # once frames arrive the wrappers have exec'd and ffmpeg sits in its cgroup. Reading them runs
+        # ionice, which must not hold up the progress reader and with it ffmpeg's stdout
+        self.ready.wait(timeout=LIMITS_READ_TIMEOUT)
+        if not self.is_alive():
+            return
+        self.limits = read_limits(self.process.pid, encoder_threads)
+        logger.info(f"ENCODER LIMITS: {self.limits.summary()}")
+        if self.on_limits:
+            try:
+                self.on_limits(self, self.limits)
+            except Exception as e:
+                logger.error(f"ERROR IN LIMITS LISTENER: {e}")
+
+    def _read_progress(self):
+        process = self.process
+        parser = ProgressParser()
+        try:
+            for line in iter(process.stdout.readline, ""):
+                metrics = parser.feed(line)
+                if not metrics:
+                    continue
+                if metrics.frame > 0:
+                    # out_time is how much video has been muxed, so this dates the first frame. Frames still
+                    # in the encoder only make the date later, the earliest one is the closest
+                    first_frame_at = time.monotonic() - metrics.out_time
+                    if self.first_frame_at is None:
+                        self.first_frame_at = first_frame_at
+                        self.ready.set()
+                    self.first_frame_at = min(self.first_frame_at, first_frame_at)
+                    self.first_frame_spread = max(self.first_frame_spread, first_frame_at - self.first_frame_at)
+                    self.out_time = metrics.out_time
+                metrics.drift_ms = self.drift_ms
+                self.on_metrics(self, metrics)
+        except (OSError, ValueError) as e:
+            logger.error(f"ERROR READING FFMPEG PROGRESS: {e}")
+        finally:
+            try:
+                process.stdout.close()
+            except (OSError, ValueError):
+                pass
+
+    def _read_drift(self, pipe):
+        parser = DriftParser(AUDIO_SAMPLE_RATE)
+        try:
+            with os.fdopen(pipe, 'r', encoding='utf-8', errors='replace') as stream:
+                for line in stream:
+                    drift_ms = parser.feed(line)
+                    if drift_ms is not None:
+                        self.drift_ms = drift_ms
+        except (OSError, ValueError) as e:
+            logger.error(f"ERROR READING AUDIO DRIFT: {e}")
+
+    def _read_preview(self, pipe, size):
+        # ffmpeg blocks when this pipe fills up, so it is drained until EOF even if nobody shows the frames
+        width, height = size
+        frame = bytearray(width * height * 3)
+        view = memoryview(frame)
+        try:
+            with os.fdopen(pipe, 'rb', buffering=0) as stream:
+                while True:
+                    filled = 0
+                    while filled < len(frame):
+                        count = stream.readinto(view[filled:])
+                        if not count:
+                            return
+                        filled += count
+                    self.on_preview(self, view)
+        except (OSError, ValueError) as e:
+            logger.error(f"ERROR READING FFMPEG PREVIEW: {e}")
+
+
+class RecorderEngine:
+    def __init__(self):
+        self.settings = None
+        self.capture = None
+        self.parts = []
+        self.outpoints = {}
+        # parts whose stream parameters differ from the part before, they start a new output file
+        self.breaks = set()
+        # files written by the last stop(), the first one is what stop() returns
+        self.output_paths = []
+        self.part_index = 0
+        self.started_at = None
+        self.state = "idle"
+        self.returncode = None
+        self.metrics = None
+        self.limits = None
+        # last encode speed ffmpeg reported in this recording. A running ffmpeg can't resize its queues, so this
+        # only sizes the parts started after a rollover (next_part), never the first one
+        self.encoder_speed = None
+        self.metrics_listeners = []
+        self.preview_listeners = []
+        self.last_switch_gap = None
+        self._last_summary = 0.0
+        self._handover_thread = None
+        self._lock = threading.RLock()
+        self._parts_lock = threading.Lock()
+
+    @property
+    def process(self):
+        return self.capture.process if self.capture else None
+
+    @property
+    def part_path(self):
+        return self.capture.part_path if self.capture else None
+
+    def build_ffmpeg_args(self, settings, output_path, preview_fd=None, drift_fd=None, video_fd=None):
+        args = [
+            settings.ffmpeg_path,
+            "-progress", "pipe:1",
+            "-stats_period", str(settings.stats_period),
+            "-nostats"
+        ]
+        if settings.start_at or settings.stop_at:
+            args.append("-copyts")
+        args.extend(self._input_args(settings, video_fd))
+
+        video_filters = self._video_filters(settings)
+        if settings.composite_areas:
+            args.extend(self._composite_args(settings, video_filters))
+        else:
+            if len(self._audio_devices(settings)) > 1:
+                args.extend(["-map", "0:v"] + self._audio_map_args(settings, 1))
+            if video_filters:
+                args.extend(["-filter:v", ",".join(video_filters)])
+
+        if self._has_audio(settings):
+            args.extend(["-filter:a", ",".join(self._audio_filters(settings))])
+            if drift_fd is not None:
+                # only the first track is measured, the stream specific option wins over -filter:a
+                args.extend(["-filter:a:0", ",".join(self._audio_filters(settings, drift_fd))])
+
+        args.extend([
+            "-threads", str(settings.threads),
+            "-pix_fmt", "yuv420p",
+            "-loglevel", "warning",
+            "-hide_banner"
+        ])
+        if self._variable_frame_rate(settings):
+            # keep the gaps between frames instead of letting the muxer duplicate frames to fill them
+            args.extend(["-fps_mode", "vfr"])
+
+        if settings.capture_mode == "intermediate":
+            args.extend(INTERMEDIATE_CODECS[settings.intermediate_codec])
+            if self._has_audio(settings):
+                args.extend(["-c:a", "pcm_s16le"])
+        else:
+            args.extend(["-c:v", settings.codec])
+            preset = settings.preset or DEFAULT_PRESETS.get(settings.codec)
+            if preset:
+                args.extend(["-preset", preset])
+            args.extend(["-b:v", settings.bitrate])
+            if self._has_audio(settings) and settings.audio_codec:
+                args.extend(audio_codec_args(settings.audio_codec, output_path))
+
+        args.extend(self._container_args(settings, output_path))
+
+        if settings.duration:
+            args.extend(["-t", str(settings.duration)])
+        args.extend(self._window_args(settings))
+
+        args.extend(["-y", output_path])
+
+        if preview_fd is not None:
+            args.extend(self._preview_output_args(settings, preview_fd))
+        return args
+
+    def _window_args(self, settings):
+        args = []
+        if settings.start_at:
+            args.extend(["-ss", f"{settings.start_at:.3f}"])
+        if settings.stop_at:
+            args.extend(["-to", f"{settings.stop_at:.3f}"])
+        if args:
+            # the kept frames still carry wall-clock timestamps, the file starts at zero
+            args.extend(["-avoid_negative_ts", "make_zero"])
+        return args
+
+    def _preview_output_args(self, settings, preview_fd):
+        width, height = settings.preview_size
+        args = ["-map", "0:v",
+                "-filter:v", f"fps={settings.preview_fps},scale={width}:{height}:flags=fast_bilinear",
+                "-pix_fmt", "rgb24", "-f", "rawvideo"]
+        if settings.duration:
+            args.extend(["-t", str(settings.duration)])
+        args.extend(self._window_args(settings))
+        args.append(f"pipe:{preview_fd}")
+        return args
+
+    def _audio_filters(self, settings, drift_fd=None):
+        filters = []
+        if drift_fd is not None:
+            # measured before the correction, so it shows what the device clock does
+            filters.extend(["astats=metadata=1:reset=1:measure_perchannel=none:measure_overall=Number_of_samples",
+                            f"ametadata=mode=print:key=lavfi.astats.Overall.Number_of_samples"
+                            f":file=pipe\\\\:{drift_fd}:direct=1"])
+        filters.append(f"volume={settings.volume / 100}")
+        if settings.av_sync:
+            filters.append(AV_SYNC_FILTER)
+        return filters
+
+    def _variable_frame_rate(self, settings):
+        return settings.skip_static_frames
+
+    def _drift_supported(self, settings):
+        return settings.measure_drift and self._has_audio(settings) and platform.system() != 'Windows'
+
+    def _preview_supported(self, settings):
+        return bool(settings.preview_size) and not settings.composite_areas and platform.system() != 'Windows'
+
+    def _input_args(self, settings, video_fd=None):
+        args = []
+        for area in settings.composite_areas or [settings.area]:
+            args.extend(self._video_input_args(settings, self._even_area(area), video_fd))
+
+        for device in self._audio_devices(settings):
+            args.extend(self._audio_queue_args(settings))
+            if platform.system() == 'Windows':
+                args.extend(["-f", "dshow", "-i", f"audio={device}"])
+            else:
+                args.extend(["-f", "pulse", "-sample_rate", str(AUDIO_SAMPLE_RATE), "-i", device])
+        return args + self._synthetic_audio_args(settings)
+
+    def _queue_seconds(self, settings):
+        if settings.queue_seconds:
+            return settings.queue_seconds
+        if self.encoder_speed and self.encoder_speed < 1.0:
+            # an encoder at 0.5x needs twice the buffer to get through the same stall
+            return min(MAX_QUEUE_SECONDS, QUEUE_SECONDS / self.encoder_speed)
+        return QUEUE_SECONDS
+
+    def _video_queue_args(self, settings, area):
+        if not settings.auto_queues:
+            return []
+        width, height = (area[2], area[3]) if area else (1920, 1080)
+        # x11grab and gdigrab deliver 32 bit pixels
+        frame_bytes = width * height * 4
+        frames = int(math.ceil(settings.fps * self._queue_seconds(settings)))
+        queue = max(MIN_THREAD_QUEUE, min(frames, VIDEO_QUEUE_MEMORY // frame_bytes))
+        # two frames are enough to probe a raw grab, the 5 MB default is less than one 1080p frame
+        return ["-thread_queue_size", str(queue), "-probesize", str(frame_bytes * 2)]
+
+    def _audio_queue_args(self, settings):
+        # audio packets are a few KB, a deep queue costs next to nothing
+        return ["-thread_queue_size", str(AUDIO_THREAD_QUEUE)] if settings.auto_queues else []
+
+    def _audio_devices(self, settings):
+        if settings.audio_source != "device":
+            return []
+        return [device for device in (settings.audio_device,) + tuple(settings.audio_tracks) if device]
+
+    def _audio_map_args(self, settings, first_input):
+        if settings.audio_source != "device":
+            return ["-map", f"{first_input}:a"]
+        args = []
+        for index, device in enumerate(self._audio_devices(settings)):
+            # the source name goes into the track title, players and the remix step show it
+            args.extend(["-map", f"{first_input + index}:a", f"-metadata:s:a:{index}", f"title={device}"])
+        return args
+
+    def _video_input_args(self, settings, area, video_fd=None):
+        queue_args = self._video_queue_args(settings, area)
+        if settings.capture_backend == "mss":
+            x, y, width, height = area
+            # frames are stamped when they arrive, the grabber skips frames when it can't keep up
+            return queue_args + ["-f", "rawvideo", "-pix_fmt", "bgra", "-video_size", f"{width}x{height}",
+                                 "-framerate", str(settings.fps), "-use_wallclock_as_timestamps", "1",
+                                 "-i", f"pipe:{video_fd}"]
+        if settings.video_source in SYNTHETIC_VIDEO_SOURCES:
+            width, height = (area[2], area[3]) if area else (1280, 720)
+            source = SYNTHETIC_VIDEO_SOURCES[settings.video_source].format(width=width, height=height, fps=settings.fps)
+            return queue_args + ["-f", "lavfi", "-i", source]
+
+        if platform.system() == 'Windows':
+            args = queue_args + ["-f", "gdigrab", "-framerate", str(settings.fps)]
+            if area:
+                x, y, width, height = area
+                args.extend(["-offset_x", str(x), "-offset_y", str(y), "-video_size", f"{width}x{height}"])
+            return args + ["-i", "desktop"]
+
+        display = settings.display or os.getenv('DISPLAY') or ":0"
+        args = queue_args + ["-f", "x11grab", "-framerate", str(settings.fps)]
+        if area:
+            x, y, width, height = area
+            return args + ["-video_size", f"{width}x{height}", "-i", f"{display}+{x},{y}"]
+        return args + ["-i", display]
+
+    def _composite_args(self, settings, video_filters):
+        count = len(settings.composite_areas)
+        # left to right: every input starts where the widths of the previous ones add up
+        layout = "|".join(f"{'+'.join(f'w{j}' for j in range(i)) or '0'}_0" for i in range(count))
+        areas = [self._even_area(area) for area in settings.composite_areas]
+        factor = scale_factor(sum(area[2] for area in areas), max(area[3] for area in areas),
+                              settings.max_size, settings.scale)
+        # every area is scaled on its own, before xstack copies it into the full size canvas
+        graph = ""
+        inputs = ""
+        for i, area in enumerate(areas):
+            if factor == 1.0:
+                inputs += f"[{i}:v]"
+                continue
+            width, height = output_size(area[2], area[3], scale=factor)
+            graph += f"[{i}:v]scale={width}:{height}:flags={settings.scaler}[s{i}];"
+            inputs += f"[s{i}]"
+        graph += f"{inputs}xstack=inputs={count}:layout={layout}:fill=black"
+        if video_filters:
+            graph += "," + ",".join(video_filters)
+        args = ["-filter_complex", f"{graph}[v]", "-map", "[v]"]
+        if self._has_audio(settings):
+            args.extend(self._audio_map_args(settings, count))
+        return args
+
+    def _synthetic_audio_args(self, settings):
+        source = SYNTHETIC_AUDIO_SOURCES.get(settings.audio_source)
+        if not source:
+            return []
+        if settings.synthetic_drift_ppm:
+            # a fast device delivers more samples per second than its timestamps account for
+            rate = AUDIO_SAMPLE_RATE * (1 + settings.synthetic_drift_ppm / 1000000)
+            source += f",asetpts=N/{rate:.6f}/TB"
+        return self._audio_queue_args(settings) + ["-f", "lavfi", "-i", source]
+
+    def _has_audio(self, settings):
+        if settings.audio_source == "device":
+            return bool(self._audio_devices(settings))
+        return settings.audio_source in SYNTHETIC_AUDIO_SOURCES
+
+    def _container_args(self, settings, output_path):
+        keyint = max(1, int(round(settings.fps * settings.fragment_seconds)))
+        args = ["-g", str(keyint)]
+        if settings.segment_seconds:
+            # a keyframe on every boundary so segments are cut exactly and can be joined with stream copy.
+            # Segments are always Matroska, which stays readable while it is being written
+            args.extend(["-force_key_frames", f"expr:gte(t,n_forced*{settings.segment_seconds})",
+                         "-f", "segment", "-segment_time", str(settings.segment_seconds),
+                         "-segment_wrap", str(settings.segment_wrap), "-reset_timestamps", "1",
+                         "-segment_format", "matroska",
+                         "-segment_format_options", f"cluster_time_limit={int(settings.fragment_seconds * 1000)}"])
+            return args
+
+        if self._variable_frame_rate(settings):
+            # -g counts frames, which can be minutes apart on an idle screen, so keyframes go by time
+            args.extend(["-force_key_frames", f"expr:gte(t,n_forced*{settings.fragment_seconds})"])
+        extension = os.path.splitext(output_path)[1].lower()
+        if extension == ".mp4":
+            args.extend(["-movflags", STREAMING_MOVFLAGS,
+                         "-frag_duration", str(int(settings.fragment_seconds * 1000000))])
+        elif extension == ".mkv":
+            args.extend(["-cluster_time_limit", str(int(settings.fragment_seconds * 1000))])
+        return args
+
+    def _video_filters(self, settings):
+        filters = []
+        if not settings.composite_areas:
+            scale = self._scale_filter(settings, self._even_area(settings.area))
+            if scale:
+                filters.append(scale)
+        if settings.skip_static_frames and settings.capture_backend != "mss":
+            # mpdecimate only reads planar yuv; converting right away means the encoder needs no second
+            # conversion. max= keeps one frame per fragment so keyframes keep coming on an idle screen
+            keepalive = max(1, int(round(settings.fps * settings.fragment_seconds)))
+            filters.extend(["format=yuv420p", f"mpdecimate=max={keepalive}"])
+        return filters
+
+    def _scale_filter(self, settings, area):
+        # scale is the first filter, so its output format is negotiated with what follows and swscale
+        # converts bgra to yuv420p in the same pass that shrinks the frame
+        if area:
+            width, height = output_size(area[2], area[3], settings.max_size, settings.scale)
+            if (width, height) == (area[2], area[3]):
+                return None
+            return f"scale={width}:{height}:flags={settings.scaler}"
+        scale = settings.scale or 1.0
+        if settings.max_size:
+            # the display size is only known to ffmpeg, fit the box in the filter instead
+            max_width, max_height = settings.max_size
+            return (f"scale='min(iw,{max_width})*{scale}':'min(ih,{max_height})*{scale}'"
+                    f":force_original_aspect_ratio=decrease:force_divisible_by=2:flags={settings.scaler}")
+        if scale != 1.0:
+            return f"scale=trunc(iw*{scale}/2)*2:trunc(ih*{scale}/2)*2:flags={settings.scaler}"
+        return None
+
+    def validate(self, settings):
+        if settings.capture_backend == "mss" and (not settings.area or settings.composite_areas
+                                                  or platform.system() == 'Windows'):
+            raise RecorderError("The mss capture backend needs Linux and a single area or monitor.")
+        if settings.scaler not in SCALER_OPTIONS:
+            raise RecorderError(f"Unknown scaler {settings.scaler}, use one of {', '.join(SCALER_OPTIONS)}.")
+        self._check_limits(settings)
+
+    def _check_limits(self, settings):
+        if not 0 <= settings.nice <= 19:
+            raise RecorderError(f"The nice level must be 0 to 19, got {settings.nice}.")
+        if settings.ionice:
+            try:
+                parse_ionice(settings.ionice)
+            except ValueError as e:
+                raise RecorderError(f"Invalid I/O priority: {e}") from e
+        if settings.cpu_quota is not None:
+            if settings.cpu_quota <= 0:
+                raise RecorderError(f"The CPU quota must be a positive percentage, got {settings.cpu_quota}.")
+            if platform.system() != 'Windows' and not shutil.which("systemd-run"):
+                raise RecorderError("A CPU quota needs systemd-run (a systemd user session).")
+
+    def _even_area(self, area):
+        if not area:
+            return None
+        x, y, width, height = area
+        width -= width % 2
+        height -= height % 2
+        if width <= 0 or height <= 0:
+            raise RecorderError(f"Invalid recording area: {area}")
+        return x, y, width, height
+
+    def start(self, settings):
+        with self._lock:
+            if self.capture:
+                raise RecorderError("A recording is already in progress.")
+            self.validate(settings)
+            self.settings = settings
+            self.parts = []
+            self.outpoints = {}
+            self.breaks = set()
+            self.output_paths = []
+            self.part_index = 0
+            self.metrics = None
+            self.limits = None
+            self.encoder_speed = None
+            self.started_at = time.monotonic()
+            try:
+                self._spawn()
+            except RecorderError:
+                # nothing was recorded, the engine is free for the next start
+                self.settings = None
+                self.started_at = None
+                raise
+
+    def next_part(self, settings=None):
+        with self._lock:
+            old = self.capture
+            if not old:
+                raise RecorderError("No recording in progress.")
+            stream_break = False
+            if settings is not None:
+                settings = replace(settings, output_path=self.settings.output_path)
+                stream_break = stream_parameters(settings) != stream_parameters(self.settings)
+            self._join_handover()
+
+            # the new ffmpeg starts while the old one keeps recording, the old one is stopped
+            # once the new one produces frames and its overlapping tail is trimmed with an outpoint
+            self._spawn(settings, stream_break)
+            self._handover_thread = threading.Thread(target=self._handover, args=(old, self.capture), daemon=True)
+            self._handover_thread.start()
+
+    def stop(self, timeout=5):
+        with self._lock:
+            if not self.settings:
+                return None
+            self.state = "stopping"
+            self._join_handover()
+            if self.capture:
+                self.returncode = self.capture.stop(timeout)
+                self._complete_part(self.capture)
+                self.capture = None
+            try:
+                return self._finalize()
+            finally:
+                self.settings = None
+                self.started_at = None
+                self.state = "idle"
+
+    def wait(self, timeout=None):
+        if self.process:
+            return self.process.wait(timeout=timeout)
+        return self.returncode
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def status(self):
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        state = self.state
+        if state == "recording" and self.process and self.process.poll() is not None:
+            state = "error" if self.process.returncode else "finished"
+        return RecorderStatus(
+            state=state,
+            output_path=self.settings.output_path if self.settings else None,
+            elapsed=elapsed,
+            parts=len(self.parts) + (1 if self.process else 0),
+            returncode=self.process.poll() if self.process else self.returncode,
+            metrics=self.metrics,
+            limits=self.limits
+        )
+
+    def add_metrics_listener(self, callback):
+        self.metrics_listeners.append(callback)
+
+    def add_preview_listener(self, callback):
+        self.preview_listeners.append(callback)
+
+    def _part_path(self, index):
+        stem, ext = os.path.splitext(self.settings.output_path)
+        return f"{stem}.part{index}{ext or '.mkv'}"
+
+    def _spawn(self, settings=None, stream_break=False):
+        # the new settings and the break only count once their ffmpeg runs, if it fails to start
+        # the current part keeps recording with the old ones
+        settings = settings or self.settings
+        part_path = self._part_path(self.part_index)
+        try:
+            capture = self.launch(settings, part_path, self._on_metrics, self._on_preview, self._on_limits)
+        except RecorderError:
+            if not self.capture:
+                self.state = "error"
+            raise
+        self.settings = settings
+        self.capture = capture
+        if stream_break:
+            self.breaks.add(part_path)
+        self.part_index += 1
+        self.returncode = None
+        self.state = "recording"
+        self._write_manifest()
+        return self.capture
+
+    def launch(self, settings, output_path, on_metrics, on_preview=None, on_limits=None):
+        # one ffmpeg with its pipes, mss source and process limits, without any part bookkeeping
+        if settings.capture_backend == "mss":
+            try:
+                from screen_source import ScreenPipeSource
+            except ImportError as e:
+                raise RecorderError(f"The mss capture backend is not available: {e}") from e
+        opened = []
+        try:
+            preview_read, preview_write = open_pipe(opened) if self._preview_supported(settings) else (None, None)
+            drift_read, drift_write = open_pipe(opened) if self._drift_supported(settings) else (None, None)
+            video_read, video_write = open_pipe(opened) if settings.capture_backend == "mss" else (None, None)
+            args = self.build_ffmpeg_args(settings, output_path, preview_write, drift_write, video_read)
+            args = limited_command(args, settings.ionice, settings.cpu_quota)
+            logger.info(f"STARTING FFMPEG: {' '.join(args)}")
+            pass_fds = tuple(fd for fd in (preview_write, drift_write, video_read) if fd is not None)
+            process = popen_ffmpeg(args, pass_fds=pass_fds, nice=settings.nice, cpus=settings.cpu_affinity)
+        except Exception:
+            for fd in opened:
+                os.close(fd)
+            raise
+        # only ffmpeg may hold its ends of the pipes, otherwise nobody ever sees EOF
+        for fd in pass_fds:
+            os.close(fd)
+
+        source = None
+        if video_write is not None:
+            source = ScreenPipeSource(self._even_area(settings.area), settings.fps, settings.display,
+                                      skip_static=settings.skip_static_frames, keepalive=settings.fragment_seconds)
+            source.start(video_write)
+
+        return Capture(process, output_path, on_metrics, preview_read, settings.preview_size, on_preview,
+                       drift_read, source, settings.threads, on_limits)
+
+    def _handover(self, old, new):
+        new.ready.wait(timeout=self.settings.handover_timeout if self.settings else 5.0)
+        old.stop()
+
+        if new.first_frame_at is not None and old.first_frame_at is not None:
+            old.outpoint = max(0.0, new.first_frame_at - old.first_frame_at)
+            # on the joined timeline the old part ends at its outpoint, or earlier if it muxed less than that
+            old_end = old.first_frame_at + min(old.outpoint, old.out_time)
+            gap = new.first_frame_at - old_end
+            self.last_switch_gap = max(0.0, gap)
+            # both start times are estimated from progress reports. The new part has had few reports yet,
+            # its estimate is taken to be as uncertain as the old part's turned out to be
+            uncertainty = old.first_frame_spread + max(old.first_frame_spread, new.first_frame_spread)
+            logger.info(f"PART SWITCH: old part trimmed at {old.outpoint:.3f} s, "
+                        f"{'gap' if gap > 0 else 'overlap'} {abs(gap) * 1000:.0f} ms "
+                        f"(+/- {uncertainty * 1000:.0f} ms, estimated from progress reports)")
+        else:
+            logger.warning("PART SWITCH: the new ffmpeg did not report frames in time, the gap could not be measured")
+        self._complete_part(old)
+
+    def _join_handover(self):
+        if self._handover_thread:
+            self._handover_thread.join()
+            self._handover_thread = None
+
+    def _complete_part(self, capture):
+        with self._parts_lock:
+            if capture.has_output():
+                self.parts.append(capture.part_path)
+                if capture.outpoint:
+                    self.outpoints[capture.part_path] = capture.outpoint
+        self._write_manifest()
+
+    def _write_manifest(self):
+        if not self.settings:
+            return
+        with self._parts_lock:
+            parts = list(self.parts)
+            if self.capture and self.capture.part_path not in parts:
+                parts.append(self.capture.part_path)
+            write_manifest(manifest_path_for(self.settings.output_path), parts, self.outpoints, self.breaks)
+
+    def _on_metrics(self, capture, metrics):
+        if capture is not self.capture:
+            return
+        settings = self.settings
+        if not settings:
+            return
+
+        now = time.monotonic()
+        if capture.first_frame_at is not None:
+            # a realtime grab should be muxed as fast as wall time passes, whatever lags behind sits in the queues
+            backlog = max(0.0, now - capture.first_frame_at - metrics.out_time)
+            metrics.queue_frames = int(backlog * settings.fps)
+            capture.queue_high_water = max(capture.queue_high_water, metrics.queue_frames)
+        metrics.queue_high_water = capture.queue_high_water
+        metrics.queue_blocked = capture.queue_blocked
+        if capture.source:
+            metrics.grab_skipped = capture.source.skipped
+            metrics.static_frames = capture.source.static
+        elif settings.skip_static_frames:
+            # mpdecimate doesn't count its drops, what the grab delivered minus what was encoded is close
+            metrics.static_frames = max(0, int(metrics.out_time * settings.fps) - metrics.frame - metrics.drop_frames)
+        if metrics.speed > 0:
+            self.encoder_speed = metrics.speed
+        self.metrics = metrics
+
+        if now - self._last_summary >= settings.summary_interval or metrics.progress == "end":
+            self._last_summary = now
+            logger.info(f"ENCODER: {metrics.summary()}")
+
+        if settings.metrics_path:
+            try:
+                write_metrics_file(settings.metrics_path, metrics, {
+                    "output_path": settings.output_path,
+                    "limits": self.limits.to_dict() if self.limits else None
+                })
+            except OSError as e:
+                logger.error(f"ERROR WRITING METRICS FILE: {e}")
+
+        for callback in list(self.metrics_listeners):
+            try:
+                callback(metrics)
+            except Exception as e:
+                logger.error(f"ERROR IN METRICS LISTENER: {e}")
+
+    def _on_limits(self, capture, limits):
+        if capture is self.capture:
+            self.limits = limits
+
+    def _on_preview(self, capture, frame):
+        if capture is not self.capture:
+            return
+        for callback in list(self.preview_listeners):
+            try:
+                callback(frame)
+            except Exception as e:
+                logger.error(f"ERROR IN PREVIEW LISTENER: {e}")
+
+    def _finalize(self):
+        self.output_paths = finalize_parts(self.parts, self.settings.output_path, self.settings.ffmpeg_path,
+                                           self.outpoints, self.breaks)
+        self.parts = []
+        self.outpoints = {}
+        self.breaks = set()
+        return self.output_paths[0] if self.output_paths else None
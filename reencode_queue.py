@@ -0,0 +1,157 @@
+import logging
+import os
+import platform
+import subprocess
+import threading
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+from ffmpeg_progress import ProgressParser
+from recorder_engine import DEFAULT_PRESETS, RecordingSettings, audio_codec_args
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReencodeJob:
+    source_path: str
+    output_path: str
+    settings: RecordingSettings
+    duration: Optional[float] = None
+    delete_source: bool = True
+    state: str = "queued"
+    progress: float = 0.0
+    output_size: int = 0
+    error: Optional[str] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+
+def intermediate_settings(settings, scratch_dir):
+    os.makedirs(scratch_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(settings.output_path))[0]
+    return replace(settings, output_path=os.path.join(scratch_dir, f"{stem}.mkv"), capture_mode="intermediate")
+
+
+def low_priority_popen_kwargs():
+    if platform.system() == 'Windows':
+        return {"creationflags": subprocess.IDLE_PRIORITY_CLASS | subprocess.CREATE_NO_WINDOW}
+    return {"preexec_fn": lambda: os.nice(19)}
+
+
+class ReencodeQueue:
+    def __init__(self):
+        self.jobs = deque()
+        self.current = None
+        self.history = []
+        self.listeners = []
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def submit(self, source_path, output_path, settings, duration=None, delete_source=True):
+        job = ReencodeJob(source_path, output_path, settings, duration, delete_source)
+        with self._lock:
+            self.jobs.append(job)
+            if not self._worker:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+        self._notify(job)
+        return job
+
+    def pending(self):
+        return len(self.jobs) + (1 if self.current else 0)
+
+    def wait(self):
+        while True:
+            with self._lock:
+                jobs = list(self.jobs) + ([self.current] if self.current else [])
+            if not jobs:
+                return
+            for job in jobs:
+                job.done.wait()
+
+    def build_ffmpeg_args(self, job):
+        settings = job.settings
+        args = [settings.ffmpeg_path, "-progress", "pipe:1", "-nostats", "-loglevel", "warning", "-hide_banner",
+                "-i", job.source_path, "-map", "0", "-c:v", settings.codec]
+        preset = settings.preset or DEFAULT_PRESETS.get(settings.codec)
+        if preset:
+            args.extend(["-preset", preset])
+        args.extend(["-b:v", settings.bitrate, "-pix_fmt", "yuv420p"])
+        if settings.audio_codec:
+            args.extend(audio_codec_args(settings.audio_codec, job.output_path))
+        elif settings.container == "mp4":
+            args.extend(["-c:a", "aac"])
+        if settings.container == "mp4":
+            args.extend(["-movflags", "+faststart"])
+        args.extend(["-y", job.output_path])
+        return args
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self.jobs:
+                    self._worker = None
+                    return
+                job = self.jobs.popleft()
+                self.current = job
+            try:
+                self._encode(job)
+            finally:
+                with self._lock:
+                    self.current = None
+                self.history.append(job)
+                job.done.set()
+                self._notify(job)
+
+    def _encode(self, job):
+        job.state = "encoding"
+        self._notify(job)
+        args = self.build_ffmpeg_args(job)
+        logger.info(f"RE-ENCODING: {' '.join(args)}")
+
+        try:
+            process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, universal_newlines=True,
+                                       **low_priority_popen_kwargs())
+        except OSError as e:
+            job.state = "error"
+            job.error = str(e)
+            logger.error(f"ERROR STARTING RE-ENCODE: {e}")
+            return
+
+        stderr_lines = []
+        stderr_thread = threading.Thread(target=lambda: stderr_lines.extend(process.stderr.readlines()), daemon=True)
+        stderr_thread.start()
+
+        parser = ProgressParser()
+        for line in iter(process.stdout.readline, ""):
+            metrics = parser.feed(line)
+            if metrics and job.duration:
+                job.progress = min(metrics.out_time / job.duration, 1.0)
+                self._notify(job)
+        process.wait()
+        stderr_thread.join(timeout=1.0)
+
+        if process.returncode != 0:
+            job.state = "error"
+            job.error = "".join(stderr_lines[-20:])
+            logger.error(f"ERROR RE-ENCODING {job.source_path}: {job.error}")
+            return
+
+        job.state = "done"
+        job.progress = 1.0
+        job.output_size = os.path.getsize(job.output_path) if os.path.exists(job.output_path) else 0
+        logger.info(f"RE-ENCODED {job.source_path} -> {job.output_path} ({job.output_size} bytes)")
+        if job.delete_source and os.path.exists(job.source_path):
+            os.remove(job.source_path)
+
+    def _notify(self, job):
+        for callback in list(self.listeners):
+            try:
+                callback(job)
+            except Exception as e:
+                logger.error(f"ERROR IN RE-ENCODE LISTENER: {e}")
@@ -0,0 +1,111 @@
+import glob
+import logging
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import replace
+
+from recorder_engine import RecorderEngine, RecorderError, concat_parts, timestamp
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PATTERN = "segment%03d.mkv"
+# segments kept on top of the requested length, so the ones being joined are never the next to be overwritten
+SPARE_SEGMENTS = 2
+
+
+def default_buffer_dir():
+    # tmpfs keeps the constant segment writes off the disk when it is available
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, f"miniscreenrecorder-replay-{os.getpid()}")
+
+
+class ReplayBuffer:
+    # Encodes continuously into a ring of short Matroska segments (ffmpeg's segment muxer with
+    # segment_wrap), so disk use is bounded by buffer_seconds. save() joins the newest segments
+    # with stream copy, which takes well under a second.
+    def __init__(self, settings, buffer_seconds=60, segment_seconds=2.0, buffer_dir=None):
+        self.settings = settings
+        self.buffer_seconds = buffer_seconds
+        self.segment_seconds = segment_seconds
+        self.buffer_dir = buffer_dir or default_buffer_dir()
+        self.engine = RecorderEngine()
+        self.capture = None
+        self.metrics = None
+        self.limits = None
+        self.started_at = None
+        self.saves = []
+        self._lock = threading.Lock()
+
+    @property
+    def segment_wrap(self):
+        return math.ceil(self.buffer_seconds / self.segment_seconds) + SPARE_SEGMENTS
+
+    def start(self):
+        if self.capture:
+            raise RecorderError("The replay buffer is already running.")
+        self.engine.validate(self.settings)
+        os.makedirs(self.buffer_dir, exist_ok=True)
+        for path in self.segments():
+            os.remove(path)
+
+        settings = replace(self.settings, segment_seconds=self.segment_seconds, segment_wrap=self.segment_wrap,
+                           duration=None, preview_size=None)
+        output_pattern = os.path.join(self.buffer_dir, SEGMENT_PATTERN)
+        # the engine's launch sets up the mss pipe and the process limits, the ring needs no parts
+        self.capture = self.engine.launch(settings, output_pattern, self._on_metrics, on_limits=self._on_limits)
+        self.started_at = time.monotonic()
+        logger.info(f"REPLAY BUFFER STARTED: {self.buffer_seconds} s in {self.segment_wrap} segments at {self.buffer_dir}")
+
+    def _on_metrics(self, capture, metrics):
+        self.metrics = metrics
+
+    def _on_limits(self, capture, limits):
+        self.limits = limits
+
+    def is_alive(self):
+        return self.capture is not None and self.capture.is_alive()
+
+    def segments(self):
+        paths = glob.glob(os.path.join(self.buffer_dir, "segment*.mkv"))
+        paths = [path for path in paths if os.path.getsize(path) > 0]
+        return sorted(paths, key=os.path.getmtime)
+
+    def save(self, seconds=None, output_path=None):
+        seconds = min(seconds or self.buffer_seconds, self.buffer_seconds)
+        if not output_path:
+            output_folder = os.path.dirname(self.settings.output_path) or os.getcwd()
+            output_path = os.path.join(output_folder, f"Replay.{timestamp()}.{self.settings.container}")
+
+        with self._lock:
+            # the newest segment is still being written, it counts as one more so at least `seconds` are kept
+            count = math.ceil(seconds / self.segment_seconds) + 1
+            segments = self.segments()[-count:]
+            if not segments:
+                raise RecorderError("The replay buffer is empty.")
+
+            started = time.monotonic()
+            stem, extension = os.path.splitext(output_path)
+            temp_path = f"{stem}.saving{extension}"
+            manifest_path = os.path.join(self.buffer_dir, "save.ffconcat")
+            try:
+                concat_parts(segments, temp_path, self.settings.ffmpeg_path, manifest_path)
+                os.replace(temp_path, output_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                if os.path.exists(manifest_path):
+                    os.remove(manifest_path)
+
+        logger.info(f"REPLAY SAVED: {len(segments)} segment(s) to {output_path} in {time.monotonic() - started:.2f} s")
+        self.saves.append(output_path)
+        return output_path
+
+    def stop(self, timeout=5):
+        if self.capture:
+            self.capture.stop(timeout)
+            self.capture = None
+        shutil.rmtree(self.buffer_dir, ignore_errors=True)
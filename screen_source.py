@@ -0,0 +1,141 @@
+import fcntl
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+
+import mss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RING_SIZE = 3
+# Linux only; lets one write() move a large part of a frame instead of 64 KB at a time
+F_SETPIPE_SZ = 1031
+PIPE_SIZE = 1024 * 1024
+
+
+class ScreenPipeSource:
+    # Grabs an area with mss and writes it to ffmpeg as raw BGRA frames. Frames go through a ring of
+    # preallocated buffers: the grab thread copies mss' pixels into a free slot, the writer thread
+    # hands that slot to the pipe as a memoryview. mss can't grab into a given buffer, so each grab still
+    # allocates its own shot.raw; the ring keeps that to one short-lived buffer and one copy per frame,
+    # and the writer never copies or allocates.
+    # When ffmpeg falls behind the writer blocks, the ring runs out of free slots and the grab thread
+    # skips frames on its monotonic schedule instead of queueing them.
+    # With skip_static, a frame whose pixels hash the same as the last one sent is not sent at all,
+    # except once every `keepalive` seconds; ffmpeg stamps frames on arrival, so the file becomes VFR.
+    def __init__(self, area, fps, display=None, ring_size=RING_SIZE, skip_static=False, keepalive=1.0):
+        self.x, self.y, self.width, self.height = area
+        self.fps = fps
+        self.display = display
+        self.frame_bytes = self.width * self.height * 4
+        self.ring = [np.empty((self.height, self.width, 4), dtype=np.uint8) for _ in range(ring_size)]
+        self.free = queue.Queue()
+        self.filled = queue.Queue()
+        for index in range(ring_size):
+            self.free.put(index)
+        self.grabbed = 0
+        self.written = 0
+        self.skipped = 0
+        self.static = 0
+        self.grab_seconds = 0.0
+        self.skip_static = skip_static
+        self.keepalive = keepalive
+        self.running = False
+        self.stream = None
+        self.threads = []
+
+    def start(self, fd):
+        try:
+            fcntl.fcntl(fd, F_SETPIPE_SZ, PIPE_SIZE)
+        except OSError:
+            pass
+        self.stream = os.fdopen(fd, 'wb', buffering=0)
+        self.running = True
+        self.threads = [threading.Thread(target=self._grab_loop, daemon=True),
+                        threading.Thread(target=self._write_loop, daemon=True)]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        # closing the pipe is ffmpeg's end of input, it then finishes the file on its own
+        self.running = False
+        self.filled.put(None)
+        for thread in self.threads:
+            thread.join(timeout=2.0)
+        try:
+            self.stream.close()
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def stats(self):
+        return {"grabbed": self.grabbed, "written": self.written, "skipped": self.skipped, "static": self.static,
+                "grab_ms": self.grab_seconds / self.grabbed * 1000 if self.grabbed else 0.0}
+
+    def _grab_loop(self):
+        interval = 1.0 / self.fps
+        area = {"left": self.x, "top": self.y, "width": self.width, "height": self.height}
+        options = {"display": self.display} if self.display else {}
+        try:
+            with mss.mss(**options) as sct:
+                next_frame = time.monotonic()
+                last_hash = None
+                last_sent = 0.0
+                while self.running:
+                    try:
+                        index = self.free.get_nowait()
+                    except queue.Empty:
+                        index = None
+                        self.skipped += 1
+
+                    if index is not None:
+                        started = time.perf_counter()
+                        shot = sct.grab(area)
+                        frame_hash = zlib.crc32(shot.raw) if self.skip_static else None
+                        now = time.monotonic()
+                        if frame_hash is not None and frame_hash == last_hash and now - last_sent < self.keepalive:
+                            self.static += 1
+                            self.free.put(index)
+                        else:
+                            np.copyto(self.ring[index], np.frombuffer(shot.raw, dtype=np.uint8).reshape(self.ring[index].shape))
+                            last_hash = frame_hash
+                            last_sent = now
+                            self.filled.put(index)
+                        self.grab_seconds += time.perf_counter() - started
+                        self.grabbed += 1
+
+                    next_frame += interval
+                    delay = next_frame - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        # late: skip the missed slots instead of bursting to catch up
+                        missed = int(-delay / interval)
+                        self.skipped += missed
+                        next_frame += missed * interval
+        except mss.exception.ScreenShotError as e:
+            logger.error(f"SCREEN GRAB FAILED: {e}")
+        finally:
+            self.running = False
+            self.filled.put(None)
+
+    def _write_loop(self):
+        while True:
+            index = self.filled.get()
+            if index is None:
+                return
+            try:
+                view = memoryview(self.ring[index]).cast("B")
+                while view:
+                    view = view[self.stream.write(view):]
+            except (BrokenPipeError, OSError, ValueError) as e:
+                if self.running:
+                    logger.error(f"ERROR WRITING FRAMES TO FFMPEG: {e}")
+                self.running = False
+                return
+            finally:
+                self.free.put(index)
+            self.written += 1
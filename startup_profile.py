@@ -0,0 +1,46 @@
+import logging
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    # Per-phase wall time from process start until the window is usable, printed with --profile-startup.
+    # Phases that finish in the background are listed in `pending` and the report waits for them.
+    def __init__(self, enabled=False, started=None):
+        self.enabled = enabled
+        self.started = started or time.perf_counter()
+        self.last = self.started
+        self.phases = []
+        self.pending = set()
+        self.reported = False
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last, now - self.started))
+        self.last = now
+
+    def expect(self, *names):
+        self.pending.update(names)
+
+    def done(self, name):
+        # background phases overlap, so they are timed from process start rather than from the previous mark
+        now = time.perf_counter()
+        self.phases.append((name, None, now - self.started))
+        self.pending.discard(name)
+        if not self.pending:
+            self.report()
+
+    def report(self):
+        if self.reported:
+            return
+        self.reported = True
+        lines = ["startup profile (ms):"]
+        for name, duration, total in self.phases:
+            step = f"{duration * 1000:8.1f}" if duration is not None else "        "
+            lines.append(f"  {step}  at {total * 1000:8.1f}  {name}")
+        if self.enabled:
+            print("\n".join(lines), file=sys.stderr)
+        total = self.phases[-1][2] if self.phases else 0.0
+        logger.info(f"STARTUP FINISHED IN {total * 1000:.0f} ms")
@@ -0,0 +1,24 @@
+from adaptive_controller import AdaptiveController
+from recorder_engine import RecorderEngine, RecordingSettings
+
+
+def ladder(settings, controller=None):
+    controller = controller or AdaptiveController(RecorderEngine())
+    changes = []
+    while True:
+        settings, change = controller.next_settings(settings)
+        if not settings:
+            return changes
+        changes.append(change)
+
+
+def test_direct_capture_steps_through_presets_then_fps_then_scale():
+    assert ladder(RecordingSettings("a.mkv", fps=30)) == [
+        "preset veryfast -> superfast", "preset superfast -> ultrafast", "fps 30 -> 15", "scale 1.0 -> 0.75",
+        "scale 0.75 -> 0.56", "scale 0.56 -> 0.5"]
+
+
+def test_intermediate_capture_skips_the_presets():
+    changes = ladder(RecordingSettings("a.mkv", fps=30, capture_mode="intermediate"))
+    assert changes[0] == "fps 30 -> 15"
+    assert not any(change.startswith("preset") for change in changes)
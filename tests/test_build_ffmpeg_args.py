@@ -0,0 +1,128 @@
+import pytest
+
+import recorder_engine
+from recorder_engine import RecorderEngine, RecordingSettings
+
+
+@pytest.fixture(autouse=True)
+def linux(monkeypatch):
+    monkeypatch.setattr(recorder_engine.platform, "system", lambda: "Linux")
+
+
+def build(output_path="/tmp/out.mkv", video_fd=7, **kwargs):
+    kwargs.setdefault("display", ":1")
+    settings = RecordingSettings(output_path, ffmpeg_path="ffmpeg", **kwargs)
+    return RecorderEngine().build_ffmpeg_args(settings, output_path, video_fd=video_fd)
+
+
+def value(args, option, occurrence=0):
+    indices = [index for index, arg in enumerate(args) if arg == option]
+    return args[indices[occurrence] + 1]
+
+
+def inputs(args):
+    return [args[index + 1] for index, arg in enumerate(args) if arg == "-i"]
+
+
+def test_screen_area():
+    args = build(area=(100, 200, 1280, 720), fps=25, bitrate="2500k")
+    assert args[:6] == ["ffmpeg", "-progress", "pipe:1", "-stats_period", "1.0", "-nostats"]
+    assert value(args, "-f") == "x11grab"
+    assert value(args, "-framerate") == "25"
+    assert value(args, "-video_size") == "1280x720"
+    assert inputs(args) == [":1+100,200"]
+    assert value(args, "-c:v") == "libx264"
+    assert value(args, "-preset") == "veryfast"
+    assert value(args, "-b:v") == "2500k"
+    assert args[-2:] == ["-y", "/tmp/out.mkv"]
+    assert "-filter:v" not in args
+
+
+def test_odd_area_is_made_even():
+    args = build(area=(0, 0, 641, 481))
+    assert value(args, "-video_size") == "640x480"
+
+
+def test_whole_display():
+    args = build()
+    assert inputs(args) == [":1"]
+    assert "-video_size" not in args
+
+
+def test_duration():
+    args = build(duration=30)
+    assert value(args, "-t") == "30"
+
+
+def test_audio_tracks():
+    args = build("/tmp/out.mp4", audio_device="mic", audio_tracks=("desktop",), audio_codec="flac",
+                 measure_drift=False)
+    assert inputs(args)[1:] == ["mic", "desktop"]
+    assert value(args, "-map", 0) == "0:v"
+    assert value(args, "-map", 1) == "1:a"
+    assert value(args, "-map", 2) == "2:a"
+    assert "title=desktop" in args
+    assert value(args, "-filter:a") == "volume=1.0,aresample=async=1000"
+    assert value(args, "-c:a") == "flac"
+    assert "-movflags" in args
+
+
+def test_intermediate_capture():
+    args = build(capture_mode="intermediate", audio_device="mic")
+    assert value(args, "-qp") == "0"
+    assert value(args, "-c:a") == "pcm_s16le"
+    assert "-b:v" not in args
+
+
+def test_scaled_down_to_max_size():
+    args = build(area=(0, 0, 3840, 2160), max_size=(1920, 1080), scaler="lanczos")
+    assert value(args, "-video_size") == "3840x2160"
+    assert value(args, "-filter:v") == "scale=1920:1080:flags=lanczos"
+
+
+def test_composite_areas():
+    args = build(composite_areas=((0, 0, 1920, 1080), (1920, 0, 1280, 1024)))
+    assert inputs(args) == [":1+0,0", ":1+1920,0"]
+    assert value(args, "-filter_complex").startswith("[0:v][1:v]xstack=inputs=2:layout=0_0|w0_0:fill=black")
+    assert value(args, "-map") == "[v]"
+
+
+def test_static_frames_skipped():
+    args = build(area=(0, 0, 1920, 1080), skip_static_frames=True)
+    assert "mpdecimate" in value(args, "-filter:v")
+    assert value(args, "-fps_mode") == "vfr"
+    args = build(composite_areas=((0, 0, 1920, 1080), (1920, 0, 1280, 1024)), skip_static_frames=True)
+    assert "mpdecimate" in value(args, "-filter_complex")
+
+
+def test_mss_backend_reads_the_pipe():
+    args = build(capture_backend="mss", area=(10, 20, 640, 480), video_fd=9)
+    assert value(args, "-f") == "rawvideo"
+    assert value(args, "-pix_fmt") == "bgra"
+    assert value(args, "-video_size") == "640x480"
+    assert inputs(args) == ["pipe:9"]
+
+
+def test_time_window():
+    args = build(start_at=100.0, stop_at=160.0)
+    assert "-copyts" in args
+    assert value(args, "-ss") == "100.000"
+    assert value(args, "-to") == "160.000"
+    assert value(args, "-avoid_negative_ts") == "make_zero"
+    assert "-copyts" not in build()
+
+
+def test_segments_for_the_replay_buffer():
+    args = build("/tmp/replay_%03d.mkv", segment_seconds=2, segment_wrap=5)
+    assert value(args, "-f", 1) == "segment"
+    assert value(args, "-segment_time") == "2"
+    assert value(args, "-segment_wrap") == "5"
+    assert args[-1] == "/tmp/replay_%03d.mkv"
+
+
+def test_input_queues():
+    args = build(area=(0, 0, 1920, 1080), audio_device="mic")
+    assert value(args, "-thread_queue_size", 0) == "30"
+    assert value(args, "-probesize") == str(1920 * 1080 * 4 * 2)
+    assert value(args, "-thread_queue_size", 1) == "4096"
+    assert "-thread_queue_size" not in build(auto_queues=False)
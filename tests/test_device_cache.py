@@ -0,0 +1,27 @@
+from device_cache import AudioSource, parse_pactl_sources
+
+PACTL_OUTPUT = """Source #0
+\tState: SUSPENDED
+\tName: alsa_output.pci-0000_00_1f.3.analog-stereo.monitor
+\tDescription: Monitor of Built-in Audio Analog Stereo
+\tDriver: module-alsa-card.c
+\tProperties:
+\t\tdevice.description = "Monitor of Built-in Audio"
+
+Source #1
+\tState: RUNNING
+\tName: alsa_input.usb-Blue_Microphones_Yeti-00.analog-stereo
+\tDescription: Yeti Stereo Microphone Analog Stereo
+"""
+
+
+def test_parse_pactl_sources():
+    assert parse_pactl_sources(PACTL_OUTPUT) == [
+        AudioSource("alsa_output.pci-0000_00_1f.3.analog-stereo.monitor", "Monitor of Built-in Audio Analog Stereo"),
+        AudioSource("alsa_input.usb-Blue_Microphones_Yeti-00.analog-stereo", "Yeti Stereo Microphone Analog Stereo"),
+    ]
+
+
+def test_parse_pactl_sources_needs_a_name_before_the_description():
+    assert parse_pactl_sources("Source #0\n\tDescription: orphan\n\tName: unnamed\n") == []
+    assert parse_pactl_sources("") == []
@@ -0,0 +1,45 @@
+from multi_recorder import EncoderScheduler
+
+
+def all_cpus(plans):
+    return [cpu for plan in plans for cpu in plan.cpus]
+
+
+def test_plan_without_streams():
+    assert EncoderScheduler(range(4)).plan([]) == []
+
+
+def test_plan_splits_cores_evenly_for_equal_streams():
+    plans = EncoderScheduler(range(8)).plan([1, 1])
+    assert [plan.cpus for plan in plans] == [(0, 1, 2, 3), (4, 5, 6, 7)]
+    assert [plan.threads for plan in plans] == [4, 4]
+
+
+def test_plan_sizes_blocks_by_weight():
+    # a 4K stream next to a 1080p one
+    plans = EncoderScheduler(range(10)).plan([3840 * 2160 * 30, 1920 * 1080 * 30])
+    assert [len(plan.cpus) for plan in plans] == [8, 2]
+    assert all_cpus(plans) == list(range(10))
+
+
+def test_plan_gives_rounding_leftovers_to_the_heaviest_streams():
+    plans = EncoderScheduler(range(8)).plan([1, 2, 1])
+    assert [len(plan.cpus) for plan in plans] == [2, 4, 2]
+    assert all_cpus(plans) == list(range(8))
+
+
+def test_plan_keeps_at_least_one_core_per_stream():
+    plans = EncoderScheduler(range(4)).plan([100, 1, 1])
+    assert [len(plan.cpus) for plan in plans] == [2, 1, 1]
+    assert sorted(all_cpus(plans)) == [0, 1, 2, 3]
+
+
+def test_plan_shares_cores_when_streams_outnumber_them():
+    plans = EncoderScheduler([4, 5]).plan([1, 1, 1])
+    assert [plan.cpus for plan in plans] == [(4,), (5,), (4,)]
+    assert [plan.threads for plan in plans] == [1, 1, 1]
+
+
+def test_plan_handles_zero_weights():
+    plans = EncoderScheduler(range(4)).plan([0, 0])
+    assert [len(plan.cpus) for plan in plans] == [2, 2]
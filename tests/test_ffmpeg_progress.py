@@ -0,0 +1,93 @@
+import pytest
+
+from ffmpeg_progress import DriftParser, ProgressParser, parse_progress_text
+
+PROGRESS_BLOCK = """frame=150
+fps=29.97
+stream_0_0_q=23.0
+bitrate=1234.5kbits/s
+total_size=771584
+out_time_us=5000000
+out_time_ms=5000000
+out_time=00:00:05.000000
+dup_frames=2
+drop_frames=3
+speed=0.998x
+progress=continue
+"""
+
+
+def test_progress_parser_builds_metrics_at_progress_line():
+    parser = ProgressParser()
+    lines = PROGRESS_BLOCK.splitlines()
+    for line in lines[:-1]:
+        assert parser.feed(line) is None
+
+    metrics = parser.feed(lines[-1])
+    assert metrics is parser.latest
+    assert metrics.frame == 150
+    assert metrics.fps == pytest.approx(29.97)
+    assert metrics.bitrate_kbps == pytest.approx(1234.5)
+    assert metrics.total_size == 771584
+    assert metrics.out_time == pytest.approx(5.0)
+    assert metrics.dup_frames == 2
+    assert metrics.drop_frames == 3
+    assert metrics.speed == pytest.approx(0.998)
+    assert metrics.progress == "continue"
+    assert metrics.realtime
+
+
+def test_progress_parser_starts_each_block_fresh():
+    parser = ProgressParser()
+    for line in PROGRESS_BLOCK.splitlines():
+        parser.feed(line)
+    parser.feed("frame=151")
+    metrics = parser.feed("progress=end")
+    assert metrics.frame == 151
+    assert metrics.drop_frames == 0
+    assert metrics.progress == "end"
+
+
+def test_progress_parser_tolerates_missing_and_odd_values():
+    # ffmpeg writes N/A before the first frame is muxed and a negative out_time right after -ss
+    metrics = parse_progress_text("bitrate=N/A\nspeed=N/A\nout_time_ms=-23000\nignored line\nprogress=continue\n")
+    assert metrics.bitrate_kbps == 0.0
+    assert metrics.speed == 0.0
+    assert metrics.out_time == 0.0
+    assert not metrics.realtime
+
+
+def test_parse_progress_text_keeps_the_last_block():
+    metrics = parse_progress_text(PROGRESS_BLOCK + "frame=300\nprogress=end\n")
+    assert metrics.frame == 300
+    assert parse_progress_text("").frame == 0
+
+
+def feed_audio_frame(parser, pts_time, samples=1024):
+    parser.feed(f"frame:0    pts:0     pts_time:{pts_time}")
+    return parser.feed(f"lavfi.astats.Overall.Number_of_samples={samples}.000000")
+
+
+def test_drift_parser_reports_no_drift_for_a_steady_clock():
+    parser = DriftParser(48000)
+    for index in range(10):
+        drift = feed_audio_frame(parser, index * 1024 / 48000)
+        assert drift == pytest.approx(0.0, abs=1e-6)
+
+
+def test_drift_parser_measures_a_fast_device_clock():
+    # the device delivers its 1024 samples every 20 ms of capture time instead of 21.33 ms
+    parser = DriftParser(48000)
+    for index in range(11):
+        drift = feed_audio_frame(parser, 100.0 + index * 0.02)
+    assert drift == pytest.approx((10 * 1024 / 48000 - 10 * 0.02) * 1000)
+    assert parser.drift_ms == drift
+
+
+def test_drift_parser_ignores_unrelated_and_broken_lines():
+    parser = DriftParser(48000)
+    assert parser.feed("lavfi.astats.Overall.Number_of_samples=1024") is None
+    assert parser.feed("frame:1 pts:1 pts_time:garbage") is None
+    assert parser.feed("lavfi.astats.Overall.Number_of_samples=1024") is None
+    assert parser.feed("something else") is None
+    assert parser.drift_ms is None
@@ -0,0 +1,104 @@
+import datetime
+import sys
+import types
+
+import pytest
+
+from device_cache import MonitorInfo
+from job_scheduler import RecordingJob, job_area, load_jobs, next_occurrence, parse_days
+from recorder_engine import RecorderError
+
+
+def test_parse_days_names_and_groups():
+    assert parse_days("mon") == {0}
+    assert parse_days("Monday, wed,Friday") == {0, 2, 4}
+    assert parse_days("weekdays") == {0, 1, 2, 3, 4}
+    assert parse_days("weekends,mon") == {0, 5, 6}
+    assert parse_days("daily") == set(range(7))
+    assert parse_days("") == set()
+
+
+def test_parse_days_rejects_unknown_days():
+    with pytest.raises(ValueError):
+        parse_days("mon,someday")
+
+
+def job(start, end, **kwargs):
+    return RecordingJob("test", datetime.time(*start), datetime.time(*end), **kwargs)
+
+
+# 2026-03-04 is a Wednesday
+NOW = datetime.datetime(2026, 3, 4, 12, 0)
+
+
+def test_next_occurrence_later_today():
+    assert next_occurrence(job((14, 0), (15, 0)), NOW) == (datetime.datetime(2026, 3, 4, 14, 0),
+                                                           datetime.datetime(2026, 3, 4, 15, 0))
+
+
+def test_next_occurrence_tomorrow_when_today_is_over():
+    start, end = next_occurrence(job((9, 0), (10, 0)), NOW)
+    assert start == datetime.datetime(2026, 3, 5, 9, 0)
+    assert end == datetime.datetime(2026, 3, 5, 10, 0)
+
+
+def test_next_occurrence_returns_a_running_job_as_is():
+    start, end = next_occurrence(job((11, 0), (13, 0)), NOW)
+    assert start == datetime.datetime(2026, 3, 4, 11, 0)
+    assert end == datetime.datetime(2026, 3, 4, 13, 0)
+
+
+def test_next_occurrence_over_midnight():
+    # started yesterday at 23:00, still running at 00:30
+    now = datetime.datetime(2026, 3, 4, 0, 30)
+    start, end = next_occurrence(job((23, 0), (1, 0)), now)
+    assert start == datetime.datetime(2026, 3, 3, 23, 0)
+    assert end == datetime.datetime(2026, 3, 4, 1, 0)
+
+
+def test_next_occurrence_follows_the_weekdays():
+    start, _ = next_occurrence(job((9, 0), (10, 0), days=parse_days("mon")), NOW)
+    assert start == datetime.datetime(2026, 3, 9, 9, 0)
+    start, _ = next_occurrence(job((9, 0), (10, 0), days=parse_days("weekends")), NOW)
+    assert start == datetime.datetime(2026, 3, 7, 9, 0)
+
+
+def test_next_occurrence_of_a_dated_job():
+    dated = job((9, 0), (10, 0), date=datetime.date(2026, 3, 20))
+    assert next_occurrence(dated, NOW)[0] == datetime.datetime(2026, 3, 20, 9, 0)
+    past = job((9, 0), (10, 0), date=datetime.date(2026, 3, 1))
+    assert next_occurrence(past, NOW) is None
+
+
+def write_job_file(tmp_path, text):
+    path = tmp_path / "jobs.ini"
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_load_jobs_with_a_duration(tmp_path):
+    jobs = load_jobs(write_job_file(tmp_path, "[standup]\nstart = 23:30\nduration = 90\n"))
+    assert jobs[0].end == datetime.time(1, 0)
+
+
+@pytest.mark.parametrize("minutes", ["0", "1440", "2000"])
+def test_load_jobs_rejects_durations_that_wrap_around(tmp_path, minutes):
+    with pytest.raises(RecorderError):
+        load_jobs(write_job_file(tmp_path, f"[long]\nstart = 09:00\nduration = {minutes}\n"))
+
+
+def test_job_area_reports_monitor_errors_as_recorder_errors(monkeypatch):
+    def get_monitors():
+        raise RuntimeError("no X display")
+
+    monkeypatch.setitem(sys.modules, "screeninfo", types.SimpleNamespace(get_monitors=get_monitors))
+    with pytest.raises(RecorderError):
+        job_area(job((9, 0), (10, 0), monitor=1))
+
+
+def test_job_area_on_a_monitor():
+    monitors = [MonitorInfo(0, 0, 1920, 1080), MonitorInfo(1920, 0, 2560, 1440)]
+    assert job_area(job((9, 0), (10, 0), monitor=2), monitors) == (1920, 0, 2560, 1440)
+    assert job_area(job((9, 0), (10, 0), monitor=2, area=(10, 20, 640, 480)), monitors) == (1930, 20, 640, 480)
+    with pytest.raises(RecorderError):
+        job_area(job((9, 0), (10, 0), monitor=3), monitors)
@@ -0,0 +1,160 @@
+import os
+from dataclasses import replace
+
+import recorder_engine
+from recorder_engine import (MANIFEST_OWNER, SCRATCH_DIR, STREAM_BREAK, RecordingSettings, finalize_parts,
+                             find_incomplete_recordings, manifest_owner, read_manifest, recording_in_progress,
+                             recover_recording, split_streams, stream_parameters, write_manifest)
+
+
+def test_manifest_round_trip(tmp_path):
+    parts = [str(tmp_path / "rec.part1.mkv"), str(tmp_path / "rec.part2.mkv"), str(tmp_path / "rec.part3.mkv")]
+    manifest_path = str(tmp_path / "rec.parts.ffconcat")
+    write_manifest(manifest_path, parts)
+
+    assert read_manifest(manifest_path) == (parts, {}, set())
+    assert not os.path.exists(manifest_path + ".tmp")
+
+
+def test_manifest_outpoints(tmp_path):
+    parts = [str(tmp_path / "rec.part1.mkv"), str(tmp_path / "rec.part2.mkv")]
+    manifest_path = str(tmp_path / "rec.parts.ffconcat")
+    write_manifest(manifest_path, parts, {parts[0]: 12.3456})
+
+    with open(manifest_path, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert lines[lines.index(f"file '{parts[0]}'") + 1] == "outpoint 12.346"
+    assert read_manifest(manifest_path) == (parts, {parts[0]: 12.346}, set())
+
+
+def test_manifest_escapes_quotes(tmp_path):
+    part = str(tmp_path / "it's a 'test'.mkv")
+    manifest_path = str(tmp_path / "rec.parts.ffconcat")
+    write_manifest(manifest_path, [part])
+
+    with open(manifest_path, encoding='utf-8') as f:
+        text = f.read()
+    assert "file '" + part.replace("'", "'\\''") + "'\n" in text
+    assert read_manifest(manifest_path)[0] == [part]
+
+
+def test_manifest_owner(tmp_path):
+    manifest_path = str(tmp_path / "rec.parts.ffconcat")
+    write_manifest(manifest_path, [str(tmp_path / "rec.part1.mkv")])
+
+    pid, _ = manifest_owner(manifest_path)
+    assert pid == os.getpid()
+    assert recording_in_progress(manifest_path)
+
+
+def test_manifest_of_a_dead_process_is_not_in_progress(tmp_path):
+    manifest_path = tmp_path / "rec.parts.ffconcat"
+    # pids never go this high on Linux (pid_max is at most 2^22)
+    manifest_path.write_text(f"ffconcat version 1.0\n{MANIFEST_OWNER} 99999999 -\nfile 'a.mkv'\n", encoding='utf-8')
+    assert manifest_owner(str(manifest_path)) == (99999999, None)
+    assert not recording_in_progress(str(manifest_path))
+
+    # manifests written before the owner line existed
+    manifest_path.write_text("ffconcat version 1.0\nfile 'a.mkv'\n", encoding='utf-8')
+    assert manifest_owner(str(manifest_path)) is None
+    assert not recording_in_progress(str(manifest_path))
+
+
+def test_manifest_stream_breaks(tmp_path):
+    parts = [str(tmp_path / f"rec.part{index}.mkv") for index in range(1, 5)]
+    manifest_path = str(tmp_path / "rec.parts.ffconcat")
+    write_manifest(manifest_path, parts, breaks={parts[2]})
+
+    with open(manifest_path, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    # ffmpeg only sees a comment before the third part
+    assert lines[lines.index(STREAM_BREAK) + 1] == f"file '{parts[2]}'"
+    _, _, breaks = read_manifest(manifest_path)
+    assert breaks == {parts[2]}
+    assert split_streams(parts, breaks) == [parts[:2], parts[2:]]
+
+
+def test_finalize_parts_saves_each_stream_to_its_own_file(tmp_path):
+    parts = [tmp_path / f"rec.part{index}.mkv" for index in range(1, 4)]
+    for part in parts:
+        part.write_bytes(part.name.encode())
+    parts = [str(part) for part in parts]
+    output_path = str(tmp_path / "rec.mkv")
+    write_manifest(str(tmp_path / "rec.parts.ffconcat"), parts, breaks={parts[1], parts[2]})
+
+    # single-part streams are only renamed, ffmpeg is never started
+    outputs = finalize_parts(parts, output_path, "ffmpeg-not-used", breaks={parts[1], parts[2]})
+
+    assert outputs == [output_path, str(tmp_path / "rec.2.mkv"), str(tmp_path / "rec.3.mkv")]
+
+    assert sorted(os.listdir(tmp_path)) == ["rec.2.mkv", "rec.3.mkv", "rec.mkv"]
+    assert (tmp_path / "rec.mkv").read_bytes() == b"rec.part1.mkv"
+    assert (tmp_path / "rec.3.mkv").read_bytes() == b"rec.part3.mkv"
+
+
+def test_finalize_parts_moves_a_break_past_an_empty_part(tmp_path):
+    parts = [tmp_path / f"rec.part{index}.mkv" for index in range(1, 4)]
+    parts[0].write_bytes(b"first")
+    parts[1].write_bytes(b"")
+    parts[2].write_bytes(b"third")
+    parts = [str(part) for part in parts]
+
+    finalize_parts(parts, str(tmp_path / "rec.mkv"), "ffmpeg-not-used", breaks={parts[1]})
+
+    assert (tmp_path / "rec.mkv").read_bytes() == b"first"
+    assert (tmp_path / "rec.2.mkv").read_bytes() == b"third"
+
+
+def test_finalize_parts_trims_a_single_part_with_an_outpoint(tmp_path, monkeypatch):
+    parts = [tmp_path / "rec.part1.mkv", tmp_path / "rec.part2.mkv"]
+    for part in parts:
+        part.write_bytes(part.name.encode())
+    parts = [str(part) for part in parts]
+    concatenated = []
+
+    def concat_parts(group, output_path, ffmpeg_path, manifest_path, outpoints=None):
+        concatenated.append((group, outpoints.get(group[0])))
+        with open(output_path, 'wb') as f:
+            f.write(b"trimmed")
+
+    monkeypatch.setattr(recorder_engine, "concat_parts", concat_parts)
+    outputs = finalize_parts(parts, str(tmp_path / "rec.mkv"), "ffmpeg", {parts[0]: 4.5}, breaks={parts[1]})
+
+    # the part before the break keeps no overlap with the next file
+    assert concatenated == [([parts[0]], 4.5)]
+    assert (tmp_path / "rec.mkv").read_bytes() == b"trimmed"
+    assert (tmp_path / "rec.2.mkv").read_bytes() == b"rec.part2.mkv"
+    assert len(outputs) == 2
+
+
+def test_stream_parameters_ignore_capture_offsets():
+    left = RecordingSettings("a.mkv", area=(0, 0, 1920, 1080))
+    assert stream_parameters(left) == stream_parameters(replace(left, area=(1920, 0, 1920, 1080)))
+    assert stream_parameters(left) != stream_parameters(replace(left, area=(1920, 0, 1280, 1024)))
+    # a 4K monitor shrunk to 1080p encodes the same frames as a 1080p one
+    small = replace(left, max_size=(1920, 1080))
+    assert stream_parameters(small) == stream_parameters(replace(small, area=(1920, 0, 3840, 2160)))
+    assert stream_parameters(left) != stream_parameters(replace(left, preset="ultrafast"))
+
+
+
+def test_stream_parameters_ignore_the_preset_of_intermediate_capture():
+    settings = RecordingSettings("a.mkv", capture_mode="intermediate", area=(0, 0, 1920, 1080))
+    assert stream_parameters(settings) == stream_parameters(replace(settings, preset="ultrafast", codec="libx265"))
+
+
+def test_recovery_scans_the_fast_capture_scratch_folder(tmp_path):
+    scratch = tmp_path / SCRATCH_DIR
+    scratch.mkdir()
+    part = scratch / "Video.part0.mkv"
+    part.write_bytes(b"captured")
+    manifest_path = scratch / "Video.parts.ffconcat"
+    write_manifest(str(manifest_path), [str(part)])
+    manifest_path.write_text(manifest_path.read_text(encoding='utf-8').replace(
+        f"{MANIFEST_OWNER} {os.getpid()}", f"{MANIFEST_OWNER} 99999999"), encoding='utf-8')
+
+    assert find_incomplete_recordings(str(tmp_path)) == [str(manifest_path)]
+    # the recovered capture is saved where the user looks for recordings, not in the hidden folder
+    assert recover_recording(str(manifest_path), "ffmpeg-not-used") == [str(tmp_path / "Video.mkv")]
+    assert (tmp_path / "Video.mkv").read_bytes() == b"captured"
+    assert os.listdir(scratch) == []
@@ -0,0 +1,67 @@
+import pytest
+
+import process_limits
+from process_limits import ProcessLimits, format_cpus, limited_command, parse_cpus, parse_ionice
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("0", (0,)),
+    ("0-3", (0, 1, 2, 3)),
+    ("0-3,6", (0, 1, 2, 3, 6)),
+    (" 6, 2-3 ,2", (2, 3, 6)),
+])
+def test_parse_cpus(value, expected):
+    assert parse_cpus(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "a", "3-1", "-1", "1,,2"])
+def test_parse_cpus_rejects_invalid_ranges(value):
+    with pytest.raises(ValueError):
+        parse_cpus(value)
+
+
+def test_format_cpus_round_trips():
+    assert format_cpus((6, 0, 1, 2, 3)) == "0-3,6"
+    assert parse_cpus(format_cpus((0, 2, 3, 4, 7))) == (0, 2, 3, 4, 7)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("idle", ("3", None)),
+    ("best-effort", ("2", None)),
+    ("best-effort:0", ("2", "0")),
+    ("realtime:7", ("1", "7")),
+])
+def test_parse_ionice(value, expected):
+    assert parse_ionice(value) == expected
+
+
+@pytest.mark.parametrize("value", ["low", "best-effort:8", "best-effort:x", "best-effort:-1", "idle:3"])
+def test_parse_ionice_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        parse_ionice(value)
+
+
+def test_limited_command_prefixes(monkeypatch):
+    monkeypatch.setattr(process_limits.platform, "system", lambda: "Linux")
+    monkeypatch.setattr(process_limits.shutil, "which", lambda name: f"/usr/bin/{name}")
+    args = ["ffmpeg", "-i", "x"]
+
+    assert limited_command(args) == args
+    assert limited_command(args, ionice="best-effort:7") == ["/usr/bin/ionice", "-c", "2", "-n", "7"] + args
+    command = limited_command(args, ionice="idle", cpu_quota=50)
+    assert command[:3] == ["/usr/bin/systemd-run", "--user", "--scope"]
+    assert "CPUQuota=50%" in command
+    # systemd-run execs ionice, which execs ffmpeg
+    assert command[command.index("--") + 1:] == ["/usr/bin/ionice", "-c", "3"] + args
+
+
+def test_limited_command_ignores_limits_on_windows(monkeypatch):
+    monkeypatch.setattr(process_limits.platform, "system", lambda: "Windows")
+    assert limited_command(["ffmpeg"], ionice="idle", cpu_quota=50) == ["ffmpeg"]
+
+
+def test_process_limits_summary():
+    limits = ProcessLimits(pid=1, nice=10, ionice="idle", cpus=(2, 3), threads=2, os_threads=5, cpu_quota=50.0)
+    assert limits.summary() == "nice=10 ionice=idle cpus=2-3 threads=2 (5 running) cpu_quota=50%"
+    assert ProcessLimits(pid=1).summary() == "nice=? threads=auto"
+    assert limits.to_dict()["cpus"] == [2, 3]
@@ -0,0 +1,89 @@
+import os
+import subprocess
+import sys
+import threading
+from dataclasses import replace
+
+import pytest
+
+import recorder_engine
+from recorder_engine import Capture, RecorderEngine, RecorderError, RecordingSettings
+
+
+def test_failed_part_switch_keeps_the_running_part(tmp_path):
+    engine = RecorderEngine()
+    settings = RecordingSettings(str(tmp_path / "rec.mkv"), area=(0, 0, 1920, 1080))
+    running = object()
+    engine.settings = settings
+    engine.capture = running
+    engine.state = "recording"
+    engine.part_index = 1
+
+    def launch(settings, output_path, on_metrics, on_preview=None, on_limits=None):
+        raise RecorderError("ffmpeg did not start")
+
+    engine.launch = launch
+    with pytest.raises(RecorderError):
+        engine.next_part(replace(settings, area=(1920, 0, 1280, 1024)))
+
+    assert engine.settings is settings
+    assert engine.capture is running
+    assert engine.state == "recording"
+    assert engine.breaks == set()
+    assert engine.part_index == 1
+
+
+def test_capture_reads_limits_off_the_progress_thread():
+    # stands in for ffmpeg: one progress report, then it keeps running until stopped
+    script = "import sys, time; print('frame=1\\nout_time_us=0\\nprogress=continue', flush=True); time.sleep(10)"
+    process = subprocess.Popen([sys.executable, "-c", script], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, text=True)
+    limits_read = threading.Event()
+    received = []
+
+    def on_limits(capture, limits):
+        received.append((threading.current_thread().name, limits))
+        limits_read.set()
+
+    capture = Capture(process, "unused.mkv", lambda capture, metrics: None, encoder_threads=2, on_limits=on_limits)
+    try:
+        assert limits_read.wait(5)
+    finally:
+        capture.stop(timeout=0.1)
+
+    thread_name, limits = received[0]
+    assert limits.pid == process.pid
+    assert limits.threads == 2
+    assert capture.limits is limits
+    assert thread_name != capture.threads[1].name
+
+
+def test_failed_start_leaves_the_engine_free(tmp_path):
+    engine = RecorderEngine()
+
+    def launch(settings, output_path, on_metrics, on_preview=None, on_limits=None):
+        raise RecorderError("ffmpeg did not start")
+
+    engine.launch = launch
+    with pytest.raises(RecorderError):
+        engine.start(RecordingSettings(str(tmp_path / "rec.mkv"), area=(0, 0, 1920, 1080)))
+
+    assert engine.settings is None
+    assert engine.state == "error"
+    assert engine.stop() is None
+
+
+def test_failed_launch_closes_its_pipes(tmp_path, monkeypatch):
+    monkeypatch.setattr(recorder_engine.platform, "system", lambda: "Linux")
+    engine = RecorderEngine()
+    settings = RecordingSettings(str(tmp_path / "rec.mkv"), area=(0, 0, 640, 480), audio_device="mic",
+                                 preview_size=(400, 240))
+
+    def build_ffmpeg_args(*args):
+        raise RecorderError("bad settings")
+
+    monkeypatch.setattr(engine, "build_ffmpeg_args", build_ffmpeg_args)
+    before = set(os.listdir("/proc/self/fd"))
+    with pytest.raises(RecorderError):
+        engine.launch(settings, settings.output_path, lambda capture, metrics: None)
+    assert set(os.listdir("/proc/self/fd")) == before
@@ -2,10 +2,13 @@ from configparser import ConfigParser
 import os
 
 class TranslationManager:
+    fallback_language = 'en-US'
+
     def __init__(self, language='en'):
         self.language = language
         self.is_rtl = self.check_rtl_language(language)
         self.translation = ConfigParser()
+        self.fallback = ConfigParser()
         self.load_translation()
 
     def check_rtl_language(self, language):
@@ -13,19 +16,27 @@ class TranslationManager:
         return language in rtl_languages
 
     def load_translation(self):
+        self.translation = self.read_translation_file(self.language)
+        if self.language != self.fallback_language:
+            self.fallback = self.read_translation_file(self.fallback_language)
+        else:
+            self.fallback = self.translation
+
+    def read_translation_file(self, language):
         translations_folder = 'translations'
-        translation_file = os.path.join(translations_folder, f'{self.language}.ini')
-        self.translation = ConfigParser()
+        translation_file = os.path.join(translations_folder, f'{language}.ini')
+        translation = ConfigParser()
         if os.path.exists(translation_file):
             with open(translation_file, 'r', encoding='utf-8') as file:
-                self.translation.read_file(file)
-            for key in self.translation['Settings']:
-                self.translation['Settings'][key] = self.translation['Settings'][key].replace('\\n', '\n')
+                translation.read_file(file)
+            for key in translation['Settings']:
+                translation['Settings'][key] = translation['Settings'][key].replace('\\n', '\n')
         else:
             raise FileNotFoundError(f"Translation file {translation_file} not found.")
+        return translation
 
     def t(self, key):
-        return self.translation.get('Settings', key, fallback=key)
+        return self.translation.get('Settings', key, fallback=self.fallback.get('Settings', key, fallback=key))
 
     def change_language(self, new_language):
         self.language = new_language